@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+近似重复文档检测基准测试
+
+生成100篇文档规模的模拟搜索结果（部分通稿被多个网站转载并做了少量改动），
+测量每批SimHash去重的耗时和去重率，并按已知的转载关系计算召回率和误判数。
+
+用法:
+    python benchmarks/bench_dedup.py
+    python benchmarks/bench_dedup.py --documents 100 --batches 50 --max-distance 8
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.reporter.dedup import NearDuplicateDetector
+
+_WORDS = [
+    "美联储", "降息", "通胀", "非农就业", "美债收益率", "标普500", "纳斯达克", "道琼斯", "科技股",
+    "财报", "营收", "同比增长", "市场预期", "原油", "黄金", "美元指数", "消费者信心", "制造业PMI",
+    "英伟达", "苹果", "特斯拉", "微软", "投资者", "避险情绪", "盘后交易", "分析师", "上调评级",
+    "Fed", "CPI", "earnings", "guidance", "rally", "selloff", "volatility",
+]
+_SITES = ["新浪财经", "东方财富", "华尔街见闻", "财联社", "网易财经", "腾讯财经", "凤凰网财经"]
+
+def make_story(rng: random.Random) -> str:
+    """生成一篇模拟新闻文档（标题 + 描述 + 摘要）"""
+    def sentence(words: int) -> str:
+        return ''.join(rng.choice(_WORDS) for _ in range(words)) + "。"
+
+    title = sentence(5)
+    snippet = ''.join(sentence(rng.randint(6, 10)) for _ in range(2))
+    summary = ''.join(sentence(rng.randint(6, 12)) for _ in range(rng.randint(4, 8)))
+    return f"标题: {title} | 描述: {snippet} | 摘要: {summary}"
+
+def make_copy(story: str, rng: random.Random) -> str:
+    """模拟转载：加来源前缀、替换少量词语、截掉部分结尾"""
+    copy = f"【{rng.choice(_SITES)}】" + story
+    for _ in range(rng.randint(0, 2)):
+        word = rng.choice(_WORDS)
+        if word in copy:
+            copy = copy.replace(word, rng.choice(_WORDS), 1)
+    if rng.random() < 0.5:
+        copy = copy[:int(len(copy) * rng.uniform(0.9, 1.0))]
+    return copy
+
+def make_result_set(size: int, rng: random.Random):
+    """生成一批搜索结果，返回 (文档列表, 每篇文档所属通稿的编号)"""
+    documents, labels = [], []
+    stories = []
+    while len(documents) < size:
+        if stories and rng.random() < 0.4:
+            label = rng.randrange(len(stories))
+            documents.append(make_copy(stories[label], rng))
+        else:
+            label = len(stories)
+            stories.append(make_story(rng))
+            documents.append(stories[label])
+        labels.append(label)
+    return documents, labels
+
+def evaluate(clusters, labels):
+    """按真实转载关系统计：漏掉的重复文档数、被误合并的文档数"""
+    expected_unique = len(set(labels))
+    merged_wrongly = 0
+    for cluster in clusters:
+        cluster_labels = [labels[index] for index in cluster]
+        # 簇内与多数文档不属于同一通稿的文档视为误合并
+        majority = max(set(cluster_labels), key=cluster_labels.count)
+        merged_wrongly += sum(1 for label in cluster_labels if label != majority)
+    missed = len(clusters) - expected_unique + merged_wrongly
+    return expected_unique, missed, merged_wrongly
+
+def main():
+    parser = argparse.ArgumentParser(description='近似重复文档检测基准测试')
+    parser.add_argument('--documents', type=int, default=100, help='每批文档数（默认：100）')
+    parser.add_argument('--batches', type=int, default=50, help='批次数（默认：50）')
+    parser.add_argument('--max-distance', type=int, default=8, help='判定为重复的最大汉明距离（默认：8）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认：42）')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    detector = NearDuplicateDetector(max_distance=args.max_distance)
+
+    elapsed = []
+    total = removed = expected_removed = missed = merged_wrongly = 0
+    for _ in range(args.batches):
+        documents, labels = make_result_set(args.documents, rng)
+
+        started = time.perf_counter()
+        unique, stats = detector.deduplicate(documents)
+        elapsed.append(time.perf_counter() - started)
+
+        expected_unique, batch_missed, batch_wrong = evaluate(detector.cluster(documents), labels)
+        total += len(documents)
+        removed += stats['removed_documents']
+        expected_removed += len(documents) - expected_unique
+        missed += batch_missed
+        merged_wrongly += batch_wrong
+
+    elapsed.sort()
+    print(f"📊 {args.batches} 批 x {args.documents} 篇文档, 最大汉明距离 {args.max_distance}")
+    print(f"   每批耗时: 中位数 {elapsed[len(elapsed) // 2] * 1000:.2f} ms, 最大 {elapsed[-1] * 1000:.2f} ms")
+    print(f"   去重率: {removed / total:.1%} (实际重复 {expected_removed / total:.1%})")
+    print(f"   召回率: {(expected_removed - missed) / max(1, expected_removed):.1%}, 误合并 {merged_wrongly} 篇")
+
+if __name__ == "__main__":
+    main()
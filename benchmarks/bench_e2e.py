@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+端到端基准测试
+
+启动本地替身服务（搜索、rerank、DeepSeek、Slack，见 standin_servers.py），生成N个Agent的任务配置，
+在子进程中调用 TaskScheduler.execute_all_agents 按串行/并行等模式执行，统计墙钟时间、吞吐量、
+子进程峰值内存（RSS）以及各阶段（搜索、rerank、分析、Slack发送）耗时的分位数。
+
+各阶段耗时来自子进程写入的trace文件。结果保存到 benchmarks/results/ 下的JSON文件，
+并与相同参数的上一次结果对比，便于发现版本之间的性能退化。
+
+默认关闭搜索/rerank缓存和限流，测量的是代码本身的开销和并发能力，而不是配额。
+
+用法:
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --agents 1,10,50 --modes serial,thread,async,pipeline
+    python benchmarks/bench_e2e.py --llm-latency-ms 3000 --error-rate 0.05 --stream
+    python benchmarks/bench_e2e.py --baseline benchmarks/results/e2e-20250101-000000-abc1234.json --fail-on-regression 0.1
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import platform
+import tempfile
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.standin_servers import SLACK_WEBHOOK_PREFIX, add_profile_arguments, redirect_slack_webhooks, servers_from_args
+
+# 执行模式 -> (execute_all_agents的parallel参数, engine参数)
+MODES = {
+    'serial': (False, 'thread'),
+    'thread': (True, 'thread'),
+    'async': (True, 'async'),
+    'pipeline': (True, 'pipeline'),
+}
+
+# 子进程输出结果行的前缀
+RESULT_MARKER = 'BENCH_E2E_RESULT '
+
+# 报告中显示的阶段（span名称）
+STAGES = ['execute_agent', 'search', 'bochaai_search', 'rerank', 'analyze', 'slack_send']
+
+def write_tasks(path: Path, agents: int, stream: bool, keep_rate_limits: bool):
+    """
+    生成N个Agent的任务配置（任务不会被cron调度，只由基准测试直接执行）
+
+    slack_webhook_url使用真实的Slack地址格式，子进程中由redirect_slack_webhooks改发到替身服务
+    """
+    import yaml
+
+    global_config: Dict[str, Any] = {
+        'slack_webhook_url': f"{SLACK_WEBHOOK_PREFIX}services/bench",
+        'search_cache_ttl': 0,
+        'rerank_cache_ttl': 0,
+        'stream': stream,
+    }
+    if not keep_rate_limits:
+        global_config['rate_limits'] = {name: {'rate': 0} for name in ('search', 'rerank', 'deepseek', 'slack')}
+
+    tasks = [
+        {
+            'id': f"bench_{i}",
+            'name': f"基准测试 {i}",
+            'query': f"基准测试查询 {i} 美股市场动态",
+            'schedule': '0 0 1 1 *',
+            'slack_webhook_url': f"{SLACK_WEBHOOK_PREFIX}services/bench/{i}",
+        }
+        for i in range(agents)
+    ]
+    path.write_text(yaml.safe_dump({'global': global_config, 'tasks': tasks}, allow_unicode=True), encoding='utf-8')
+
+def run_worker(config_file: str, mode: str, base_url: str):
+    """子进程: 把Slack请求改发到替身服务，执行所有Agent并输出结果行"""
+    import resource
+
+    redirect_slack_webhooks(base_url)
+    parallel, engine = MODES[mode]
+    started = time.perf_counter()
+    from src.reporter.task_scheduler import TaskScheduler
+    scheduler = TaskScheduler(config_file)
+    results = scheduler.execute_all_agents(parallel=parallel, engine=engine)
+    wall = time.perf_counter() - started
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux下ru_maxrss单位为KB，macOS下为字节
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+    success = sum(1 for result in results.values() if result.get('success'))
+    print(RESULT_MARKER + json.dumps({
+        'wall_s': wall,
+        'success': success,
+        'failed': len(results) - success,
+        'peak_rss_mb': peak_rss_mb,
+    }))
+
+def percentile(values: List[float], q: float) -> float:
+    """已排序列表的分位数（最近秩）"""
+    index = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[index]
+
+def stage_latencies(trace_file: Path) -> Dict[str, Dict[str, float]]:
+    """从trace文件统计各阶段耗时: span名称 -> {count, mean_ms, p50_ms, p95_ms, max_ms}"""
+    durations: Dict[str, List[float]] = {}
+    if trace_file.exists():
+        with open(trace_file, 'r', encoding='utf-8') as file:
+            for line in file:
+                span = json.loads(line)
+                durations.setdefault(span['name'], []).append(span['duration_ms'])
+
+    stats = {}
+    for name, values in durations.items():
+        values.sort()
+        stats[name] = {
+            'count': len(values),
+            'mean_ms': round(sum(values) / len(values), 2),
+            'p50_ms': round(percentile(values, 0.5), 2),
+            'p95_ms': round(percentile(values, 0.95), 2),
+            'max_ms': round(values[-1], 2),
+        }
+    return stats
+
+def run_scenario(servers, args, mode: str, agents: int, work_dir: Path) -> Dict[str, Any]:
+    """在子进程中执行一次，返回结果"""
+    config_file = work_dir / f"tasks-{agents}.yaml"
+    write_tasks(config_file, agents, args.stream, args.keep_rate_limits)
+    trace_file = work_dir / f"traces-{mode}-{agents}.jsonl"
+    if trace_file.exists():
+        trace_file.unlink()
+
+    env = dict(os.environ)
+    env.update(servers.environment())
+    env.update({
+        'REPORTER_CACHE_DIR': str(work_dir / 'cache'),
+        'TRACE_FILE': str(trace_file),
+        'TRACE_MAX_BYTES': '0',
+        'METRICS_TEXTFILE': '',
+        'PYTHONUNBUFFERED': '1',
+    })
+
+    servers.reset_counters()
+    completed = subprocess.run(
+        [sys.executable, __file__, '--worker', str(config_file), mode, servers.base_url],
+        cwd=project_root, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    result_lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if completed.returncode != 0 or not result_lines:
+        print(completed.stdout[-3000:])
+        raise RuntimeError(f"基准测试子进程失败: mode={mode} agents={agents} (退出码 {completed.returncode})")
+
+    result = json.loads(result_lines[-1][len(RESULT_MARKER):])
+    result.update({
+        'mode': mode,
+        'agents': agents,
+        'agents_per_min': round(agents / result['wall_s'] * 60, 2),
+        'stages': stage_latencies(trace_file),
+        'upstream': servers.counters(),
+    })
+    return result
+
+def aggregate(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """同一场景的多次运行取墙钟时间的中位数那一次，并记录所有墙钟时间"""
+    runs = sorted(runs, key=lambda run: run['wall_s'])
+    median = dict(runs[len(runs) // 2])
+    median['wall_s_runs'] = [round(run['wall_s'], 3) for run in runs]
+    median['peak_rss_mb'] = max(run['peak_rss_mb'] for run in runs)
+    return median
+
+def git_version() -> str:
+    """当前代码版本（短提交号，有未提交修改时加 -dirty）"""
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=project_root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def scenario_key(parameters: Dict[str, Any]) -> str:
+    """参数摘要，只有参数相同的结果之间才做对比"""
+    encoded = json.dumps(parameters, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+def find_baseline(output_dir: Path, scenario: str, exclude: Path) -> Optional[Path]:
+    """输出目录中参数相同的最近一次结果"""
+    candidates = []
+    for path in output_dir.glob('e2e-*.json'):
+        if path == exclude:
+            continue
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        if data.get('scenario') == scenario:
+            candidates.append((data.get('timestamp', ''), path))
+    return max(candidates)[1] if candidates else None
+
+def print_result(result: Dict[str, Any]):
+    """打印一个场景的结果"""
+    print(f"📊 {result['mode']:<8} {result['agents']:>4} 个Agent: 墙钟 {result['wall_s']:.2f}s, "
+          f"吞吐 {result['agents_per_min']:.1f} 个/分钟, 成功 {result['success']}/{result['agents']}, "
+          f"峰值RSS {result['peak_rss_mb']:.1f} MB")
+    for name in STAGES:
+        stage = result['stages'].get(name)
+        if stage:
+            print(f"   {name:<14} p50 {stage['p50_ms']:>9.1f} ms  p95 {stage['p95_ms']:>9.1f} ms  ({stage['count']} 次)")
+    print("   上游请求: " + ", ".join(
+        f"{name} {counter['requests']}" + (f" (错误 {counter['errors']})" if counter['errors'] else '')
+        for name, counter in result['upstream'].items()
+    ))
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: Optional[float]) -> bool:
+    """与基线对比吞吐量和峰值内存，返回吞吐量是否有超过阈值的退化"""
+    print(f"\n🔍 对比基线 {baseline['version']} ({baseline['timestamp']}):")
+    previous = {(result['mode'], result['agents']): result for result in baseline['results']}
+    regressed = False
+    for result in current['results']:
+        old = previous.get((result['mode'], result['agents']))
+        if old is None:
+            continue
+        throughput_change = result['agents_per_min'] / old['agents_per_min'] - 1
+        rss_change = result['peak_rss_mb'] / old['peak_rss_mb'] - 1 if old['peak_rss_mb'] else 0
+        flag = ''
+        if threshold is not None and throughput_change < -threshold:
+            flag = '  ❌ 退化'
+            regressed = True
+        print(f"   {result['mode']:<8} {result['agents']:>4} 个Agent: 吞吐 {old['agents_per_min']:.1f} → "
+              f"{result['agents_per_min']:.1f} 个/分钟 ({throughput_change:+.1%}), "
+              f"峰值RSS {old['peak_rss_mb']:.1f} → {result['peak_rss_mb']:.1f} MB ({rss_change:+.1%}){flag}")
+    return regressed
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--worker':
+        run_worker(sys.argv[2], sys.argv[3], sys.argv[4])
+        return
+
+    parser = argparse.ArgumentParser(description='端到端基准测试（本地替身服务）')
+    parser.add_argument('--agents', default='1,10', help='Agent数量，逗号分隔（默认：1,10）')
+    parser.add_argument('--modes', default='serial,thread', help=f"执行模式，逗号分隔，可选 {','.join(MODES)}（默认：serial,thread）")
+    parser.add_argument('--repeat', type=int, default=1, help='每个场景的运行次数，取墙钟时间中位数（默认：1）')
+    parser.add_argument('--stream', action='store_true', help='DeepSeek使用流式输出')
+    parser.add_argument('--keep-rate-limits', action='store_true', help='保留默认的上游限流（默认关闭限流）')
+    parser.add_argument('--output-dir', type=Path, default=project_root / 'benchmarks' / 'results', help='结果目录（默认：benchmarks/results）')
+    parser.add_argument('--baseline', type=Path, help='对比的基线结果文件（默认：结果目录中参数相同的上一次结果）')
+    parser.add_argument('--fail-on-regression', type=float, metavar='RATIO', help='吞吐量比基线下降超过该比例时以非零状态退出，例如 0.1')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"未知的执行模式: {', '.join(unknown)}")
+    agent_counts = [int(count) for count in args.agents.split(',') if count.strip()]
+
+    parameters = {key: value for key, value in vars(args).items()
+                  if key not in ('output_dir', 'baseline', 'fail_on_regression', 'repeat')}
+    servers = servers_from_args(args).start()
+    print(f"🧪 替身服务: {servers.base_url}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for agents in agent_counts:
+                for mode in modes:
+                    runs = [run_scenario(servers, args, mode, agents, Path(work_dir)) for _ in range(args.repeat)]
+                    result = aggregate(runs)
+                    print_result(result)
+                    results.append(result)
+    finally:
+        servers.stop()
+
+    report = {
+        'benchmark': 'e2e',
+        'version': git_version(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'parameters': parameters,
+        'scenario': scenario_key(parameters),
+        'results': results,
+    }
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    output = args.output_dir / f"e2e-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['version']}.json"
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n💾 结果已保存: {output}")
+
+    baseline_file = args.baseline or find_baseline(args.output_dir, report['scenario'], output)
+    if baseline_file is None:
+        print("ℹ️  没有参数相同的历史结果，本次结果将作为之后的基线")
+        return
+
+    baseline = json.loads(baseline_file.read_text(encoding='utf-8'))
+    if compare(report, baseline, args.fail_on_regression):
+        print("❌ 吞吐量相比基线退化超过阈值")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Markdown清理器基准测试
+
+对比原 BaseAgent._clean_markdown_format 的14次顺序 re.sub 实现与 markdown_cleaner 模块的
+预编译实现（批量和流式），并在大体量（100KB+）的模拟LLM输出和随机输入上校验输出完全一致。
+
+用法:
+    python benchmarks/bench_markdown_cleaner.py
+    python benchmarks/bench_markdown_cleaner.py --size-kb 512 --repeat 10 --fuzz 50000
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.reporter.markdown_cleaner import StreamingMarkdownCleaner, clean_markdown
+
+def legacy_clean_markdown(text: str) -> str:
+    """原 BaseAgent._clean_markdown_format 实现，作为输出一致性的基准"""
+    if not text:
+        return text
+
+    import re
+
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    text = re.sub(r'__(.*?)__', r'\1', text)
+    text = re.sub(r'\*(.*?)\*', r'\1', text)
+    text = re.sub(r'_(.*?)_', r'\1', text)
+    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'```[\s\S]*?```', lambda m: m.group(0).replace('```', ''), text)
+    text = re.sub(r'```', '', text)
+    text = re.sub(r'`(.*?)`', r'\1', text)
+    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
+    text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^[-*+]\s+', '• ', text, flags=re.MULTILINE)
+    text = re.sub(r'^[-*]{3,}$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = text.strip()
+
+    return text
+
+# 模拟LLM财经分析输出的片段
+_SENTENCES = [
+    "标普500指数收涨0.8%，科技股领涨，纳斯达克综合指数创下历史新高。",
+    "美联储官员暗示年内可能再降息一次，**10年期美债收益率**回落至4.1%。",
+    "市场关注本周公布的*CPI数据*，若通胀超预期，降息路径可能推迟。",
+    "英伟达(NVDA)盘后财报超预期，数据中心收入同比增长`154%`。",
+    "详见 [美联储声明](https://www.federalreserve.gov/newsevents.htm) 和 __会议纪要__。",
+    "Oil prices fell 2% as OPEC+ signalled higher output; energy_sector lagged.",
+    "风险提示：地缘政治冲突升级、_企业盈利_不及预期、流动性收紧。",
+]
+
+def generate_llm_output(size: int, seed: int) -> str:
+    """生成至少size字符的模拟LLM输出（标题、列表、引用、代码块、链接、分割线混排）"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    section = 0
+    while length < size:
+        section += 1
+        block = [f"{'#' * rng.randint(1, 4)} {section}. 核心要点总结\n"]
+        for _ in range(rng.randint(2, 6)):
+            marker = rng.choice(['- ', '* ', '+ ', '1. ', '> ', ''])
+            block.append(marker + ' '.join(rng.choice(_SENTENCES) for _ in range(rng.randint(1, 3))) + "\n")
+        if rng.random() < 0.3:
+            block.append("```python\nreturns = prices.pct_change()\nprint(returns.tail())\n```\n")
+        if rng.random() < 0.3:
+            block.append(rng.choice(['---', '***', '- - -']) + "\n")
+        block.append("\n" * rng.randint(1, 4))
+        text = ''.join(block)
+        parts.append(text)
+        length += len(text)
+    return ''.join(parts)
+
+def generate_random_input(rng: random.Random) -> str:
+    """生成由Markdown标记字符密集组成的随机短文本，覆盖规则之间的交互"""
+    alphabet = list('#>-*+_`[]() \n\n\nab中文:.') + ['```', '**', '- ', '# ', '> ', '](x)', '\n\n\n']
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+
+def stream_clean(text: str, rng: random.Random, max_chunk: int = 16, min_segment: int = 1024) -> str:
+    """按随机长度切块后用流式清理器处理（min_segment为0时每个完整行都切分，覆盖短输入的切分逻辑）"""
+    cleaner = StreamingMarkdownCleaner(min_segment)
+    output = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, max_chunk)
+        output.append(cleaner.feed(text[position:position + size]))
+        position += size
+    output.append(cleaner.finish())
+    return ''.join(output)
+
+def check_parity(samples, rng: random.Random) -> int:
+    """校验批量和流式清理结果与原实现一致，返回不一致的样本数"""
+    mismatches = 0
+    for text in samples:
+        expected = legacy_clean_markdown(text) if text else ''
+        for name, actual in (('batch', clean_markdown(text) if text else ''),
+                             ('stream', stream_clean(text, rng)),
+                             ('stream-lines', stream_clean(text, rng, min_segment=0))):
+            if actual != expected:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"❌ {name} 输出不一致: {text[:80]!r}")
+    return mismatches
+
+def bench(func, text: str, repeat: int) -> float:
+    """返回多次执行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Markdown清理器基准测试')
+    parser.add_argument('--size-kb', type=int, default=128, help='模拟LLM输出的大小，单位KB（默认：128）')
+    parser.add_argument('--repeat', type=int, default=20, help='每种实现的重复次数（默认：20）')
+    parser.add_argument('--fuzz', type=int, default=20000, help='随机输入的校验样本数（默认：20000）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认：42）')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    documents = [generate_llm_output(args.size_kb * 1024, args.seed + i) for i in range(3)]
+
+    print(f"🔍 校验输出一致性: {len(documents)} 份 {args.size_kb}KB+ 模拟输出, {args.fuzz} 个随机输入")
+    mismatches = check_parity(documents, rng)
+    mismatches += check_parity((generate_random_input(rng) for _ in range(args.fuzz)), rng)
+    if mismatches:
+        print(f"❌ 共 {mismatches} 处输出不一致")
+        sys.exit(1)
+    print("✅ 批量和流式输出与原实现完全一致")
+
+    text = documents[0]
+    chunks = [text[i:i + 8] for i in range(0, len(text), 8)]
+
+    def stream_all(_):
+        cleaner = StreamingMarkdownCleaner()
+        for chunk in chunks:
+            cleaner.feed(chunk)
+        cleaner.finish()
+
+    legacy = bench(legacy_clean_markdown, text, args.repeat)
+    batch = bench(clean_markdown, text, args.repeat)
+    stream = bench(stream_all, text, max(1, args.repeat // 4))
+
+    print(f"\n📊 {len(text) / 1024:.0f}KB 输出, 最短耗时 (重复 {args.repeat} 次):")
+    print(f"   原实现 (14次 re.sub):  {legacy * 1000:8.2f} ms")
+    print(f"   预编译批量清理:        {batch * 1000:8.2f} ms  ({legacy / batch:.2f}x)")
+    print(f"   流式清理 (8字符/块):   {stream * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+调度器规模基准测试
+
+生成合成的 *_tasks.yaml 任务配置（数百个文件、数千个任务，混合各种cron表达式），
+分阶段测量 SmartScheduler 每分钟的开销：
+
+- 发现: find_config_files 扫描配置目录
+- 解析: 冷解析YAML并编译快照、读取磁盘快照（cron模式每个新进程）、进程内快照命中（守护模式重新扫描）
+- 到期判断: cron模式逐个任务调用 should_run_now；守护模式构建触发堆和每分钟弹出到期任务
+- Agent创建: 为到期任务创建 TaskScheduler 和 Agent（首次导入Agent实现单独统计）
+
+模拟时间从 --start 开始逐分钟推进 --ticks 分钟，两种模式找到的到期任务数应一致。
+生成的任务配置可用 --generate-only 保存下来，直接交给 run_scheduler.py --config-dir 使用。
+
+用法:
+    python benchmarks/bench_scheduler.py
+    python benchmarks/bench_scheduler.py --files 500 --tasks-per-file 20 --ticks 120
+    python benchmarks/bench_scheduler.py --generate-only /tmp/bench_config --files 200
+    python benchmarks/bench_scheduler.py --output benchmarks/results/scheduler.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Tuple
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# cron表达式模板及权重：{m} 分钟、{h} 小时、{h2}/{h3} 另外两个小时
+SCHEDULE_TEMPLATES: List[Tuple[str, int]] = [
+    ('* * * * *', 1),
+    ('*/5 * * * *', 4),
+    ('*/15 * * * *', 6),
+    ('{m} * * * *', 8),
+    ('{m} */2 * * *', 6),
+    ('{m} {h} * * *', 30),
+    ('{m} {h} * * 1-5', 20),
+    ('{m} {h},{h2},{h3} * * *', 10),
+    ('{m} 9-17 * * 1-5', 8),
+    ('{m} {h} * * 0,6', 4),
+    ('{m} {h} 1 * *', 3),
+]
+
+# 禁用任务的比例
+DISABLED_RATIO = 0.05
+
+def random_schedule(rng: random.Random) -> str:
+    """按权重随机生成一个cron表达式"""
+    templates, weights = zip(*SCHEDULE_TEMPLATES)
+    template = rng.choices(templates, weights=weights)[0]
+    hours = rng.sample(range(24), 3)
+    return template.format(m=rng.randrange(60), h=hours[0], h2=hours[1], h3=hours[2])
+
+def generate_task_files(directory: Path, files: int, tasks_per_file: int, seed: int = 0) -> int:
+    """
+    在目录中生成合成任务配置文件
+
+    Args:
+        directory: 输出目录
+        files: 文件数
+        tasks_per_file: 每个文件的任务数
+        seed: 随机种子，相同参数生成相同的文件
+
+    Returns:
+        生成的任务总数
+    """
+    import yaml
+
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    for file_index in range(files):
+        global_config = {
+            'slack_webhook_url': f"https://hooks.slack.com/services/bench/{file_index}",
+            'agent_type': 'financial',
+            'freshness': rng.choice(['day', 'week']),
+            'count': rng.choice([10, 20, 50]),
+        }
+        tasks = []
+        for task_index in range(tasks_per_file):
+            task: Dict[str, Any] = {
+                'id': f"bench_{file_index}_{task_index}",
+                'name': f"合成任务 {file_index}-{task_index}",
+                'query': f"合成查询 {file_index}-{task_index} 市场动态",
+                'schedule': random_schedule(rng),
+                'enabled': rng.random() >= DISABLED_RATIO,
+            }
+            if rng.random() < 0.3:
+                task['analysis_prompt'] = f"请总结以下新闻（任务 {file_index}-{task_index}），用中文输出。"
+            tasks.append(task)
+        content = yaml.safe_dump({'global': global_config, 'tasks': tasks}, allow_unicode=True, sort_keys=False)
+        (directory / f"bench{file_index:04d}_tasks.yaml").write_text(content, encoding='utf-8')
+    return files * tasks_per_file
+
+def timed(function: Callable[[], Any], repeat: int = 1) -> Tuple[List[float], Any]:
+    """
+    重复执行并计时（调度器的日志输出被丢弃，避免终端输出掩盖被测代码的耗时）
+
+    Returns:
+        (每次耗时秒数列表, 最后一次的返回值)
+    """
+    durations = []
+    result = None
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = function()
+            durations.append(time.perf_counter() - started)
+    return durations, result
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """耗时统计（毫秒）"""
+    return {
+        'median_ms': round(statistics.median(durations) * 1000, 3),
+        'min_ms': round(min(durations) * 1000, 3),
+        'max_ms': round(max(durations) * 1000, 3),
+        'runs': len(durations),
+    }
+
+def print_row(label: str, stats: Dict[str, float], extra: str = ''):
+    """打印一行阶段耗时"""
+    print(f"   {label:<28} 中位数 {stats['median_ms']:>10.2f} ms   最小 {stats['min_ms']:>10.2f} ms   "
+          f"最大 {stats['max_ms']:>10.2f} ms  {extra}")
+
+def run_benchmark(config_dir: Path, cache_dir: Path, args) -> Dict[str, Any]:
+    """分阶段测量调度器开销，返回结果"""
+    from scripts.run_scheduler import SmartScheduler
+    from src.reporter.config_snapshot import ConfigSnapshotCache, get_config_cache
+
+    start = datetime.strptime(args.start, '%Y-%m-%d %H:%M')
+    # cron在每分钟开始后的几秒内启动调度器
+    ticks = [start + timedelta(minutes=i, seconds=1) for i in range(args.ticks)]
+    results: Dict[str, Any] = {}
+
+    # 发现
+    scheduler = SmartScheduler(config_dir)
+    durations, config_files = timed(scheduler.find_config_files, args.repeat)
+    results['discovery'] = summarize(durations)
+    print(f"🔍 发现: {len(config_files)} 个配置文件")
+    print_row('find_config_files', results['discovery'])
+
+    # 解析
+    def load_all(cache: ConfigSnapshotCache) -> int:
+        return sum(len(cache.load(str(config_file)).tasks) for config_file in config_files)
+
+    durations, task_count = timed(lambda: load_all(ConfigSnapshotCache()), args.repeat)
+    results['parse_cold'] = summarize(durations)
+    snapshot_dir = cache_dir / 'bench_snapshots'
+    timed(lambda: load_all(ConfigSnapshotCache(str(snapshot_dir))))
+    durations, _ = timed(lambda: load_all(ConfigSnapshotCache(str(snapshot_dir))), args.repeat)
+    results['parse_disk_snapshot'] = summarize(durations)
+    warm_cache = ConfigSnapshotCache()
+    timed(lambda: load_all(warm_cache))
+    durations, _ = timed(lambda: load_all(warm_cache), args.repeat)
+    results['parse_memory_snapshot'] = summarize(durations)
+    print(f"📄 解析: {task_count} 个任务")
+    print_row('YAML解析+编译（冷）', results['parse_cold'])
+    print_row('磁盘快照（cron新进程）', results['parse_disk_snapshot'])
+    print_row('进程内快照（守护模式）', results['parse_memory_snapshot'])
+
+    # 到期判断（cron模式）：逐个任务调用should_run_now，不含发现和解析
+    tasks = [
+        task for config_file in config_files for task in scheduler.load_tasks_from_config(config_file)
+        if task.get('enabled', True) and task.get('schedule')
+    ]
+
+    def evaluate(now: datetime) -> List[Dict[str, Any]]:
+        scheduler.current_time = now
+        return [task for task in tasks if scheduler.should_run_now(task['schedule'])]
+
+    cron_durations = []
+    cron_due: Dict[datetime, List[Dict[str, Any]]] = {}
+    for now in ticks:
+        durations, due = timed(lambda: evaluate(now))
+        cron_durations.extend(durations)
+        cron_due[now] = due
+    cron_total = sum(len(due) for due in cron_due.values())
+    results['due_cron'] = summarize(cron_durations)
+    results['due_cron']['us_per_task'] = round(results['due_cron']['median_ms'] * 1000 / max(len(tasks), 1), 2)
+
+    # 完整的cron调用（发现 + 进程内快照 + 到期判断）
+    scheduler.current_time = ticks[0]
+    durations, _ = timed(scheduler.get_tasks_to_run, args.repeat)
+    results['cron_tick'] = summarize(durations)
+
+    # 到期判断（守护模式）：在模拟开始前一分钟构建触发堆（含发现和进程内快照），然后逐分钟弹出到期任务
+    daemon = SmartScheduler(config_dir)
+    durations, _ = timed(lambda: daemon._refresh_config_files(start - timedelta(minutes=1)))
+    results['daemon_build_heap'] = summarize(durations)
+    daemon_durations = []
+    daemon_total = 0
+    for now in ticks:
+        durations, due = timed(lambda: daemon._pop_due_tasks(now))
+        daemon_durations.extend(durations)
+        daemon_total += len(due)
+    results['daemon_pop'] = summarize(daemon_durations)
+
+    print(f"⏰ 到期判断: {len(tasks)} 个启用任务, {args.ticks} 分钟内到期 cron模式 {cron_total} 次 / 守护模式 {daemon_total} 次")
+    print_row('should_run_now（每分钟）', results['due_cron'], f"{results['due_cron']['us_per_task']} µs/任务")
+    print_row('get_tasks_to_run（每分钟）', results['cron_tick'])
+    print_row('构建触发堆（守护模式）', results['daemon_build_heap'])
+    print_row('弹出到期任务（每分钟）', results['daemon_pop'])
+    if cron_total != daemon_total:
+        print("   ⚠️  两种模式的到期任务数不一致")
+
+    # Agent创建：到期任务最多的一分钟，最多 --agents 个任务
+    busiest = max(ticks, key=lambda now: len(cron_due[now]))
+    due_tasks = cron_due[busiest][:args.agents]
+    task_schedulers = {}
+
+    def create_scheduler(config_file: str):
+        task_schedulers[config_file] = daemon._get_task_scheduler(config_file)
+
+    scheduler_durations = []
+    agent_durations = []
+    first_agent = None
+    failed = 0
+    for task in due_tasks:
+        config_file = task['_config_file']
+        if config_file not in task_schedulers:
+            durations, _ = timed(lambda: create_scheduler(config_file))
+            scheduler_durations.extend(durations)
+        durations, agent = timed(lambda: task_schedulers[config_file].get_agent_by_id(task['id']))
+        if agent is None:
+            failed += 1
+        if first_agent is None:
+            first_agent = durations[0]
+        else:
+            agent_durations.extend(durations)
+
+    print(f"🤖 Agent创建: {busiest.strftime('%H:%M')} 到期 {len(cron_due[busiest])} 个任务, 创建 {len(due_tasks)} 个"
+          f"（失败 {failed} 个）, {len(task_schedulers)} 个TaskScheduler")
+    if scheduler_durations:
+        results['task_scheduler_init'] = summarize(scheduler_durations)
+        print_row('TaskScheduler初始化', results['task_scheduler_init'])
+    if first_agent is not None:
+        results['agent_first_build_ms'] = round(first_agent * 1000, 3)
+        print(f"   {'首个Agent（含导入）':<28} {results['agent_first_build_ms']:>14.2f} ms")
+    if agent_durations:
+        results['agent_build'] = summarize(agent_durations)
+        print_row('后续Agent', results['agent_build'])
+    results['agents_built'] = len(due_tasks)
+    results['agents_failed'] = failed
+
+    results['counts'] = {
+        'files': len(config_files),
+        'tasks': task_count,
+        'enabled_tasks': len(tasks),
+        'due_cron': cron_total,
+        'due_daemon': daemon_total,
+    }
+    results['config_cache_stats'] = dict(get_config_cache().stats)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='调度器规模基准测试')
+    parser.add_argument('--files', type=int, default=200, help='配置文件数（默认：200）')
+    parser.add_argument('--tasks-per-file', type=int, default=20, help='每个文件的任务数（默认：20）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认：0）')
+    parser.add_argument('--ticks', type=int, default=60, help='模拟的分钟数（默认：60）')
+    parser.add_argument('--start', default='2025-01-06 08:00', help='模拟开始时间（默认：2025-01-06 08:00，周一）')
+    parser.add_argument('--repeat', type=int, default=5, help='发现、解析等阶段的重复次数（默认：5）')
+    parser.add_argument('--agents', type=int, default=200, help='最多创建的Agent数（默认：200）')
+    parser.add_argument('--generate-only', metavar='DIR', help='只在指定目录生成任务配置文件后退出')
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    args = parser.parse_args()
+
+    if args.generate_only:
+        total = generate_task_files(Path(args.generate_only), args.files, args.tasks_per_file, args.seed)
+        print(f"✅ 已生成 {args.files} 个配置文件, {total} 个任务: {args.generate_only}")
+        return
+
+    # Agent验证需要API密钥，基准测试不会发出任何请求
+    os.environ.setdefault('BOCHAAI_API_KEY', 'benchmark')
+    os.environ.setdefault('DEEPSEEK_API_KEY', 'benchmark')
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_dir = Path(work_dir) / 'config'
+        cache_dir = Path(work_dir) / 'cache'
+        # 共享的配置快照缓存在首次使用时读取REPORTER_CACHE_DIR，必须在导入调度器之前设置
+        os.environ['REPORTER_CACHE_DIR'] = str(cache_dir)
+        os.environ['TRACE_FILE'] = ''
+        total = generate_task_files(config_dir, args.files, args.tasks_per_file, args.seed)
+        print(f"📦 已生成 {args.files} 个配置文件, {total} 个任务（种子 {args.seed}）")
+
+        results = run_benchmark(config_dir, cache_dir, args)
+
+    if args.output:
+        results['parameters'] = {
+            'files': args.files,
+            'tasks_per_file': args.tasks_per_file,
+            'seed': args.seed,
+            'ticks': args.ticks,
+            'start': args.start,
+            'agents': args.agents,
+        }
+        results['timestamp'] = datetime.now().isoformat(timespec='seconds')
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"💾 结果已保存: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+CLI启动耗时基准测试
+
+在临时配置目录中生成本分钟不会触发的任务，反复运行一次 cron 模式的 run_scheduler.py
+（以及 run_agents.py --list），统计进程启动到退出的耗时中位数，并用 -X importtime
+找出导入耗时最多的模块。
+
+没有任务需要执行时不应导入 openai、requests、httpx 等重量级依赖；
+导入了这些模块或耗时中位数超过预算时以非零状态退出，可用于CI检查启动路径是否退化。
+
+用法:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --budget-ms 300 --top 15
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 空闲启动路径上不应出现的重量级模块
+HEAVY_MODULES = ['openai', 'requests', 'httpx']
+
+# 1月1日0点才触发，基准测试运行时不会执行任何任务
+_NOOP_TASKS = """global:
+  slack_webhook_url: "https://hooks.slack.com/services/benchmark"
+tasks:
+  - id: startup_benchmark
+    name: 启动基准测试
+    query: 美股市场动态
+    schedule: "0 0 1 1 *"
+"""
+
+def parse_importtime(stderr: str):
+    """解析 -X importtime 输出，返回 {模块名: 累计耗时(微秒)}"""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+def run_once(command, env):
+    """运行一次命令，返回 (耗时毫秒, importtime输出)"""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        command, cwd=project_root, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"命令执行失败 ({completed.returncode}): {' '.join(command)}")
+    return elapsed, completed.stderr
+
+def measure(label, command, env, runs, top):
+    """多次运行命令并打印耗时和导入统计，返回 (耗时中位数, 导入的重量级模块)"""
+    elapsed = []
+    imports = {}
+    for _ in range(runs):
+        run_elapsed, stderr = run_once(command, env)
+        elapsed.append(run_elapsed)
+        imports = parse_importtime(stderr)
+    elapsed.sort()
+    median = elapsed[len(elapsed) // 2]
+
+    heavy = [name for name in HEAVY_MODULES if name in imports]
+    print(f"📊 {label}: {runs} 次, 中位数 {median:.1f} ms, 最小 {elapsed[0]:.1f} ms, 最大 {elapsed[-1]:.1f} ms")
+    for name, cumulative in sorted(imports.items(), key=lambda item: -item[1])[:top]:
+        print(f"   {cumulative / 1000:8.1f} ms  {name}")
+    if heavy:
+        print(f"   ⚠️  导入了重量级模块: {', '.join(heavy)}")
+    return median, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI启动耗时基准测试')
+    parser.add_argument('--runs', type=int, default=10, help='每个命令的运行次数（默认：10）')
+    parser.add_argument('--budget-ms', type=float, default=300, help='cron模式空闲启动的耗时预算（默认：300）')
+    parser.add_argument('--top', type=int, default=10, help='显示导入耗时最多的模块数（默认：10）')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('BOCHAAI_API_KEY', 'benchmark')
+    env.setdefault('DEEPSEEK_API_KEY', 'benchmark')
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_file = Path(config_dir) / 'tasks.yaml'
+        config_file.write_text(_NOOP_TASKS, encoding='utf-8')
+
+        scheduler_median, scheduler_heavy = measure(
+            'run_scheduler.py (cron模式, 无任务触发)',
+            [sys.executable, '-X', 'importtime', 'scripts/run_scheduler.py', '--config-dir', config_dir],
+            env, args.runs, args.top,
+        )
+        _, agents_heavy = measure(
+            'run_agents.py --list',
+            [sys.executable, '-X', 'importtime', 'scripts/run_agents.py', '--config', str(config_file), '--list'],
+            env, args.runs, args.top,
+        )
+
+    failed = False
+    if scheduler_median > args.budget_ms:
+        print(f"❌ 空闲启动耗时 {scheduler_median:.1f} ms 超过预算 {args.budget_ms:.0f} ms")
+        failed = True
+    if scheduler_heavy or agents_heavy:
+        print("❌ 空闲启动路径导入了重量级模块")
+        failed = True
+    if not failed:
+        print(f"✅ 空闲启动耗时在预算 {args.budget_ms:.0f} ms 以内，未导入重量级模块")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+BochaAI搜索、rerank、DeepSeek（OpenAI兼容接口）和Slack webhook的本地替身服务
+
+用于端到端基准测试，不调用真实API。每个接口的延迟、抖动、错误率和返回内容大小都可以配置，
+响应格式与Agent解析的格式一致。可以单独运行，也可以在基准测试脚本中以线程方式启动。
+
+用法:
+    python benchmarks/standin_servers.py --port 18080 --llm-latency-ms 2000 --error-rate 0.05
+
+单独运行时把以下环境变量指向替身服务:
+    BOCHAAI_SEARCH_URL=http://127.0.0.1:18080/v1/web-search
+    BOCHAAI_RERANK_URL=http://127.0.0.1:18080/v1/rerank
+    DEEPSEEK_BASE_URL=http://127.0.0.1:18080
+
+slack_webhook_url 只能是 https://hooks.slack.com/ 地址，没有对应的环境变量；
+需要把Slack请求也发到替身服务时，在执行Agent的进程中调用 redirect_slack_webhooks。
+"""
+
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from typing import Any, Dict, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 替身服务模拟的接口: 路径前缀 -> 接口名称
+ROUTES = {
+    '/v1/web-search': 'search',
+    '/v1/rerank': 'rerank',
+    '/chat/completions': 'deepseek',
+    '/slack/': 'slack',
+}
+
+# 真实的Slack webhook地址前缀（任务配置中的slack_webhook_url必须以此开头）
+SLACK_WEBHOOK_PREFIX = 'https://hooks.slack.com/'
+
+class _StandinHTTPServer(ThreadingHTTPServer):
+    """并发Agent较多时需要更大的监听队列"""
+    daemon_threads = True
+    request_queue_size = 128
+
+class EndpointProfile:
+    """单个接口的行为配置：延迟、抖动和错误率"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, error_status: int = 503):
+        """
+        Args:
+            latency_ms: 平均延迟（毫秒）
+            jitter_ms: 延迟在 ±jitter_ms 范围内均匀抖动
+            error_rate: 返回错误状态码的概率（0-1）
+            error_status: 错误时返回的状态码
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self) -> float:
+        """本次请求的延迟（秒）"""
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, latency) / 1000
+
+    def should_fail(self) -> bool:
+        """本次请求是否返回错误"""
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+class StandinServers:
+    """
+    本地替身服务
+
+    一个HTTP服务按路径模拟四个上游，使用HTTP/1.1长连接，
+    这样连接池复用等行为与真实API一致。
+    """
+
+    def __init__(self, port: int = 0, host: str = '127.0.0.1',
+                 profiles: Optional[Dict[str, EndpointProfile]] = None,
+                 documents: int = 50, document_bytes: int = 600,
+                 completion_tokens: int = 400, token_interval_ms: float = 5):
+        """
+        初始化替身服务
+
+        Args:
+            port: 监听端口，0表示随机端口
+            host: 监听地址
+            profiles: 接口名称 -> 行为配置，未配置的接口没有延迟和错误
+            documents: 每次搜索返回的网页数（不超过请求的count）
+            document_bytes: 每个网页摘要的大约字节数
+            completion_tokens: DeepSeek回答的token数（流式输出按token逐个返回）
+            token_interval_ms: 流式输出相邻token的间隔（毫秒）
+        """
+        self.host = host
+        self.port = port
+        self.profiles = {name: EndpointProfile() for name in ROUTES.values()}
+        self.profiles.update(profiles or {})
+        self.documents = documents
+        self.document_bytes = document_bytes
+        self.completion_tokens = completion_tokens
+        self.token_interval_ms = token_interval_ms
+        self.requests = {name: 0 for name in ROUTES.values()}
+        self.errors = {name: 0 for name in ROUTES.values()}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        """替身服务地址"""
+        return f"http://{self.host}:{self.port}"
+
+    def environment(self) -> Dict[str, str]:
+        """让Agent使用替身服务的环境变量"""
+        return {
+            'BOCHAAI_SEARCH_URL': f"{self.base_url}/v1/web-search",
+            'BOCHAAI_RERANK_URL': f"{self.base_url}/v1/rerank",
+            'DEEPSEEK_BASE_URL': self.base_url,
+            'BOCHAAI_API_KEY': 'standin',
+            'DEEPSEEK_API_KEY': 'standin',
+        }
+
+    def start(self) -> 'StandinServers':
+        """在后台线程中启动服务"""
+        handler = _make_handler(self)
+        server = _StandinHTTPServer((self.host, self.port), handler)
+        self._server = server
+        self.port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, name='standin-servers', daemon=True).start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_counters(self):
+        """清零请求计数"""
+        with self._lock:
+            for name in self.requests:
+                self.requests[name] = 0
+                self.errors[name] = 0
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        """各接口的请求数和返回的错误数"""
+        with self._lock:
+            return {name: {'requests': self.requests[name], 'errors': self.errors[name]} for name in self.requests}
+
+    def _count(self, endpoint: str, failed: bool):
+        """记录一次请求"""
+        with self._lock:
+            self.requests[endpoint] += 1
+            if failed:
+                self.errors[endpoint] += 1
+
+    def search_response(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """BochaAI搜索响应：data.webPages.value"""
+        count = min(self.documents, int(body.get('count') or self.documents))
+        query = body.get('query', '')
+        filler = '市场指数、利率预期和主要公司财报共同影响了当日走势。'
+        repeat = max(1, self.document_bytes // len(filler.encode('utf-8')))
+        pages = [
+            {
+                'name': f"{query} 新闻 {i}",
+                'url': f"https://news.example.com/{zlib.crc32(query.encode('utf-8'))}/{i}",
+                'snippet': f"第{i}条新闻的描述：{query}",
+                'summary': f"第{i}条新闻摘要。" + filler * repeat,
+            }
+            for i in range(count)
+        ]
+        return {'data': {'webPages': {'value': pages}}}
+
+    def rerank_response(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """BochaAI rerank响应：data.results，按相关性从高到低排列"""
+        documents = body.get('documents') or []
+        rng = random.Random(body.get('query', ''))
+        results = [
+            {'index': i, 'relevance_score': round(rng.random(), 4), 'document': {'text': document}}
+            for i, document in enumerate(documents)
+        ]
+        results.sort(key=lambda item: -item['relevance_score'])
+        return {'data': {'results': results}}
+
+    def completion_tokens_list(self) -> list:
+        """DeepSeek回答的token列表（Markdown格式，交给清理逻辑处理）"""
+        tokens = ['## 市场概览\n', '**核心要点**：']
+        while len(tokens) < self.completion_tokens:
+            tokens.append(f"- 第{len(tokens)}条要点，指数上涨。\n" if len(tokens) % 20 == 0 else '市场')
+        return tokens[:max(1, self.completion_tokens)]
+
+def _make_handler(servers: StandinServers):
+    """创建绑定到替身服务实例的请求处理类"""
+
+    class StandinHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            endpoint = next((name for prefix, name in ROUTES.items() if self.path.startswith(prefix)), None)
+            if endpoint is None:
+                self._send_json(404, {'error': 'not found'})
+                return
+
+            profile = servers.profiles[endpoint]
+            time.sleep(profile.delay())
+            failed = profile.should_fail()
+            servers._count(endpoint, failed)
+            if failed:
+                self._send_json(profile.error_status, {'error': 'standin error'})
+                return
+
+            try:
+                body = json.loads(raw or b'{}')
+            except ValueError:
+                self._send_json(400, {'error': 'invalid json'})
+                return
+
+            if endpoint == 'search':
+                self._send_json(200, servers.search_response(body))
+            elif endpoint == 'rerank':
+                self._send_json(200, servers.rerank_response(body))
+            elif endpoint == 'deepseek':
+                self._send_completion(body)
+            else:
+                self._send_text(200, 'ok')
+
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            self._send_bytes(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+        def _send_text(self, status: int, text: str):
+            self._send_bytes(status, text.encode('utf-8'), 'text/plain')
+
+        def _send_bytes(self, status: int, data: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_completion(self, body: Dict[str, Any]):
+            """OpenAI兼容的chat completions响应，stream=true时按SSE逐个token返回"""
+            tokens = servers.completion_tokens_list()
+            prompt_tokens = sum(len(message.get('content') or '') for message in body.get('messages') or []) // 2
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+                     'total_tokens': prompt_tokens + len(tokens)}
+            base = {'id': 'standin', 'created': int(time.time()), 'model': body.get('model', 'standin')}
+
+            if not body.get('stream'):
+                self._send_json(200, {
+                    **base,
+                    'object': 'chat.completion',
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                                 'finish_reason': 'stop'}],
+                    'usage': usage,
+                })
+                return
+
+            # 流式响应不带Content-Length，发送完毕后关闭连接
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            interval = servers.token_interval_ms / 1000
+            for token in tokens:
+                chunk = {**base, 'object': 'chat.completion.chunk',
+                         'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                if interval:
+                    time.sleep(interval)
+            if (body.get('stream_options') or {}).get('include_usage'):
+                chunk = {**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return StandinHandler
+
+def redirect_slack_webhooks(base_url: str):
+    """
+    在当前进程中把发往Slack webhook的请求改发到替身服务
+
+    任务配置仍使用真实的 https://hooks.slack.com/ 地址（通过Agent的配置校验），
+    只在共享HTTP传输层和异步引擎发出请求时替换地址，限流和发件箱仍按原地址区分webhook。
+
+    Args:
+        base_url: 替身服务地址
+    """
+    from src.reporter.http_client import HttpTransport
+    from src.reporter.async_engine import AsyncEngine
+
+    standin_prefix = f"{base_url}/slack/"
+
+    def redirect(url: str) -> str:
+        if url.startswith(SLACK_WEBHOOK_PREFIX):
+            return standin_prefix + url[len(SLACK_WEBHOOK_PREFIX):]
+        return url
+
+    request = HttpTransport.request
+    post = AsyncEngine.post
+
+    def redirected_request(self, method: str, url: str, *args: Any, **kwargs: Any):
+        return request(self, method, redirect(url), *args, **kwargs)
+
+    async def redirected_post(self, upstream: str, url: str, *args: Any, **kwargs: Any):
+        return await post(self, upstream, redirect(url), *args, **kwargs)
+
+    HttpTransport.request = redirected_request
+    AsyncEngine.post = redirected_post
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """添加替身服务的命令行参数（基准测试脚本共用）"""
+    group = parser.add_argument_group('替身服务')
+    group.add_argument('--search-latency-ms', type=float, default=300, help='搜索延迟（默认：300）')
+    group.add_argument('--rerank-latency-ms', type=float, default=200, help='rerank延迟（默认：200）')
+    group.add_argument('--llm-latency-ms', type=float, default=1500, help='DeepSeek首token前的延迟（默认：1500）')
+    group.add_argument('--slack-latency-ms', type=float, default=100, help='Slack webhook延迟（默认：100）')
+    group.add_argument('--jitter', type=float, default=0.2, help='延迟抖动比例（默认：0.2，即±20%%）')
+    group.add_argument('--error-rate', type=float, default=0.0, help='各接口返回503的概率（默认：0）')
+    group.add_argument('--documents', type=int, default=50, help='每次搜索返回的网页数（默认：50）')
+    group.add_argument('--document-bytes', type=int, default=600, help='每个网页摘要的字节数（默认：600）')
+    group.add_argument('--completion-tokens', type=int, default=400, help='DeepSeek回答的token数（默认：400）')
+    group.add_argument('--token-interval-ms', type=float, default=5, help='流式输出token间隔（默认：5）')
+
+def servers_from_args(args: argparse.Namespace, port: int = 0) -> StandinServers:
+    """按命令行参数创建替身服务（未启动）"""
+    latencies = {
+        'search': args.search_latency_ms,
+        'rerank': args.rerank_latency_ms,
+        'deepseek': args.llm_latency_ms,
+        'slack': args.slack_latency_ms,
+    }
+    profiles = {
+        name: EndpointProfile(latency, latency * args.jitter, args.error_rate)
+        for name, latency in latencies.items()
+    }
+    return StandinServers(
+        port=port,
+        profiles=profiles,
+        documents=args.documents,
+        document_bytes=args.document_bytes,
+        completion_tokens=args.completion_tokens,
+        token_interval_ms=args.token_interval_ms,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='BochaAI/rerank/DeepSeek/Slack本地替身服务')
+    parser.add_argument('--port', type=int, default=18080, help='监听端口（默认：18080）')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    servers = servers_from_args(args, args.port).start()
+    print(f"🧪 替身服务已启动: {servers.base_url}")
+    for name, value in servers.environment().items():
+        print(f"   {name}={value}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"📊 {servers.counters()}")
+    except KeyboardInterrupt:
+        servers.stop()
+
+if __name__ == "__main__":
+    main()
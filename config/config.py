@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from typing import Optional
 
 class Config:
@@ -8,6 +9,7 @@ class Config:
         # BochaAI 搜索 API 配置
         self.bochaai_search_url: str = os.getenv('BOCHAAI_SEARCH_URL', 'https://api.bochaai.com/v1/web-search')
         self.bochaai_api_key: Optional[str] = os.getenv('BOCHAAI_API_KEY')
+        self.bochaai_rerank_url: str = os.getenv('BOCHAAI_RERANK_URL', 'https://api.bochaai.com/v1/rerank')
         
         # DeepSeek 分析 API 配置
         self.deepseek_api_key: Optional[str] = os.getenv('DEEPSEEK_API_KEY')
@@ -23,6 +25,43 @@ class Config:
         self.freshness: str = os.getenv('FRESHNESS', 'day')
         self.count: int = int(os.getenv('COUNT', '50'))
         
+        # HTTP传输层配置（连接池、超时、重试）
+        self.http_pool_maxsize: int = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+        self.http_timeout: float = float(os.getenv('HTTP_TIMEOUT', '30'))
+        self.http_max_retries: int = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+        self.http_backoff_base: float = float(os.getenv('HTTP_BACKOFF_BASE', '0.5'))
+        
+        # 缓存配置（搜索结果等缓存的SQLite数据库所在目录，多个进程共享）
+        self.cache_dir: str = os.getenv('REPORTER_CACHE_DIR', str(Path(__file__).parent.parent / '.cache'))
+        
+        # 指标配置（守护模式的/metrics端口，0表示不开启；监听地址默认只允许本机访问；cron模式写入的node_exporter文本文件）
+        self.metrics_port: int = int(os.getenv('METRICS_PORT', '9464'))
+        self.metrics_host: str = os.getenv('METRICS_HOST', '127.0.0.1')
+        self.metrics_textfile: Optional[str] = os.getenv('METRICS_TEXTFILE')
+        
+        # 链路追踪配置（各阶段span写入的JSONL文件，未设置时不写入；超过大小时轮转）
+        self.trace_file: str = os.getenv('TRACE_FILE', '')
+        self.trace_max_bytes: int = int(os.getenv('TRACE_MAX_BYTES', str(10 * 1024 * 1024)))
+        self.trace_backup_count: int = int(os.getenv('TRACE_BACKUP_COUNT', '5'))
+        
+        # 多副本任务认领配置（各副本共享的SQLite租约数据库，为空表示单副本运行不认领；租约有效期单位为秒）
+        self.task_lease_db: Optional[str] = os.getenv('TASK_LEASE_DB')
+        self.task_lease_seconds: float = float(os.getenv('TASK_LEASE_SECONDS', '900'))
+        self.replica_id: Optional[str] = os.getenv('REPLICA_ID')
+        
+        # 任务队列配置（worker数大于0时调度器只把到期任务加入队列，由worker进程执行；可见性超时和重试间隔单位为秒）
+        self.scheduler_workers: int = int(os.getenv('SCHEDULER_WORKERS', '0'))
+        self.job_queue_db: str = os.getenv('JOB_QUEUE_DB') or os.path.join(self.cache_dir, 'job_queue.db')
+        self.job_visibility_timeout: float = float(os.getenv('JOB_VISIBILITY_TIMEOUT', '900'))
+        self.job_max_attempts: int = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        self.job_retry_delay: float = float(os.getenv('JOB_RETRY_DELAY', '60'))
+        
+        # Slack发件箱配置（为空表示直接发送；设置后报告写入SQLite发件箱，由后台线程按webhook顺序投递；时间单位为秒）
+        self.slack_outbox_db: Optional[str] = os.getenv('SLACK_OUTBOX_DB')
+        self.slack_outbox_max_attempts: int = int(os.getenv('SLACK_OUTBOX_MAX_ATTEMPTS', '8'))
+        self.slack_outbox_retry_delay: float = float(os.getenv('SLACK_OUTBOX_RETRY_DELAY', '30'))
+        self.slack_outbox_flush_timeout: float = float(os.getenv('SLACK_OUTBOX_FLUSH_TIMEOUT', '30'))
+        
         # 向后兼容（保留旧的环境变量名作为备用）
         if not self.bochaai_api_key and os.getenv('API_KEY'):
             self.bochaai_api_key = os.getenv('API_KEY')
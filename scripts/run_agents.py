@@ -29,6 +29,7 @@ except ImportError:
 
 from src.reporter.task_scheduler import TaskScheduler
 from src.reporter.agent_factory import AgentFactory
+from src.reporter.client_registry import get_client_registry
 
 class AgentRunner:
     """Agent运行器主类"""
@@ -42,12 +43,13 @@ class AgentRunner:
         """
         self.scheduler = TaskScheduler(config_file)
     
-    def run_all(self, parallel: bool = True) -> bool:
+    def run_all(self, parallel: bool = True, engine: str = 'thread') -> bool:
         """
         运行所有启用的Agent
         
         Args:
             parallel: 是否并行执行
+            engine: 执行引擎（thread/async/pipeline）
             
         Returns:
             所有Agent都成功返回True，否则返回False
@@ -60,7 +62,7 @@ class AgentRunner:
             return False
         
         # 执行所有Agent
-        results = self.scheduler.execute_all_agents(parallel=parallel)
+        results = self.scheduler.execute_all_agents(parallel=parallel, engine=engine)
         
         if not results:
             print("⚠️  没有执行任何Agent")
@@ -71,6 +73,7 @@ class AgentRunner:
         total_count = len(results)
         
         print(f"\n🎯 执行完成: {success_count}/{total_count} 个Agent成功")
+        get_client_registry().print_stats()
         
         return success_count == total_count
     
@@ -113,6 +116,59 @@ class AgentRunner:
             class_name = agent_info.get(agent_type, 'Unknown')
             print(f"   • {agent_type} -> {class_name}")
 
+def show_slack_outbox(limit: int = 50) -> bool:
+    """
+    查看Slack发件箱中等待发送和发送失败的消息
+    
+    Args:
+        limit: 最多列出的消息数
+    
+    Returns:
+        没有发送失败的消息返回True
+    """
+    from datetime import datetime
+    from src.reporter.slack_outbox import MESSAGE_FAILED, MESSAGE_PENDING, MESSAGE_SENDING, SlackOutbox
+    from config.config import Config
+    
+    config = Config()
+    if not config.slack_outbox_db:
+        print("⚠️  未配置 SLACK_OUTBOX_DB，报告直接发送到Slack")
+        return True
+    
+    outbox = SlackOutbox(config.slack_outbox_db)
+    try:
+        counts = outbox.counts()
+        print(f"📮 Slack发件箱: {config.slack_outbox_db}")
+        print(f"   待发送 {counts.get(MESSAGE_PENDING, 0)}, 发送中 {counts.get(MESSAGE_SENDING, 0)}, "
+              f"已发送 {counts.get('sent', 0)}, 失败 {counts.get(MESSAGE_FAILED, 0)}")
+        
+        messages = outbox.list_messages([MESSAGE_PENDING, MESSAGE_SENDING, MESSAGE_FAILED], limit)
+        for message in messages:
+            enqueued = datetime.fromtimestamp(message['enqueued_at']).strftime('%Y-%m-%d %H:%M:%S')
+            line = f"   #{message['id']} [{message['status']}] {message['source']} 入队 {enqueued}, 已尝试 {message['attempts']} 次"
+            if message['status'] == MESSAGE_PENDING and message['attempts']:
+                line += f", 下次发送 {datetime.fromtimestamp(message['available_at']).strftime('%H:%M:%S')}"
+            print(line)
+            print(f"      webhook: {message['webhook_url'][:50]}...")
+            if message['last_error']:
+                print(f"      错误: {message['last_error']}")
+        return counts.get(MESSAGE_FAILED, 0) == 0
+    finally:
+        outbox.close(flush_timeout=0)
+
+def retry_slack_outbox() -> bool:
+    """把发送失败的消息重新放回Slack发件箱并立即尝试发送"""
+    from src.reporter.slack_outbox import close_slack_outbox, get_slack_outbox
+    
+    outbox = get_slack_outbox()
+    if outbox is None:
+        print("⚠️  未配置 SLACK_OUTBOX_DB，报告直接发送到Slack")
+        return False
+    
+    print(f"🔁 重新发送 {outbox.requeue_failed()} 条失败的消息")
+    close_slack_outbox()
+    return True
+
 def main():
     """主函数 - 支持命令行参数"""
     parser = argparse.ArgumentParser(
@@ -126,6 +182,10 @@ def main():
   %(prog)s --validate               # 验证配置文件
   %(prog)s --types                  # 显示可用Agent类型
   %(prog)s --config ./my_tasks.yaml # 使用自定义任务配置文件
+  %(prog)s --engine async           # 使用asyncio异步引擎执行所有Agent
+  %(prog)s --engine pipeline        # 搜索/rerank/分析/发送分阶段流水线执行
+  %(prog)s --outbox                 # 查看Slack发件箱中待发送和失败的消息
+  %(prog)s --outbox-retry           # 重新发送失败的消息
 
 任务配置文件结构:
   config/tasks.yaml        # 统一的任务配置文件
@@ -175,6 +235,14 @@ def main():
         help='串行执行模式'
     )
     
+    parser.add_argument(
+        '--engine', '-e',
+        choices=['thread', 'async', 'pipeline'],
+        default='thread',
+        help='执行引擎: thread（线程池，默认）、async（asyncio异步，并发数按 global.concurrency 限制）'
+             '或 pipeline（分阶段流水线，各阶段线程数按 global.pipeline 配置）'
+    )
+    
     parser.add_argument(
         '--list', '-l',
         action='store_true',
@@ -193,12 +261,31 @@ def main():
         help='显示可用的Agent类型'
     )
     
+    parser.add_argument(
+        '--outbox',
+        action='store_true',
+        help='查看Slack发件箱中待发送和发送失败的消息（需要配置 SLACK_OUTBOX_DB）'
+    )
+    
+    parser.add_argument(
+        '--outbox-retry',
+        action='store_true',
+        help='把发送失败的消息重新放回Slack发件箱并立即尝试发送'
+    )
+    
     args = parser.parse_args()
     
     # 处理并行/串行参数
     parallel = not args.serial
     
     try:
+        # 发件箱命令不需要加载任务配置
+        if args.outbox:
+            sys.exit(0 if show_slack_outbox() else 1)
+        
+        if args.outbox_retry:
+            sys.exit(0 if retry_slack_outbox() else 1)
+        
         # 初始化Agent运行器
         runner = AgentRunner(args.config)
         
@@ -225,7 +312,7 @@ def main():
             success = runner.run_single(args.agent)
         else:
             # 执行所有Agent（默认行为）
-            success = runner.run_all(parallel=parallel)
+            success = runner.run_all(parallel=parallel, engine=args.engine)
         
         if success:
             print("✅ 任务执行成功！")
@@ -3,17 +3,34 @@
 智能任务调度器
 
 自动读取所有配置文件，根据每个任务的schedule字段判断是否需要在当前时间运行。
-这个脚本应该每分钟由cron调用一次，它会检查所有任务并运行到期的任务。
+这个脚本可以每分钟由cron调用一次，它会检查所有任务并运行到期的任务；
+也可以通过 --daemon 以常驻进程方式运行，在内存中维护下一次触发时间的最小堆，
+休眠到最早的触发时间再执行，Agent和客户端在多次运行之间保持复用。
+
+守护模式通过 --metrics-port 提供Prometheus的/metrics端点（包含worker进程每个任务完成后发来的指标）；
+cron模式每次运行结束后把指标累加写入 --metrics-textfile 指定的文件，供node_exporter的textfile collector采集。
+
+多个副本（容器）同时运行时，通过 --lease-db 指定共享的SQLite租约数据库，
+每个 (任务, 计划触发时间) 只会由一个副本执行；各副本在执行每个任务前才认领，
+同一分钟到期的多个任务会分散到空闲的副本上。
+
+--workers N 时调度器只把到期的 (任务, 计划触发时间) 加入持久化的SQLite任务队列，
+由N个worker进程并行执行：慢任务只占用一个worker，进程崩溃后未完成的任务在可见性超时后
+由其他worker接手，失败的任务按指数退避重试。
 """
 
 import os
 import sys
-import yaml
 import glob
+import heapq
+import signal
+import argparse
+import threading
+import multiprocessing
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from croniter import croniter
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent
@@ -31,15 +48,62 @@ try:
 except ImportError:
     print("警告: python-dotenv 未安装，将直接使用环境变量")
 
-from src.reporter.task_scheduler import TaskScheduler
+from src.reporter.config_snapshot import ConfigSnapshot, get_config_cache
+
+# TaskScheduler（及Agent、HTTP和LLM SDK）只在有任务需要运行时才导入，
+# 保证cron每分钟调用时没有到期任务的情况下快速退出
+if TYPE_CHECKING:
+    from src.reporter.task_scheduler import TaskScheduler
+    from src.reporter.task_lease import TaskLeaseStore
+    from src.reporter.job_queue import JobQueue
 
 class SmartScheduler:
     """智能调度器 - 根据配置文件中的schedule字段执行任务"""
     
-    def __init__(self):
-        self.config_dir = project_root / "config"
+    # 守护模式下重新扫描配置文件的间隔（秒）
+    RESCAN_INTERVAL = 60
+    
+    # 守护模式下worker在队列为空时的轮询间隔（秒）
+    WORKER_POLL_INTERVAL = 1
+    
+    def __init__(self, config_dir: Optional[Path] = None, metrics_port: int = 0,
+                 metrics_textfile: Optional[str] = None, lease_db: Optional[str] = None,
+                 lease_seconds: float = 900, replica_id: Optional[str] = None,
+                 workers: int = 0, job_queue_db: Optional[str] = None, slack_outbox_db: Optional[str] = None,
+                 metrics_host: str = '127.0.0.1'):
+        self.config_dir = Path(config_dir) if config_dir else project_root / "config"
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.metrics_textfile = metrics_textfile
+        self.lease_db = lease_db
+        self.lease_seconds = lease_seconds
+        self.replica_id = replica_id
+        # 多副本任务认领（有任务需要执行时才打开数据库）
+        self._task_leases: Optional['TaskLeaseStore'] = None
+        # 任务队列和worker进程（workers为0时在调度器进程内直接执行任务）
+        self.workers = workers
+        self.job_queue_db = job_queue_db
+        self._job_queue: Optional['JobQueue'] = None
+        self._worker_processes: List[multiprocessing.Process] = []
+        self._worker_stop = None
+        # 守护模式下worker进程每个任务完成后把指标增量发送到调度器进程，由/metrics端点一并提供
+        self._metrics_queue = None
+        self._metrics_collector: Optional[threading.Thread] = None
+        # Slack发件箱（Agent通过客户端注册表使用；这里只用于空闲时投递等待重试的消息）
+        self.slack_outbox_db = slack_outbox_db
         self.current_time = datetime.now()
         
+        # 守护模式状态：按配置文件缓存的TaskScheduler（保持Agent和客户端常驻）
+        self._schedulers: Dict[str, 'TaskScheduler'] = {}
+        # 配置文件 -> 编译后的配置快照，用于检测配置变化
+        self._config_snapshots: Dict[str, ConfigSnapshot] = {}
+        # (配置文件, 任务ID) -> 任务配置
+        self._tasks: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # 下一次触发时间的最小堆: (触发时间, 序号, 配置文件, 任务ID)
+        self._fire_heap: List[Tuple[datetime, int, str, str]] = []
+        self._heap_seq = 0
+        self._stop_event = threading.Event()
+        
     def find_config_files(self) -> List[Path]:
         """查找所有任务配置文件"""
         config_files = set()  # 使用set避免重复
@@ -54,16 +118,11 @@ class SmartScheduler:
     def load_tasks_from_config(self, config_file: Path) -> List[Dict[str, Any]]:
         """从配置文件加载任务列表"""
         try:
-            with open(config_file, 'r', encoding='utf-8') as file:
-                config_data = yaml.safe_load(file)
+            # 配置未变化时直接使用编译缓存，不再解析YAML；执行任务时TaskScheduler共享同一份快照
+            snapshot = get_config_cache().load(str(config_file))
             
-            tasks = config_data.get('tasks', [])
-            
-            # 为每个任务添加配置文件信息
-            for task in tasks:
-                task['_config_file'] = str(config_file)
-            
-            return tasks
+            # 为每个任务添加配置文件信息（复制一份，不修改缓存中的任务配置）
+            return [dict(task.task, _config_file=str(config_file)) for task in snapshot.tasks]
         except Exception as e:
             print(f"❌ 加载配置文件失败 {config_file}: {str(e)}")
             return []
@@ -107,8 +166,9 @@ class SmartScheduler:
                 if not schedule:
                     continue
                 
-                # 判断是否需要运行
+                # 判断是否需要运行（计划触发时间即当前分钟，用于多副本认领）
                 if self.should_run_now(schedule):
+                    task['_fire_time'] = self.current_time.replace(second=0, microsecond=0)
                     tasks_to_run.append(task)
                     print(f"✅ 任务需要运行: {task.get('name', task.get('id'))} (来源: {config_file.name})")
         
@@ -124,8 +184,8 @@ class SmartScheduler:
             print(f"📄 配置文件: {config_file}")
             print(f"⏰ 调度: {task.get('schedule')}")
             
-            # 创建任务调度器并运行指定任务
-            scheduler = TaskScheduler(config_file)
+            # 获取任务调度器并运行指定任务（守护模式下复用已加载的调度器）
+            scheduler = self._get_task_scheduler(config_file)
             result = scheduler.execute_agent_by_id(task_id)
             
             success = result.get('success', False)
@@ -140,6 +200,52 @@ class SmartScheduler:
             print(f"❌ 任务执行异常: {str(e)}")
             return False
     
+    def _get_task_leases(self) -> Optional['TaskLeaseStore']:
+        """获取多副本租约存储（未配置租约数据库时返回None）"""
+        if self.lease_db and self._task_leases is None:
+            from src.reporter.task_lease import TaskLeaseStore
+            self._task_leases = TaskLeaseStore(self.lease_db, self.replica_id, self.lease_seconds)
+            print(f"🔐 多副本任务认领: {self.lease_db} (副本 {self._task_leases.replica_id})")
+        return self._task_leases
+    
+    def run_claimed_task(self, task: Dict[str, Any], release_on_failure: bool = False) -> Optional[bool]:
+        """
+        认领并运行任务（未配置租约数据库时直接运行）
+        
+        Args:
+            task: 任务配置
+            release_on_failure: 执行失败时释放租约（任务稍后由本副本重试）
+        
+        Returns:
+            任务是否执行成功；已由其他副本认领时返回None
+        """
+        task_key = f"{Path(task['_config_file']).name}:{task.get('id', 'unknown')}"
+        fire_time = task.get('_fire_time') or self.current_time.replace(second=0, microsecond=0)
+        
+        try:
+            leases = self._get_task_leases()
+            claimed = leases.claim(task_key, fire_time) if leases is not None else True
+        except Exception as e:
+            # 租约数据库不可用时仍然执行，宁可重复发送也不漏发报告
+            print(f"⚠️  认领任务失败，直接执行: {task_key} ({str(e)})")
+            leases, claimed = None, True
+        
+        if not claimed:
+            print(f"⏭️  任务已由其他副本认领: {task.get('name', task.get('id'))} @ {fire_time.strftime('%Y-%m-%d %H:%M')}")
+            return None
+        
+        success = self.run_task(task)
+        
+        if leases is not None:
+            try:
+                if success or not release_on_failure:
+                    leases.complete(task_key, fire_time, success)
+                else:
+                    leases.release(task_key, fire_time)
+            except Exception as e:
+                print(f"⚠️  更新任务租约失败: {task_key} ({str(e)})")
+        return success
+    
     def run(self):
         """运行智能调度器"""
         print(f"🕐 智能调度器启动 - {self.current_time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -147,8 +253,12 @@ class SmartScheduler:
         # 获取需要运行的任务
         tasks_to_run = self.get_tasks_to_run()
         
+        if self.workers > 0:
+            return self._run_with_workers(tasks_to_run)
+        
         if not tasks_to_run:
             print("😴 当前时间没有需要运行的任务")
+            self._deliver_slack_outbox()
             return True
         
         print(f"\n🎯 发现 {len(tasks_to_run)} 个待运行任务")
@@ -163,22 +273,508 @@ class SmartScheduler:
         
         total_success = 0
         total_tasks = len(tasks_to_run)
+        skipped = 0
         
-        # 分组执行任务
+        # 分组执行任务（每个任务执行前才认领，其他副本可以同时认领后面的任务）
         for config_file, tasks in config_groups.items():
             print(f"\n📂 处理配置文件: {Path(config_file).name}")
             for task in tasks:
-                if self.run_task(task):
+                success = self.run_claimed_task(task)
+                if success is None:
+                    skipped += 1
+                elif success:
                     total_success += 1
         
-        print(f"\n📊 执行完成: {total_success}/{total_tasks} 个任务成功")
+        total_tasks -= skipped
+        skipped_note = f"（{skipped} 个由其他副本执行）" if skipped else ""
+        print(f"\n📊 执行完成: {total_success}/{total_tasks} 个任务成功{skipped_note}")
+        self._write_metrics_textfile()
         return total_success == total_tasks
+    
+    def _get_job_queue(self) -> 'JobQueue':
+        """获取任务队列（首次使用时打开数据库）"""
+        if self._job_queue is None:
+            from config.config import Config
+            from src.reporter.job_queue import JobQueue
+            config = Config()
+            self._job_queue = JobQueue(
+                self.job_queue_db or config.job_queue_db,
+                visibility_timeout=config.job_visibility_timeout,
+                max_attempts=config.job_max_attempts,
+                retry_delay=config.job_retry_delay,
+            )
+        return self._job_queue
+    
+    def _enqueue_tasks(self, tasks: List[Dict[str, Any]]) -> List[int]:
+        """把到期任务加入队列，返回新加入的任务ID（同一次触发已在队列中时不重复加入）"""
+        queue = self._get_job_queue()
+        job_ids = []
+        for task in tasks:
+            fire_time = task.get('_fire_time') or self.current_time.replace(second=0, microsecond=0)
+            job_id = queue.enqueue(task['_config_file'], task.get('id', 'unknown'), fire_time,
+                                   task.get('name'), task.get('schedule'))
+            if job_id is None:
+                print(f"⏭️  任务已在队列中: {task.get('name', task.get('id'))} @ {fire_time.strftime('%Y-%m-%d %H:%M')}")
+            else:
+                job_ids.append(job_id)
+        print(f"📥 已加入任务队列: {len(job_ids)} 个任务")
+        return job_ids
+    
+    def _run_with_workers(self, tasks_to_run: List[Dict[str, Any]]) -> bool:
+        """cron模式：把到期任务加入队列，启动worker进程执行到队列中没有可执行的任务为止"""
+        queue = self._get_job_queue()
+        if not tasks_to_run and not queue.has_ready_jobs():
+            print("😴 当前时间没有需要运行的任务")
+            self._deliver_slack_outbox()
+            return True
+        
+        job_ids = self._enqueue_tasks(tasks_to_run)
+        self._start_workers(drain=True)
+        for process in self._worker_processes:
+            process.join()
+        
+        counts = queue.counts(job_ids)
+        print(f"\n📊 队列执行完成: 成功 {counts.get('done', 0)}, 由其他副本执行 {counts.get('skipped', 0)}, "
+              f"等待重试 {counts.get('queued', 0)}, 执行中 {counts.get('running', 0)}, 失败 {counts.get('failed', 0)}")
+        return counts.get('failed', 0) == 0 and counts.get('queued', 0) == 0
+    
+    def _worker_options(self) -> Dict[str, Any]:
+        """worker进程创建SmartScheduler的参数（worker不开启/metrics端点，也不再启动worker）"""
+        return {
+            'config_dir': str(self.config_dir),
+            'metrics_textfile': self.metrics_textfile,
+            'lease_db': self.lease_db,
+            'lease_seconds': self.lease_seconds,
+            'replica_id': self.replica_id,
+            'job_queue_db': self._get_job_queue().db_path,
+            'slack_outbox_db': self.slack_outbox_db,
+        }
+    
+    def _start_worker(self, index: int, drain: bool) -> multiprocessing.Process:
+        """启动一个worker进程（spawn方式，不继承父进程的HTTP连接和客户端）"""
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(
+            target=_worker_main,
+            args=(self._worker_options(), index, self._worker_stop, drain, self._metrics_queue),
+            name=f"reporter-worker-{index}",
+        )
+        process.start()
+        return process
+    
+    def _start_workers(self, drain: bool):
+        """
+        启动worker进程
+        
+        Args:
+            drain: True表示队列中没有可执行的任务时worker退出（cron模式），False表示持续轮询（守护模式）
+        """
+        context = multiprocessing.get_context('spawn')
+        self._worker_stop = context.Event()
+        if not drain:
+            from src.reporter.metrics import start_metrics_collector
+            self._metrics_queue = context.Queue()
+            self._metrics_collector = start_metrics_collector(self._metrics_queue)
+        self._worker_processes = [self._start_worker(index, drain) for index in range(1, self.workers + 1)]
+        print(f"👷 已启动 {self.workers} 个worker进程")
+    
+    def _restart_dead_workers(self):
+        """守护模式：重新启动意外退出的worker进程"""
+        for position, process in enumerate(self._worker_processes):
+            if process.is_alive():
+                continue
+            index = position + 1
+            print(f"⚠️  worker {index} 已退出（退出码 {process.exitcode}），重新启动")
+            self._worker_processes[position] = self._start_worker(index, drain=False)
+    
+    def _stop_workers(self):
+        """通知worker进程在当前任务完成后退出，并等待退出"""
+        if self._worker_stop is None:
+            return
+        self._worker_stop.set()
+        for process in self._worker_processes:
+            process.join()
+        print(f"👷 {len(self._worker_processes)} 个worker进程已退出")
+        
+        # worker进程退出前发送的指标都已在队列中，合并完成后再写入textfile
+        if self._metrics_collector is not None:
+            self._metrics_queue.put(None)
+            self._metrics_collector.join()
+            self._metrics_collector = None
+            self._write_metrics_textfile()
+    
+    def run_worker(self, worker_id: str, stop_event, drain: bool, metrics_queue=None):
+        """
+        worker进程主循环：从队列取出任务执行，直到收到停止信号（drain为True时队列中没有可执行的任务也退出）
+        
+        Args:
+            worker_id: worker标识（队列中记录执行者）
+            stop_event: 停止事件（multiprocessing.Event）
+            drain: 队列中没有可执行的任务时是否退出
+            metrics_queue: 守护模式下发送指标增量的队列（multiprocessing.Queue），None表示退出时写入textfile
+        """
+        queue = self._get_job_queue()
+        if metrics_queue is not None:
+            from src.reporter.metrics import forward_metrics
+        print(f"👷 worker {worker_id} 启动")
+        
+        while not stop_event.is_set():
+            job = queue.dequeue(worker_id)
+            if job is None:
+                if drain:
+                    break
+                stop_event.wait(self.WORKER_POLL_INTERVAL)
+                continue
+            self._run_job(queue, job, worker_id)
+            if metrics_queue is not None:
+                forward_metrics(metrics_queue)
+        
+        if metrics_queue is not None:
+            # 守护模式：指标已发送到调度器进程，由调度器进程提供/metrics并在退出时写入textfile
+            forward_metrics(metrics_queue)
+        else:
+            # cron模式：每个worker进程退出时写入一次自己的指标（textfile按进程累加）
+            self._write_metrics_textfile()
+        if self._schedulers:
+            from src.reporter.client_registry import get_client_registry
+            get_client_registry().close()
+        if self._task_leases is not None:
+            self._task_leases.close()
+        queue.close()
+        print(f"👷 worker {worker_id} 退出")
+    
+    def _run_job(self, queue: 'JobQueue', job: Dict[str, Any], worker_id: str):
+        """执行队列中的一个任务，执行期间定期延长可见性超时"""
+        task = {
+            'id': job['task_id'],
+            'name': job['task_name'] or job['task_id'],
+            'schedule': job['schedule'],
+            '_config_file': job['config_file'],
+            '_fire_time': job['fire_time'],
+        }
+        self.current_time = datetime.now()
+        print(f"\n📤 worker {worker_id} 取出任务 #{job['id']}: {task['name']} "
+              f"@ {job['fire_time'].strftime('%Y-%m-%d %H:%M')} (第 {job['attempts']} 次尝试)")
+        
+        finished = threading.Event()
+        
+        def heartbeat():
+            while not finished.wait(queue.visibility_timeout / 3):
+                try:
+                    queue.extend(job['id'], worker_id)
+                except Exception as e:
+                    print(f"⚠️  延长任务可见性超时失败 #{job['id']}: {str(e)}")
+        
+        heartbeat_thread = threading.Thread(target=heartbeat, name=f"job-heartbeat-{job['id']}", daemon=True)
+        heartbeat_thread.start()
+        try:
+            success = self.run_claimed_task(task, release_on_failure=not queue.is_final_attempt(job))
+        finally:
+            finished.set()
+            heartbeat_thread.join()
+        
+        status = queue.complete(job['id'], worker_id, success, None if success is not False else '任务执行失败')
+        if status == 'queued':
+            print(f"🔁 任务 #{job['id']} 执行失败，稍后重试")
+        elif status == 'failed':
+            print(f"❌ 任务 #{job['id']} 重试 {job['attempts']} 次后仍然失败")
+    
+    def _deliver_slack_outbox(self):
+        """没有任务执行时也投递发件箱中等待重试的消息（未配置发件箱时不导入，保持快速退出）"""
+        if not self.slack_outbox_db:
+            return
+        from src.reporter.slack_outbox import close_slack_outbox, get_slack_outbox
+        get_slack_outbox()
+        close_slack_outbox()
+    
+    def _write_metrics_textfile(self):
+        """把本次运行的指标累加写入textfile（空闲的cron调用不写入，保持快速退出）"""
+        if not self.metrics_textfile:
+            return
+        try:
+            from src.reporter.metrics import get_metrics
+            get_metrics().write_textfile(self.metrics_textfile)
+            print(f"📈 指标已写入: {self.metrics_textfile}")
+        except Exception as e:
+            print(f"⚠️  写入指标文件失败: {str(e)}")
+    
+    def _get_task_scheduler(self, config_file: str) -> 'TaskScheduler':
+        """
+        获取配置文件对应的TaskScheduler，已加载的实例会被复用
+        
+        复用的实例在返回前按配置文件的stat检查是否需要重新加载，
+        长期运行的worker不经过守护模式的配置刷新，也能使用最新的任务定义
+        """
+        scheduler = self._schedulers.get(config_file)
+        if scheduler is None:
+            from src.reporter.task_scheduler import TaskScheduler
+            scheduler = TaskScheduler(config_file)
+            self._schedulers[config_file] = scheduler
+        else:
+            scheduler.reload()
+        return scheduler
+    
+    def _next_fire_time(self, schedule: str, base_time: datetime) -> Optional[datetime]:
+        """计算base_time之后的下一次触发时间"""
+        try:
+            return croniter(schedule, base_time).get_next(datetime)
+        except Exception as e:
+            print(f"❌ 解析cron表达式失败 '{schedule}': {str(e)}")
+            return None
+    
+    def _previous_fire_time(self, schedule: str, base_time: datetime) -> Optional[datetime]:
+        """计算base_time之前最近的一次触发时间"""
+        try:
+            return croniter(schedule, base_time).get_prev(datetime)
+        except Exception as e:
+            print(f"❌ 解析cron表达式失败 '{schedule}': {str(e)}")
+            return None
+    
+    def _push_fire(self, fire_time: datetime, config_file: str, task_id: str):
+        """将任务的下一次触发时间加入最小堆"""
+        self._heap_seq += 1
+        heapq.heappush(self._fire_heap, (fire_time, self._heap_seq, config_file, task_id))
+    
+    def _refresh_config_files(self, now: datetime) -> bool:
+        """
+        检查配置文件变化，只重新调度新增或修改过的任务
+        
+        Returns:
+            有配置变化返回True
+        """
+        current_files = {}
+        for config_file in self.find_config_files():
+            try:
+                current_files[str(config_file)] = get_config_cache().load(str(config_file))
+            except Exception as e:
+                print(f"❌ 加载配置文件失败 {config_file.name}: {str(e)}")
+        
+        changed_files = [
+            f for f, snapshot in current_files.items()
+            if self._config_snapshots.get(f) is not snapshot
+        ]
+        removed_files = [f for f in self._config_snapshots if f not in current_files]
+        
+        if not changed_files and not removed_files:
+            return False
+        
+        # 需要重新计算触发时间的任务
+        changed_tasks = set()
+        
+        for config_file in removed_files:
+            print(f"🗑️  配置文件已删除: {Path(config_file).name}")
+            del self._config_snapshots[config_file]
+            if self._schedulers.pop(config_file, None) is not None:
+                from src.reporter.rate_limiter import get_rate_limiter
+                get_rate_limiter().remove_source(config_file)
+            for key in [k for k in self._tasks if k[0] == config_file]:
+                del self._tasks[key]
+        
+        for config_file in changed_files:
+            snapshot = current_files[config_file]
+            changed_ids, removed_ids = snapshot.changed_task_ids(self._config_snapshots.get(config_file))
+            print(f"🔄 加载配置文件: {Path(config_file).name} (变化 {len(changed_ids)} 个任务, 删除 {len(removed_ids)} 个任务)")
+            self._config_snapshots[config_file] = snapshot
+            
+            # 已加载的调度器丢弃变化任务的Agent（下次执行时重新创建），未变化的Agent和客户端保持常驻
+            scheduler = self._schedulers.get(config_file)
+            if scheduler is not None:
+                scheduler.reload()
+            
+            for key in [k for k in self._tasks if k[0] == config_file]:
+                del self._tasks[key]
+            for task in snapshot.tasks:
+                if not task.task.get('enabled', True) or not task.task.get('schedule'):
+                    continue
+                self._tasks[(config_file, task.task_id)] = dict(task.task, _config_file=config_file)
+            changed_tasks.update((config_file, task_id) for task_id in changed_ids)
+        
+        # 重建触发堆：未变化的任务保留原有触发时间
+        old_fires = {
+            (config_file, task_id): fire_time
+            for fire_time, _, config_file, task_id in self._fire_heap
+        }
+        self._fire_heap = []
+        for (config_file, task_id), task in self._tasks.items():
+            fire_time = None
+            if (config_file, task_id) not in changed_tasks:
+                fire_time = old_fires.get((config_file, task_id))
+            if fire_time is None:
+                fire_time = self._next_fire_time(task['schedule'], now)
+            if fire_time is not None:
+                self._push_fire(fire_time, config_file, task_id)
+        
+        print(f"📋 已调度 {len(self._fire_heap)} 个任务")
+        return True
+    
+    def _pop_due_tasks(self, now: datetime) -> List[Dict[str, Any]]:
+        """
+        弹出所有已到期的任务，并按计划时间推入下一次触发
+        
+        前面的任务执行较久时，后面的触发会延迟执行：延迟的触发只要还没有被下一次计划触发取代
+        （在一个调度周期内）就补跑一次；错过多个触发时只补跑最近的一次。
+        """
+        due_tasks = []
+        
+        while self._fire_heap and self._fire_heap[0][0] <= now:
+            fire_time, _, config_file, task_id = heapq.heappop(self._fire_heap)
+            task = self._tasks.get((config_file, task_id))
+            if task is None:
+                continue
+            
+            # 基于计划触发时间（而不是当前时间）计算下一次，避免漂移
+            next_fire = self._next_fire_time(task['schedule'], fire_time)
+            if next_fire is None or next_fire > now:
+                due_tasks.append(dict(task, _fire_time=fire_time))
+            else:
+                # 下一次触发也已到期，跳过这一次，直接推入最近一次到期的触发
+                print(f"⏭️  跳过错过的触发: {task_id} @ {fire_time.strftime('%Y-%m-%d %H:%M')}")
+                latest_fire = self._previous_fire_time(task['schedule'], now)
+                if latest_fire is not None and latest_fire > next_fire:
+                    next_fire = latest_fire
+            if next_fire is not None:
+                self._push_fire(next_fire, config_file, task_id)
+        
+        return due_tasks
+    
+    def stop(self, *_):
+        """停止守护模式"""
+        print("\n🛑 收到停止信号，守护调度器即将退出")
+        self._stop_event.set()
+    
+    def run_forever(self):
+        """以守护模式运行：休眠到最早的触发时间，执行到期任务"""
+        print(f"🕐 守护调度器启动 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        
+        if self.metrics_port:
+            from src.reporter.metrics import get_metrics
+            get_metrics().start_http_server(self.metrics_port, self.metrics_host)
+        
+        if self.workers > 0:
+            self._start_workers(drain=False)
+        
+        # 守护进程常驻发送线程，投递之前遗留和worker进程写入的发件箱消息
+        if self.slack_outbox_db:
+            from src.reporter.slack_outbox import get_slack_outbox
+            get_slack_outbox()
+        
+        next_rescan = datetime.now()
+        
+        while not self._stop_event.is_set():
+            now = datetime.now()
+            
+            if now >= next_rescan:
+                self._refresh_config_files(now)
+                next_rescan = now + timedelta(seconds=self.RESCAN_INTERVAL)
+                if self.workers > 0:
+                    self._restart_dead_workers()
+            
+            due_tasks = self._pop_due_tasks(now)
+            if due_tasks:
+                self.current_time = now
+                print(f"\n🎯 {now.strftime('%Y-%m-%d %H:%M:%S')} 发现 {len(due_tasks)} 个到期任务")
+                if self.workers > 0:
+                    self._enqueue_tasks(due_tasks)
+                    continue
+                results = [self.run_claimed_task(task) for task in due_tasks]
+                executed = [success for success in results if success is not None]
+                skipped_note = f"（{len(results) - len(executed)} 个由其他副本执行）" if len(executed) < len(results) else ""
+                print(f"📊 执行完成: {sum(executed)}/{len(executed)} 个任务成功{skipped_note}")
+                continue
+            
+            # 休眠到最早的触发时间或下一次配置扫描
+            wake_time = next_rescan
+            if self._fire_heap and self._fire_heap[0][0] < wake_time:
+                wake_time = self._fire_heap[0][0]
+            timeout = (wake_time - datetime.now()).total_seconds()
+            if timeout > 0:
+                self._stop_event.wait(timeout)
+        
+        self._stop_workers()
+        
+        # 关闭所有Agent共享的OpenAI客户端和HTTP连接池（先发送发件箱中剩余的消息）
+        if self.slack_outbox_db:
+            from src.reporter.slack_outbox import close_slack_outbox
+            close_slack_outbox()
+        if self._schedulers:
+            from src.reporter.client_registry import get_client_registry
+            registry = get_client_registry()
+            registry.print_stats()
+            registry.close()
+        if self._task_leases is not None:
+            self._task_leases.close()
+        if self._job_queue is not None:
+            self._job_queue.close()
+        
+        print("👋 守护调度器已退出")
+        return True
+
+def _worker_main(options: Dict[str, Any], index: int, stop_event, drain: bool, metrics_queue=None):
+    """worker进程入口"""
+    # 停止信号只通知worker在当前任务完成后退出（守护进程收到SIGTERM时同样会设置stop_event）
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    
+    from src.reporter.task_lease import default_replica_id
+    scheduler = SmartScheduler(**options)
+    scheduler.run_worker(f"worker-{index}@{default_replica_id()}", stop_event, drain, metrics_queue)
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="智能任务调度器")
+    parser.add_argument(
+        '--daemon', '-d',
+        action='store_true',
+        help='以常驻守护进程方式运行（替代每分钟的cron调用）'
+    )
+    parser.add_argument(
+        '--config-dir',
+        type=Path,
+        help='任务配置文件目录（默认：项目的 config/ 目录）'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='守护模式下/metrics端点的端口，0表示不开启（默认：环境变量 METRICS_PORT 或 9464）'
+    )
+    parser.add_argument(
+        '--metrics-textfile',
+        help='cron模式下运行结束后写入指标的文件，供node_exporter采集（默认：环境变量 METRICS_TEXTFILE）'
+    )
+    parser.add_argument(
+        '--lease-db',
+        help='多副本共享的任务租约数据库，每次触发只由一个副本执行（默认：环境变量 TASK_LEASE_DB，为空表示单副本）'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='执行任务的worker进程数，0表示在调度器进程内直接执行（默认：环境变量 SCHEDULER_WORKERS 或 0）'
+    )
+    parser.add_argument(
+        '--job-queue-db',
+        help='worker模式下的任务队列数据库（默认：环境变量 JOB_QUEUE_DB 或 缓存目录下的 job_queue.db）'
+    )
+    args = parser.parse_args()
+    
     try:
-        scheduler = SmartScheduler()
-        success = scheduler.run()
+        from config.config import Config
+        config = Config()
+        metrics_port = args.metrics_port if args.metrics_port is not None else config.metrics_port
+        metrics_textfile = args.metrics_textfile or config.metrics_textfile
+        
+        lease_db = args.lease_db or config.task_lease_db
+        workers = args.workers if args.workers is not None else config.scheduler_workers
+        
+        scheduler = SmartScheduler(args.config_dir, metrics_port, metrics_textfile,
+                                   lease_db, config.task_lease_seconds, config.replica_id,
+                                   workers, args.job_queue_db or config.job_queue_db, config.slack_outbox_db,
+                                   metrics_host=config.metrics_host)
+        if args.daemon:
+            success = scheduler.run_forever()
+        else:
+            success = scheduler.run()
         
         if success:
             print("✅ 智能调度器执行成功")
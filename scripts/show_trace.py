@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+查看Agent执行的trace
+
+读取 TRACE_FILE 或 --file 指定的文件（包括轮转出的旧文件）中的span，
+不带参数时列出最近的执行记录（--task 只看指定任务）；指定trace ID（前缀即可）或 --last 时
+按时间轴渲染该次执行的瀑布图，显示搜索、rerank、DeepSeek分析和Slack发送各自的耗时和属性。
+
+用法:
+    python scripts/show_trace.py                  # 最近20次执行
+    python scripts/show_trace.py --last           # 最近一次执行的瀑布图
+    python scripts/show_trace.py --task daily_news --last
+    python scripts/show_trace.py 3f2a9c
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from dotenv import load_dotenv
+    # 加载.env文件，TRACE_FILE可能在其中配置
+    env_file = project_root / ".env"
+    if env_file.exists():
+        load_dotenv(env_file)
+except ImportError:
+    pass
+
+from config.config import Config
+from src.reporter.tracing import JsonlSpanExporter
+
+# 瀑布图中不重复显示的属性（已在标题行中显示）
+_HEADER_ATTRIBUTES = {'task_id', 'agent_name', 'engine', 'success'}
+
+def load_traces(files: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """读取span文件，返回 trace_id -> span列表（按开始时间排序）"""
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for path in files:
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue
+                traces.setdefault(span['trace_id'], []).append(span)
+    for spans in traces.values():
+        spans.sort(key=lambda span: span['start'])
+    return traces
+
+def find_root(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """trace的根span（没有根span时取最早的span）"""
+    for span in spans:
+        if span['parent_id'] is None:
+            return span
+    return spans[0]
+
+def trace_summary(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """trace的摘要：开始时间、任务、引擎、总耗时、状态和耗时最长的阶段"""
+    root = find_root(spans)
+    stages = [span for span in spans if span['parent_id'] == root['span_id']]
+    slowest = max(stages, key=lambda span: span['duration_ms']) if stages else None
+    return {
+        'start': root['start'],
+        'task_id': root['attributes'].get('task_id', '-'),
+        'engine': root['attributes'].get('engine', '-'),
+        'duration_ms': root['duration_ms'],
+        'ok': all(span['status'] == 'ok' for span in spans if span is root or span['parent_id'] == root['span_id']),
+        'slowest': f"{slowest['name']} {slowest['duration_ms']:.0f}ms" if slowest else '-',
+    }
+
+def format_time(timestamp: float) -> str:
+    """格式化span开始时间"""
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+def format_attributes(attributes: Dict[str, Any]) -> str:
+    """把属性格式化为 key=value，过长的值截断"""
+    parts = []
+    for key, value in attributes.items():
+        if key in _HEADER_ATTRIBUTES:
+            continue
+        text = str(value)
+        if len(text) > 40:
+            text = text[:37] + '...'
+        parts.append(f"{key}={text}")
+    return ' '.join(parts)
+
+def print_list(traces: Dict[str, List[Dict[str, Any]]], limit: int, task_id: Optional[str]):
+    """列出最近的执行记录"""
+    summaries = [(trace_id, trace_summary(spans)) for trace_id, spans in traces.items()]
+    if task_id:
+        summaries = [item for item in summaries if item[1]['task_id'] == task_id]
+    summaries.sort(key=lambda item: item[1]['start'])
+    summaries = summaries[-limit:]
+
+    if not summaries:
+        print("📭 没有找到trace记录")
+        return
+
+    print(f"{'开始时间':<19}  {'trace':<16}  {'任务':<20} {'引擎':<8} {'总耗时':>10}  状态  最慢阶段")
+    for trace_id, summary in summaries:
+        print(f"{format_time(summary['start']):<21}  {trace_id:<16}  {summary['task_id']:<20} {summary['engine']:<8} "
+              f"{summary['duration_ms']:>9.0f}ms  {'✅' if summary['ok'] else '❌'}   {summary['slowest']}")
+
+def print_waterfall(trace_id: str, spans: List[Dict[str, Any]], width: int):
+    """按时间轴渲染一次执行的瀑布图"""
+    root = find_root(spans)
+    trace_start = min(span['start'] for span in spans)
+    trace_end = max(span['start'] + span['duration_ms'] / 1000 for span in spans)
+    total = max(trace_end - trace_start, 1e-6)
+
+    attributes = root['attributes']
+    print(f"🧭 trace {trace_id}  任务 {attributes.get('task_id', '-')} ({attributes.get('agent_name', '-')})  "
+          f"引擎 {attributes.get('engine', '-')}  {format_time(root['start'])}  总耗时 {total * 1000:.1f} ms")
+
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {span['span_id'] for span in spans}
+    for span in spans:
+        parent_id = span['parent_id'] if span['parent_id'] in span_ids else None
+        children.setdefault(parent_id, []).append(span)
+
+    rows = []
+
+    def walk(span: Dict[str, Any], depth: int):
+        rows.append((depth, span))
+        for child in children.get(span['span_id'], []):
+            walk(child, depth + 1)
+
+    for span in children.get(None, []):
+        walk(span, 0)
+
+    name_width = max(len('  ' * depth + span['name']) for depth, span in rows)
+    for depth, span in rows:
+        offset = int((span['start'] - trace_start) / total * width)
+        length = max(1, round(span['duration_ms'] / 1000 / total * width))
+        offset = min(offset, width - length)
+        bar = ' ' * offset + '█' * length + ' ' * (width - offset - length)
+        name = ('  ' * depth + span['name']).ljust(name_width)
+        status = '' if span['status'] == 'ok' else f" ❌ {span.get('error') or ''}"
+        print(f"  {name} |{bar}| {span['duration_ms']:>9.1f} ms  {format_attributes(span['attributes'])}{status}")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="查看Agent执行的trace瀑布图")
+    parser.add_argument('trace_id', nargs='?', help='要渲染的trace ID（前缀即可）')
+    parser.add_argument('--last', action='store_true', help='渲染最近一次执行')
+    parser.add_argument('--task', help='只看指定任务的执行记录（与 --last 一起使用时渲染该任务最近一次执行）')
+    parser.add_argument('--limit', type=int, default=20, help='列出的执行记录数（默认：20）')
+    parser.add_argument('--width', type=int, default=40, help='瀑布图时间轴宽度（默认：40）')
+    parser.add_argument('--file', help='trace文件（默认：环境变量 TRACE_FILE）')
+    args = parser.parse_args()
+
+    config = Config()
+    trace_file = args.file or config.trace_file
+    if not trace_file:
+        print("❌ 未配置 TRACE_FILE，请设置环境变量或使用 --file 指定trace文件")
+        sys.exit(1)
+
+    files = JsonlSpanExporter(trace_file, backup_count=config.trace_backup_count).files()
+    traces = load_traces(files)
+    if not traces:
+        print(f"📭 没有找到trace记录: {trace_file}")
+        sys.exit(0)
+
+    if args.trace_id:
+        matches = [trace_id for trace_id in traces if trace_id.startswith(args.trace_id)]
+        if len(matches) != 1:
+            print(f"❌ trace ID '{args.trace_id}' 匹配到 {len(matches)} 条记录")
+            sys.exit(1)
+        print_waterfall(matches[0], traces[matches[0]], args.width)
+    elif args.last:
+        candidates = [
+            (trace_summary(spans)['start'], trace_id) for trace_id, spans in traces.items()
+            if not args.task or find_root(spans)['attributes'].get('task_id') == args.task
+        ]
+        if not candidates:
+            print(f"📭 没有找到任务 '{args.task}' 的trace记录")
+            sys.exit(0)
+        trace_id = max(candidates)[1]
+        print_waterfall(trace_id, traces[trace_id], args.width)
+    else:
+        print_list(traces, args.limit, args.task)
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,102 @@
-from typing import Dict, Any, Type
+import importlib
+from typing import Dict, Any, Type, Union
 from .agents.base_agent import BaseAgent
-from .agents.financial_agent import FinancialAgent
+
+# 第三方Agent通过该entry point组注册，例如在pyproject.toml中：
+# [project.entry-points."reporter.agents"]
+# my_agent = "my_package.agents:MyAgent"
+ENTRY_POINT_GROUP = 'reporter.agents'
+
+def _load_entry_points() -> Dict[str, str]:
+    """读取已安装包注册的Agent entry points（只读取名称和路径，不导入模块）"""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return {}
+    
+    try:
+        all_entry_points = entry_points()
+        if hasattr(all_entry_points, 'select'):
+            group = all_entry_points.select(group=ENTRY_POINT_GROUP)
+        else:
+            group = all_entry_points.get(ENTRY_POINT_GROUP, [])
+        return {entry_point.name: entry_point.value for entry_point in group}
+    except Exception as e:
+        print(f"⚠️  读取Agent entry points失败: {str(e)}")
+        return {}
 
 class AgentFactory:
     """Agent工厂 - 根据配置自动装配Agent"""
     
-    # 注册的Agent类型映射
-    _agent_types: Dict[str, Type[BaseAgent]] = {
-        'financial': FinancialAgent,
-        'financial_news': FinancialAgent,  # 别名
-        'news': FinancialAgent,           # 别名
+    # 注册的Agent类型映射：类型名称 -> Agent类，或 "模块路径:类名" 形式的延迟导入路径
+    # （以 . 开头的模块路径相对于本包），首次创建该类型的Agent时才导入模块
+    _agent_types: Dict[str, Union[str, Type[BaseAgent]]] = {
+        'financial': '.agents.financial_agent:FinancialAgent',
+        'financial_news': '.agents.financial_agent:FinancialAgent',  # 别名
+        'news': '.agents.financial_agent:FinancialAgent',           # 别名
     }
     
+    _entry_points_loaded = False
+    
     @classmethod
-    def register_agent_type(cls, agent_type: str, agent_class: Type[BaseAgent]):
+    def register_agent_type(cls, agent_type: str, agent_class: Union[str, Type[BaseAgent]]):
         """
         注册新的Agent类型
         
         Args:
             agent_type: Agent类型名称
-            agent_class: Agent类
+            agent_class: Agent类，或 "模块路径:类名" 形式的延迟导入路径
         """
         cls._agent_types[agent_type] = agent_class
-        print(f"📝 已注册Agent类型: {agent_type} -> {agent_class.__name__}")
+        name = agent_class if isinstance(agent_class, str) else agent_class.__name__
+        print(f"📝 已注册Agent类型: {agent_type} -> {name}")
+    
+    @classmethod
+    def _ensure_entry_points(cls):
+        """首次查询时合并entry points注册的Agent类型（内置类型优先）"""
+        if cls._entry_points_loaded:
+            return
+        cls._entry_points_loaded = True
+        for agent_type, path in _load_entry_points().items():
+            cls._agent_types.setdefault(agent_type, path)
+    
+    @classmethod
+    def get_agent_class(cls, agent_type: str) -> Type[BaseAgent]:
+        """
+        获取Agent类型对应的类，必要时导入其模块
+        
+        Args:
+            agent_type: Agent类型名称
+        
+        Returns:
+            Agent类
+        
+        Raises:
+            ValueError: 当Agent类型不存在或无法导入时
+        """
+        # 内置类型无需扫描entry points
+        if agent_type not in cls._agent_types:
+            cls._ensure_entry_points()
+        if agent_type not in cls._agent_types:
+            available_types = ', '.join(cls._agent_types.keys())
+            raise ValueError(f"未知的Agent类型: {agent_type}. 可用类型: {available_types}")
+        
+        agent_class = cls._agent_types[agent_type]
+        if isinstance(agent_class, str):
+            module_path, _, class_name = agent_class.partition(':')
+            try:
+                module = importlib.import_module(module_path, package=__package__)
+                agent_class = getattr(module, class_name)
+            except (ImportError, AttributeError) as e:
+                raise ValueError(f"无法导入Agent类型 {agent_type} ({cls._agent_types[agent_type]}): {str(e)}")
+            
+            # 缓存导入结果，同一路径的别名共享
+            path = cls._agent_types[agent_type]
+            for name, value in cls._agent_types.items():
+                if value == path:
+                    cls._agent_types[name] = agent_class
+        
+        return agent_class
     
     @classmethod
     def create_agent(cls, agent_config: Dict[str, Any]) -> BaseAgent:
@@ -31,20 +105,15 @@ class AgentFactory:
         
         Args:
             agent_config: Agent配置字典
-            
+        
         Returns:
             Agent实例
-            
+        
         Raises:
             ValueError: 当Agent类型不存在时
         """
         agent_type = agent_config.get('type', 'financial')
-        
-        if agent_type not in cls._agent_types:
-            available_types = ', '.join(cls._agent_types.keys())
-            raise ValueError(f"未知的Agent类型: {agent_type}. 可用类型: {available_types}")
-        
-        agent_class = cls._agent_types[agent_type]
+        agent_class = cls.get_agent_class(agent_type)
         
         print(f"🏭 创建Agent: {agent_config.get('id', 'unknown')} (类型: {agent_type})")
         
@@ -53,17 +122,20 @@ class AgentFactory:
     @classmethod
     def get_available_types(cls) -> list[str]:
         """获取所有可用的Agent类型"""
+        cls._ensure_entry_points()
         return list(cls._agent_types.keys())
     
     @classmethod
     def validate_agent_type(cls, agent_type: str) -> bool:
         """验证Agent类型是否存在"""
+        cls._ensure_entry_points()
         return agent_type in cls._agent_types
     
     @classmethod
     def get_agent_info(cls) -> Dict[str, str]:
-        """获取所有注册的Agent类型信息"""
+        """获取所有注册的Agent类型信息（未导入的类型显示其导入路径）"""
+        cls._ensure_entry_points()
         return {
-            agent_type: agent_class.__name__
+            agent_type: agent_class if isinstance(agent_class, str) else agent_class.__name__
             for agent_type, agent_class in cls._agent_types.items()
-        } 
\ No newline at end of file
+        }
\ No newline at end of file
@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple, Callable
 from datetime import datetime
 import os
 
+from ..markdown_cleaner import StreamingMarkdownCleaner, clean_markdown
+
 class BaseAgent(ABC):
     """基础Agent抽象类 - 定义所有Agent的通用接口"""
     
@@ -72,6 +74,41 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def aexecute(self, **kwargs) -> Dict[str, Any]:
+        """
+        异步执行Agent任务
+        
+        默认实现是同步Agent的适配器：在线程池中运行execute，不阻塞事件循环。
+        支持原生异步I/O的子类可以覆盖该方法。
+        
+        Args:
+            **kwargs: 额外参数（异步引擎会传入engine，同步适配器忽略该参数）
+            
+        Returns:
+            执行结果字典，包含success, content, error等
+        """
+        kwargs.pop('engine', None)
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.execute(**kwargs))
+    
+    def get_pipeline_stages(self) -> List[Tuple[str, Callable[[Dict[str, Any]], Dict[str, Any]]]]:
+        """
+        获取流水线执行的阶段列表
+        
+        每个阶段是 (阶段名称, 阶段函数)，阶段函数接收并返回执行状态字典，
+        状态中出现 'result' 时Agent执行结束。默认整个Agent作为一个 execute 阶段，
+        子类可以拆分为 search/rerank/analyze/deliver 等阶段，让不同Agent的阶段互相重叠。
+        
+        Returns:
+            阶段列表
+        """
+        def execute_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+            state['result'] = self.execute()
+            return state
+        
+        return [('execute', execute_stage)]
+    
     def get_info(self) -> Dict[str, Any]:
         """获取Agent信息"""
         return {
@@ -116,6 +153,15 @@ class BaseAgent(ABC):
         
         return self._clean_markdown_format(content)
     
+    def create_stream_cleaner(self) -> StreamingMarkdownCleaner:
+        """
+        创建流式后处理器 - 流式输出时代替post_execute，逐段清理Markdown格式
+        
+        Returns:
+            增量清理器，所有输出拼接后与post_execute的结果一致
+        """
+        return StreamingMarkdownCleaner()
+    
     def _clean_markdown_format(self, text: str) -> str:
         """
         清理Markdown格式标记，转换为纯文本
@@ -126,45 +172,4 @@ class BaseAgent(ABC):
         Returns:
             清理后的纯文本
         """
-        if not text:
-            return text
-        
-        import re
-        
-        # 去除粗体标记 **文本** 或 __文本__
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-        text = re.sub(r'__(.*?)__', r'\1', text)
-        
-        # 去除斜体标记 *文本* 或 _文本_
-        text = re.sub(r'\*(.*?)\*', r'\1', text)
-        text = re.sub(r'_(.*?)_', r'\1', text)
-        
-        # 去除标题标记 # ## ### 等
-        text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-        
-        # 去除代码块标记 ```
-        text = re.sub(r'```[\s\S]*?```', lambda m: m.group(0).replace('```', ''), text)
-        text = re.sub(r'```', '', text)
-        
-        # 去除行内代码标记 `代码`
-        text = re.sub(r'`(.*?)`', r'\1', text)
-        
-        # 去除链接标记 [文本](链接)
-        text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-        
-        # 去除引用标记 > 
-        text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-        
-        # 将Markdown列表标记转换为简单的项目符号
-        text = re.sub(r'^[-*+]\s+', '• ', text, flags=re.MULTILINE)
-        
-        # 去除分割线 --- 或 ***
-        text = re.sub(r'^[-*]{3,}$', '', text, flags=re.MULTILINE)
-        
-        # 清理多余的空行（保留段落间的单个空行）
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        
-        # 去除行首行尾的空白字符
-        text = text.strip()
-        
-        return text 
\ No newline at end of file
+        return clean_markdown(text)
\ No newline at end of file
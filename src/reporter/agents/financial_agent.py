@@ -1,11 +1,108 @@
-from typing import Dict, Any, Optional
-import requests
+from typing import Dict, Any, Optional, Tuple, List, Callable
+import os
+import hashlib
 import json
-from openai import OpenAI
+import math
+import time
 
 from .base_agent import BaseAgent
-from ..slack_service import SlackService
-from config.config import Config
+from ..bm25 import BM25Scorer
+from ..cache import ResultCache, get_cache
+from ..change_detector import CHANGE_DELTA, CHANGE_UNCHANGED, ChangeDetector, summarize_report
+from ..client_registry import get_client_registry
+from ..context_packer import ContextPacker, token_weight
+from ..dedup import NearDuplicateDetector
+from ..http_client import get_transport
+from ..metrics import StageTimer, get_metrics
+from ..rate_limiter import get_rate_limiter
+from ..tracing import annotate, get_tracer
+
+class _Timings:
+    """记录Agent执行过程中各节点距开始执行的秒数"""
+    
+    def __init__(self):
+        self._started = time.monotonic()
+        self.marks: Dict[str, float] = {}
+    
+    def mark(self, name: str):
+        """记录节点耗时（同名节点只记录第一次）"""
+        self.marks.setdefault(name, round(time.monotonic() - self._started, 3))
+
+class _AnalysisStream:
+    """
+    收集DeepSeek流式输出 - 逐段清理Markdown格式，并执行时长和token上限
+    
+    一个chunk可能包含多个token，token数按收到的文本估算（与上下文预算的估算方式相同），
+    而不是按chunk计数；请求结束时usage中的completion_tokens为准确值。
+    """
+    
+    def __init__(self, cleaner, timeout: float, max_tokens: int, timings: Optional[_Timings]):
+        """
+        Args:
+            cleaner: 增量清理器（BaseAgent.create_stream_cleaner）
+            timeout: 整个流式输出的墙钟时间上限（秒）
+            max_tokens: 正文token上限（不含推理内容），0表示不限制
+            timings: 耗时记录，可为None
+        """
+        self._cleaner = cleaner
+        self._deadline = time.monotonic() + timeout
+        self._max_tokens = max_tokens
+        self._timings = timings
+        self._parts: List[str] = []
+        # 估算的输出token数（含推理内容）和正文token数
+        self._tokens = 0.0
+        self._content_tokens = 0.0
+        self.usage = None
+        self.truncated: Optional[str] = None
+    
+    def add(self, chunk) -> bool:
+        """
+        处理一个流式chunk
+        
+        Returns:
+            是否继续读取后续chunk
+        """
+        # 开启include_usage时最后一个chunk携带本次请求的token用量（choices为空）
+        if getattr(chunk, 'usage', None) is not None:
+            self.usage = chunk.usage
+        delta = chunk.choices[0].delta if chunk.choices else None
+        content = getattr(delta, 'content', None)
+        # deepseek-reasoner会先输出reasoning_content，计入token用量和首token耗时，
+        # 但不计入正文，也不计入正文token上限（避免推理阶段就用完上限、得到空的分析结果）
+        reasoning = getattr(delta, 'reasoning_content', None)
+        
+        if content or reasoning:
+            if self._timings is not None:
+                self._timings.mark('first_token')
+            self._tokens += token_weight(reasoning or '')
+        if content:
+            weight = token_weight(content)
+            self._tokens += weight
+            self._content_tokens += weight
+            self._parts.append(self._cleaner.feed(content))
+        
+        if self._max_tokens and self.content_tokens >= self._max_tokens:
+            self.truncated = f"token上限 {self._max_tokens}"
+            return False
+        if time.monotonic() >= self._deadline:
+            self.truncated = "时长上限"
+            return False
+        return True
+    
+    @property
+    def tokens(self) -> int:
+        """估算的输出token数（含推理内容）"""
+        return math.ceil(self._tokens)
+    
+    @property
+    def content_tokens(self) -> int:
+        """估算的正文token数"""
+        return math.ceil(self._content_tokens)
+    
+    def finish(self) -> str:
+        """结束流式输出，返回完整的清理后文本"""
+        self._parts.append(self._cleaner.finish())
+        return ''.join(self._parts)
 
 class FinancialAgent(BaseAgent):
     """财经新闻分析Agent - 使用BochaAI搜索 + DeepSeek分析"""
@@ -20,21 +117,66 @@ class FinancialAgent(BaseAgent):
         self.count = config.get('count', 50)
         self.analysis_prompt = config.get('analysis_prompt')
         
-        # 加载基础配置（API密钥等）
-        self.base_config = Config()
+        # 搜索结果缓存配置（TTL单位为秒，0表示不使用缓存）
+        self.search_cache_ttl = config.get('search_cache_ttl', 600)
+        self.search_cache_max_entries = config.get('search_cache_max_entries', 1000)
+        
+        # rerank分数缓存配置（按文档内容哈希缓存，TTL单位为秒，0表示不使用缓存）
+        self.rerank_cache_ttl = config.get('rerank_cache_ttl', 86400)
+        self.rerank_cache_max_entries = config.get('rerank_cache_max_entries', 20000)
+        
+        # rerank前的本地BM25预筛选（只把最相关的prefilter_top_n篇发送到rerank API，0表示不预筛选）
+        # 以及rerank请求超时（秒）；rerank失败或超时时使用BM25排序兜底
+        self.prefilter_top_n = config.get('prefilter_top_n', 0)
+        self.rerank_timeout = config.get('rerank_timeout', 10)
+        
+        # 近似重复文档去重（同一通稿的多个转载只保留一篇，dedup_max_distance为64位SimHash的汉明距离）
+        self.dedup = config.get('dedup', True)
+        self.dedup_max_distance = config.get('dedup_max_distance', 8)
+        self.dedup_stats: Optional[Dict[str, Any]] = None  # 最近一次执行的去重统计
+        
+        # 上下文token预算（按rerank相关性从高到低放入文档，0表示不限制）
+        self.context_max_tokens = config.get('context_max_tokens', 16000)
+        self.document_max_tokens = config.get('document_max_tokens', 1000)
+        self.context_stats: Optional[Dict[str, Any]] = None  # 最近一次执行的上下文打包统计
+        
+        # DeepSeek流式输出配置（stream_timeout为整个输出的墙钟时间上限，单位秒；
+        # stream_max_tokens为按输出文本估算的正文token上限，0表示不限制）
+        self.stream = config.get('stream', False)
+        self.stream_timeout = config.get('stream_timeout', 300)
+        self.stream_max_tokens = config.get('stream_max_tokens', 0)
+        
+        # 文档变化检测（按URL和内容哈希记录每次分析的文档集合；没有新文档时跳过分析和发送，
+        # 变化的文档比例低于change_full_ratio时只分析变化的文档，并附上上一次报告的摘要）
+        self.change_detection = config.get('change_detection', False)
+        self.change_full_ratio = config.get('change_full_ratio', 0.5)
+        self.change_summary_chars = config.get('change_summary_chars', 600)
+        self.change_detection_ttl = config.get('change_detection_ttl', 7 * 86400)
+        self.change_stats: Optional[Dict[str, Any]] = None  # 最近一次执行的变化检测统计
+        self._document_urls: Dict[str, str] = {}  # 文档 -> 来源URL
+        self._previous_summary: Optional[str] = None  # 增量分析时上一次报告的摘要
+        self._pending_fingerprint: Optional[Tuple[str, Dict[str, Any]]] = None  # 发送成功后保存的指纹
+        
+        # Slack合并窗口（秒）：同一进程内窗口期间完成的、发往同一webhook的报告合并为一条消息，0表示不合并
+        self.slack_coalesce_window = config.get('slack_coalesce_window', 0)
+        
+        # 基础配置（API密钥等）在进程内共享
+        self.base_config = get_client_registry().config
         
         # 调用父类初始化（会触发验证）
         super().__init__(config)
         
-        # 初始化DeepSeek客户端
-        self.deepseek_client = OpenAI(
-            api_key=self.base_config.deepseek_api_key,
-            base_url=self.base_config.deepseek_base_url
-        )
-        
-        # 创建Slack服务实例
+        # 获取Slack服务实例
         self._setup_slack_service()
     
+    @property
+    def deepseek_client(self):
+        """DeepSeek客户端（所有Agent共享，首次使用时导入openai并创建）"""
+        return get_client_registry().get_openai_client(
+            self.base_config.deepseek_api_key,
+            self.base_config.deepseek_base_url
+        )
+    
     def _validate_agent_config(self) -> None:
         """验证财经Agent特定配置"""
         if self.freshness not in ['day', 'week', 'month', 'year']:
@@ -43,6 +185,39 @@ class FinancialAgent(BaseAgent):
         if self.count <= 0 or self.count > 100:
             raise ValueError(f"Agent '{self.agent_id}': count值应在1-100之间")
         
+        if self.search_cache_ttl < 0:
+            raise ValueError(f"Agent '{self.agent_id}': search_cache_ttl不能为负数")
+        
+        if self.rerank_cache_ttl < 0:
+            raise ValueError(f"Agent '{self.agent_id}': rerank_cache_ttl不能为负数")
+        
+        if self.prefilter_top_n < 0:
+            raise ValueError(f"Agent '{self.agent_id}': prefilter_top_n不能为负数")
+        
+        if self.rerank_timeout <= 0:
+            raise ValueError(f"Agent '{self.agent_id}': rerank_timeout必须大于0")
+        
+        if not 0 <= self.dedup_max_distance <= 64:
+            raise ValueError(f"Agent '{self.agent_id}': dedup_max_distance应在0-64之间")
+        
+        if self.context_max_tokens < 0 or self.document_max_tokens < 0:
+            raise ValueError(f"Agent '{self.agent_id}': context_max_tokens和document_max_tokens不能为负数")
+        
+        if self.stream_timeout <= 0:
+            raise ValueError(f"Agent '{self.agent_id}': stream_timeout必须大于0")
+        
+        if self.stream_max_tokens < 0:
+            raise ValueError(f"Agent '{self.agent_id}': stream_max_tokens不能为负数")
+        
+        if not 0 < self.change_full_ratio <= 1:
+            raise ValueError(f"Agent '{self.agent_id}': change_full_ratio应在0-1之间")
+        
+        if self.change_summary_chars < 0 or self.change_detection_ttl <= 0:
+            raise ValueError(f"Agent '{self.agent_id}': change_summary_chars不能为负数，change_detection_ttl必须大于0")
+        
+        if self.slack_coalesce_window < 0:
+            raise ValueError(f"Agent '{self.agent_id}': slack_coalesce_window不能为负数")
+        
         # 验证API密钥
         if not self.base_config.bochaai_api_key:
             raise ValueError("缺少 BOCHAAI_API_KEY 环境变量")
@@ -52,14 +227,10 @@ class FinancialAgent(BaseAgent):
     
     def _setup_slack_service(self):
         """设置Slack服务"""
-        # 创建专用的Slack服务实例，完全使用YAML配置文件中的设置
-        slack_config = Config()
-        
-        # 使用YAML任务配置中的webhook，不使用环境变量
-        slack_config.slack_webhook_url = self.slack_webhook_url
-        slack_config.use_slack_blocks = self.use_slack_blocks
-        
-        self.slack_service = SlackService(slack_config)
+        # 使用YAML任务配置中的webhook，不使用环境变量；相同webhook的Agent共享同一个发送器（以及合并批次）
+        self.slack_service = get_client_registry().get_slack_service(
+            self.slack_webhook_url, self.use_slack_blocks, self.slack_coalesce_window
+        )
     
     def execute(self, **kwargs) -> Dict[str, Any]:
         """
@@ -67,231 +238,843 @@ class FinancialAgent(BaseAgent):
         
         Args:
             **kwargs: 额外参数
-            
+        
         Returns:
             执行结果字典
         """
-        try:
-            print(f"\n🚀 [{self.agent_name}] 开始执行")
-            print(f"📋 查询内容: {self.query}")
-            
-            # 步骤1: BochaAI搜索
-            search_context = self._search_with_bochaai(self.query)
-            if not search_context:
-                return {
-                    'success': False,
-                    'error': 'BochaAI搜索失败',
-                    'agent_id': self.agent_id
-                }
-            
-            # 步骤2: DeepSeek分析
-            analysis_content = self._analyze_with_deepseek(search_context, self.query)
-            if not analysis_content:
-                return {
-                    'success': False,
-                    'error': 'DeepSeek分析失败',
-                    'agent_id': self.agent_id
-                }
-            
-            # 步骤3: 发送到Slack
-            slack_success = self.slack_service.send_message(analysis_content, self.agent_name, self.query)
-            
-            result = {
-                'success': slack_success,
-                'content': analysis_content,
-                'agent_id': self.agent_id,
-                'query': self.query
-            }
-            
-            if not slack_success:
-                result['error'] = 'Slack发送失败'
+        # 声明稍后会发送一份报告：Slack合并窗口只等待仍在执行的其他Agent
+        with self.slack_service.expecting_report():
+            try:
+                print(f"\n🚀 [{self.agent_name}] 开始执行")
+                print(f"📋 查询内容: {self.query}")
+                timings = _Timings()
+                
+                # 步骤1: BochaAI搜索
+                search_context = self._search_with_bochaai(self.query)
+                timings.mark('search')
+                if not search_context:
+                    return self._search_failure_result(timings)
+                
+                # 步骤2: DeepSeek分析
+                analysis_content = self._analyze_with_deepseek(search_context, self.query, timings)
+                if not analysis_content:
+                    return self._failure_result('DeepSeek分析失败')
+                
+                # 步骤3: 发送到Slack
+                slack_success = self._send_to_slack(analysis_content)
+                
+                return self._build_result(analysis_content, slack_success, timings)
             
-            print(f"✅ [{self.agent_name}] Execution {'successful' if slack_success else 'failed'}")
-            return result
+            except Exception as e:
+                error_msg = f"Agent执行异常: {str(e)}"
+                print(f"❌ [{self.agent_name}] {error_msg}")
+                return self._failure_result(error_msg)
+    
+    async def aexecute(self, engine=None, **kwargs) -> Dict[str, Any]:
+        """
+        异步执行财经新闻分析任务（搜索、rerank、DeepSeek和Slack均为原生异步调用）
+        
+        Args:
+            engine: AsyncEngine实例，提供异步HTTP客户端和按上游的并发限制；
+                    未提供时回退到同步执行
+            **kwargs: 额外参数
+        
+        Returns:
+            执行结果字典
+        """
+        if engine is None:
+            return await super().aexecute(**kwargs)
+        
+        # 声明稍后会发送一份报告：Slack合并窗口只等待仍在执行的其他Agent
+        with self.slack_service.expecting_report():
+            try:
+                print(f"\n🚀 [{self.agent_name}] 开始执行 (async)")
+                print(f"📋 查询内容: {self.query}")
+                timings = _Timings()
+                
+                # 步骤1: BochaAI搜索
+                search_context = await self._asearch_with_bochaai(self.query, engine)
+                timings.mark('search')
+                if not search_context:
+                    return self._search_failure_result(timings)
+                
+                # 步骤2: DeepSeek分析
+                analysis_content = await self._aanalyze_with_deepseek(search_context, self.query, engine, timings)
+                if not analysis_content:
+                    return self._failure_result('DeepSeek分析失败')
+                
+                # 步骤3: 发送到Slack
+                slack_success = await self._asend_to_slack(analysis_content, engine)
+                
+                return self._build_result(analysis_content, slack_success, timings)
             
+            except Exception as e:
+                error_msg = f"Agent执行异常: {str(e)}"
+                print(f"❌ [{self.agent_name}] {error_msg}")
+                return self._failure_result(error_msg)
+    
+    def get_pipeline_stages(self) -> List[Tuple[str, Callable[[Dict[str, Any]], Dict[str, Any]]]]:
+        """拆分为 搜索 → rerank → 分析 → 发送 四个流水线阶段"""
+        return [
+            ('search', self._search_stage),
+            ('rerank', self._rerank_stage),
+            ('analyze', self._analyze_stage),
+            ('deliver', self._deliver_stage),
+        ]
+    
+    def _search_stage(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """流水线阶段: BochaAI搜索并组装文档"""
+        print(f"\n🚀 [{self.agent_name}] 开始执行 (pipeline)")
+        print(f"📋 查询内容: {self.query}")
+        state['timings'] = _Timings()
+        self._reset_run_state()
+        print(f"🔍 正在搜索: {self.query}")
+        print(f"📅 时间范围: {self.freshness}, 结果数量: {self.count}")
+        
+        try:
+            webpages = self._fetch_webpages(self.query)
         except Exception as e:
-            error_msg = f"Agent执行异常: {str(e)}"
-            print(f"❌ [{self.agent_name}] {error_msg}")
-            return {
-                'success': False,
-                'error': error_msg,
-                'agent_id': self.agent_id
-            }
+            print(f"❌ BochaAI搜索异常: {str(e)}")
+            webpages = None
+        
+        if webpages is None:
+            state['result'] = self._failure_result('BochaAI搜索失败')
+            return state
+        
+        state['documents'] = self._assemble_documents(webpages)
+        return state
+    
+    def _rerank_stage(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """流水线阶段: rerank过滤并组装上下文"""
+        documents = state['documents']
+        if documents:
+            documents = self._detect_changes(self._rerank_documents(self.query, documents))
+        
+        context = None if self._unchanged() else self._build_context(documents)
+        state['timings'].mark('search')
+        if not context:
+            state['result'] = self._search_failure_result(state['timings'])
+            return state
+        
+        state['context'] = context
+        return state
+    
+    def _analyze_stage(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """流水线阶段: DeepSeek分析"""
+        analysis_content = self._analyze_with_deepseek(state['context'], self.query, state['timings'])
+        if not analysis_content:
+            state['result'] = self._failure_result('DeepSeek分析失败')
+            return state
+        
+        state['analysis'] = analysis_content
+        return state
+    
+    def _deliver_stage(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """流水线阶段: 发送到Slack"""
+        slack_success = self._send_to_slack(state['analysis'])
+        state['result'] = self._build_result(state['analysis'], slack_success, state['timings'])
+        return state
+    
+    def _send_to_slack(self, content: str) -> bool:
+        """发送分析结果到Slack"""
+        with StageTimer(self.agent_id, 'deliver') as stage:
+            stage.success = self.slack_service.send_message(content, self.agent_name, self.query)
+        return stage.success
+    
+    async def _asend_to_slack(self, content: str, engine) -> bool:
+        """发送分析结果到Slack（异步）"""
+        with StageTimer(self.agent_id, 'deliver') as stage:
+            stage.success = await self.slack_service.asend_message(content, engine, self.agent_name, self.query)
+        return stage.success
+    
+    def _record_run(self, success: bool, status: Optional[str] = None):
+        """记录Agent执行次数和最近一次执行时间（status默认按success记为success/failure）"""
+        metrics = get_metrics()
+        status = status or ('success' if success else 'failure')
+        metrics.inc('reporter_agent_runs_total', agent=self.agent_id, status=status)
+        metrics.set('reporter_last_run_timestamp_seconds', time.time(), agent=self.agent_id)
+    
+    def _failure_result(self, error: str) -> Dict[str, Any]:
+        """构建失败结果"""
+        self._record_run(False)
+        return {
+            'success': False,
+            'error': error,
+            'agent_id': self.agent_id
+        }
+    
+    def _search_failure_result(self, timings: _Timings) -> Dict[str, Any]:
+        """搜索没有得到上下文：文档与上一次执行相同时跳过分析和发送，否则为搜索失败"""
+        if not self._unchanged():
+            return self._failure_result('BochaAI搜索失败')
+        
+        print(f"⏭️  [{self.agent_name}] 文档与上一次执行相同，跳过分析和发送")
+        # 重新保存指纹，保持上一次报告的摘要在有效期内
+        self._save_fingerprint()
+        
+        timings.mark('total')
+        self._record_run(True, 'unchanged')
+        return {
+            'success': True,
+            'skipped': True,
+            'agent_id': self.agent_id,
+            'query': self.query,
+            'change_stats': self.change_stats,
+            'timings': timings.marks
+        }
+    
+    def _build_result(self, analysis_content: str, slack_success: bool, timings: Optional[_Timings] = None) -> Dict[str, Any]:
+        """根据分析内容和Slack发送结果构建执行结果"""
+        result = {
+            'success': slack_success,
+            'content': analysis_content,
+            'agent_id': self.agent_id,
+            'query': self.query
+        }
+        
+        if not slack_success:
+            result['error'] = 'Slack发送失败'
+        elif self.slack_service.outbox is not None:
+            # 报告已写入发件箱，由后台线程投递
+            result['slack_delivery'] = 'queued'
+        
+        if self.dedup_stats is not None:
+            result['dedup_stats'] = self.dedup_stats
+        
+        if self.context_stats is not None:
+            result['context_stats'] = self.context_stats
+        
+        if self.change_stats is not None:
+            result['change_stats'] = self.change_stats
+        
+        # 发送成功后才保存本次的指纹，失败的执行重试时仍然完整分析；
+        # 已写入发件箱的报告视为成功：发件箱持久保存消息并负责重试，最终失败的消息可以重新发送
+        if slack_success:
+            self._save_fingerprint(summarize_report(analysis_content, self.change_summary_chars))
+        
+        if timings is not None:
+            timings.mark('total')
+            result['timings'] = timings.marks
+            self._print_timings(timings.marks)
+            get_metrics().observe('reporter_stage_duration_seconds', timings.marks['total'], agent=self.agent_id, stage='total')
+        
+        self._record_run(slack_success)
+        
+        print(f"✅ [{self.agent_name}] Execution {'successful' if slack_success else 'failed'}")
+        return result
+    
+    def _print_timings(self, marks: Dict[str, float]):
+        """打印各节点耗时（距开始执行的秒数）"""
+        labels = [('search', '搜索'), ('first_token', '首token'), ('analysis', '分析'), ('total', '结果')]
+        parts = [f"{label} {marks[name]:.2f}s" for name, label in labels if name in marks]
+        print(f"⏱️  [{self.agent_name}] 耗时: " + " | ".join(parts))
     
     def _search_with_bochaai(self, query: str) -> Optional[str]:
         """使用BochaAI搜索"""
-        try:
-            headers = {
-                'Authorization': f'Bearer {self.base_config.bochaai_api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            payload = {
-                'query': query,
-                'freshness': self.freshness,
-                'summary': True,  # 启用摘要功能
-                'count': self.count
-            }
-            
-            print(f"🔍 正在搜索: {query}")
-            print(f"📅 时间范围: {self.freshness}, 结果数量: {self.count}")
-            
-            response = requests.post(
-                self.base_config.bochaai_search_url,
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                summaries = []
-                
-                # 组装完整文档内容：name + snippet + summary
-                webpages = response_data.get("data", {}).get("webPages", {}).get("value", [])
-                if webpages:
-                    # 组装完整文档：标题 + 描述 + 摘要
-                    summaries = []
-                    for item in webpages:
-                        # 提取各个字段
-                        name = item.get("name", "").strip()
-                        snippet = item.get("snippet", "").strip()
-                        summary = item.get("summary", "").strip()
-                        
-                        # 组装完整文档内容
-                        document_parts = []
-                        if name:
-                            document_parts.append(f"标题: {name}")
-                        if snippet:
-                            document_parts.append(f"描述: {snippet}")
-                        if summary:
-                            document_parts.append(f"摘要: {summary}")
-                        
-                        # 合并成完整文档
-                        if document_parts:
-                            full_document = " | ".join(document_parts)
-                            summaries.append(full_document)
-                    
-                    print(f"📝 Assembled complete documents, obtained {len(summaries)} items")
-                    
-                    # 过滤有效内容
-                    valid_summaries = [s for s in summaries if s and len(s.strip()) > 20]
-                    print(f"📝 Valid document content: {len(valid_summaries)} items")
-                    
-                    if valid_summaries:
-                        summaries = valid_summaries
-                        print(f"✅ Successfully assembled title + description + summary")
+        with get_tracer().span('search', task_id=self.agent_id, query=query) as span:
+            try:
+                self._reset_run_state()
+                print(f"🔍 正在搜索: {query}")
+                print(f"📅 时间范围: {self.freshness}, 结果数量: {self.count}")
                 
-                # 如果没有获取到有效内容，输出调试信息
-                if not summaries:
-                    print(f"⚠️  未获取到有效搜索内容，原始数据条数: {len(webpages)}")
-                    if webpages:
-                        print(f"🔍 第一条数据字段: {list(webpages[0].keys())}")
+                webpages = self._fetch_webpages(query)
+                if webpages is None:
+                    span.set_error('BochaAI搜索失败')
+                    return None
                 
-                # 最终过滤，确保内容质量
-                summaries = [s for s in summaries if s and len(s.strip()) > 10]
+                summaries = self._assemble_documents(webpages)
+                span.set_attribute('documents', len(summaries))
                 
                 # 如果有搜索结果，使用rerank API过滤
                 if summaries:
-                    summaries = self._rerank_documents(query, summaries)
+                    summaries = self._detect_changes(self._rerank_documents(query, summaries))
+                    if self._unchanged():
+                        return None
+                
+                return self._trace_context(span, self._build_context(summaries))
+            
+            except Exception as e:
+                print(f"❌ BochaAI搜索异常: {str(e)}")
+                span.set_error(str(e))
+                return None
+    
+    async def _asearch_with_bochaai(self, query: str, engine) -> Optional[str]:
+        """使用BochaAI搜索（异步）"""
+        with get_tracer().span('search', task_id=self.agent_id, query=query) as span:
+            try:
+                self._reset_run_state()
+                print(f"🔍 正在搜索: {query}")
+                print(f"📅 时间范围: {self.freshness}, 结果数量: {self.count}")
                 
-                context = " ".join(summaries)
+                webpages = await self._afetch_webpages(query, engine)
+                if webpages is None:
+                    span.set_error('BochaAI搜索失败')
+                    return None
                 
-                print(f"✅ 搜索成功，获得 {len(summaries)} 条有效结果")
-                print(f"📝 Context长度: {len(context)} 字符")
+                summaries = self._assemble_documents(webpages)
+                span.set_attribute('documents', len(summaries))
                 
-                if len(context) < 100:
-                    print(f"⚠️  Context内容过短，前100字符: {context[:100]}")
+                # 如果有搜索结果，使用rerank API过滤
+                if summaries:
+                    summaries = self._detect_changes(await self._arerank_documents(query, summaries, engine))
+                    if self._unchanged():
+                        return None
                 
-                return context if context else None
-            else:
-                print(f"❌ BochaAI搜索失败，状态码: {response.status_code}")
-                print(response.text)
+                return self._trace_context(span, self._build_context(summaries))
+            
+            except Exception as e:
+                print(f"❌ BochaAI搜索异常: {str(e)}")
+                span.set_error(str(e))
                 return None
+    
+    def _trace_context(self, span, context: Optional[str]) -> Optional[str]:
+        """记录组装后的上下文大小，上下文为空时span标记为失败"""
+        if context:
+            span.set_attribute('context_bytes', len(context.encode('utf-8')))
+        else:
+            span.set_error('上下文为空')
+        return context
+    
+    def _assemble_documents(self, webpages: list) -> list:
+        """
+        将搜索结果网页组装为完整文档：标题 + 描述 + 摘要，并去除近似重复的转载
+        
+        Args:
+            webpages: BochaAI返回的网页结果列表
+        
+        Returns:
+            文档文本列表
+        """
+        summaries = []
+        self._document_urls = {}
+        
+        # 组装完整文档内容：name + snippet + summary
+        if webpages:
+            for item in webpages:
+                # 提取各个字段
+                name = item.get("name", "").strip()
+                snippet = item.get("snippet", "").strip()
+                summary = item.get("summary", "").strip()
+                
+                # 组装完整文档内容
+                document_parts = []
+                if name:
+                    document_parts.append(f"标题: {name}")
+                if snippet:
+                    document_parts.append(f"描述: {snippet}")
+                if summary:
+                    document_parts.append(f"摘要: {summary}")
                 
+                # 合并成完整文档（记录来源URL，用于变化检测）
+                if document_parts:
+                    full_document = " | ".join(document_parts)
+                    summaries.append(full_document)
+                    url = (item.get("url") or "").strip()
+                    if url:
+                        self._document_urls[full_document] = url
+            
+            print(f"📝 Assembled complete documents, obtained {len(summaries)} items")
+            
+            # 过滤有效内容
+            valid_summaries = [s for s in summaries if s and len(s.strip()) > 20]
+            print(f"📝 Valid document content: {len(valid_summaries)} items")
+            
+            if valid_summaries:
+                summaries = valid_summaries
+                print(f"✅ Successfully assembled title + description + summary")
+        
+        # 如果没有获取到有效内容，输出调试信息
+        if not summaries:
+            print(f"⚠️  未获取到有效搜索内容，原始数据条数: {len(webpages)}")
+            if webpages:
+                print(f"🔍 第一条数据字段: {list(webpages[0].keys())}")
+        
+        # 最终过滤，确保内容质量
+        documents = [s for s in summaries if s and len(s.strip()) > 10]
+        
+        # 去除近似重复的转载文档，减少rerank和分析的文档数量
+        if self.dedup and len(documents) > 1:
+            detector = NearDuplicateDetector(max_distance=self.dedup_max_distance)
+            documents, self.dedup_stats = detector.deduplicate(documents)
+            print(f"🧬 近似重复去重: {self.dedup_stats['documents']} → {self.dedup_stats['unique_documents']} 条 "
+                  f"(去重率 {self.dedup_stats['dedupe_ratio']:.1%}, 耗时 {self.dedup_stats['elapsed_ms']:.1f}ms)")
+        
+        return documents
+    
+    def _build_context(self, summaries: list) -> Optional[str]:
+        """在token预算内把文档拼接为分析用的上下文（文档已按相关性从高到低排列）"""
+        packer = ContextPacker(self.context_max_tokens, self.document_max_tokens)
+        context, self.context_stats = packer.pack(summaries)
+        stats = self.context_stats
+        get_metrics().observe('reporter_context_tokens', stats['tokens'], agent=self.agent_id)
+        
+        print(f"✅ 搜索成功，获得 {len(summaries)} 条有效结果")
+        print(f"📝 Context长度: {len(context)} 字符, 约 {stats['tokens']} tokens")
+        if stats['dropped_documents'] or stats['truncated_documents']:
+            print(f"✂️  Token预算 {self.context_max_tokens}: 放入 {stats['packed_documents']} 条, "
+                  f"截断 {stats['truncated_documents']} 条, 丢弃 {stats['dropped_documents']} 条, "
+                  f"舍弃约 {stats['dropped_tokens']} tokens")
+        
+        if len(context) < 100:
+            print(f"⚠️  Context内容过短，前100字符: {context[:100]}")
+        
+        if context and self._previous_summary is not None:
+            stats = self.change_stats
+            context = (f"（增量更新：与上一次报告相比，以下只包含 {stats['documents']} 篇文档中新增或内容变化的 "
+                       f"{stats['new_documents']} 篇。请重点分析新的信息，不要重复上一次报告已有的内容。）\n"
+                       f"上一次报告摘要：\n{self._previous_summary}\n\n新增文档：\n{context}")
+        
+        return context if context else None
+    
+    def _get_fingerprint_cache(self) -> ResultCache:
+        """获取进程内共享的文档指纹存储（与搜索结果缓存使用同一个数据库）"""
+        return get_cache(
+            os.path.join(self.base_config.cache_dir, 'reporter_cache.db'),
+            'fingerprints',
+            10000
+        )
+    
+    def _detect_changes(self, documents: list) -> list:
+        """
+        与上一次执行的文档指纹比较，返回需要分析的文档
+        
+        Args:
+            documents: rerank后的文档列表
+        
+        Returns:
+            没有上一次的指纹或变化较多时返回全部文档，变化较少时只返回新增或内容变化的文档，没有新文档时返回空列表
+        """
+        if not self.change_detection or not documents:
+            return documents
+        
+        key = ResultCache.make_key(self.agent_id, self.query, self.freshness, self.count)
+        try:
+            previous = self._get_fingerprint_cache().get(key, self.change_detection_ttl)
         except Exception as e:
-            print(f"❌ BochaAI搜索异常: {str(e)}")
+            print(f"⚠️  读取文档指纹失败，完整分析: {str(e)}")
+            previous = None
+        
+        detector = ChangeDetector(self.change_full_ratio)
+        documents, fingerprint, self.change_stats = detector.compare(
+            documents, self._document_urls, previous['documents'] if previous else None
+        )
+        self._pending_fingerprint = (key, {'documents': fingerprint, 'summary': previous['summary'] if previous else ''})
+        if self.change_stats['mode'] == CHANGE_DELTA:
+            self._previous_summary = previous['summary']
+        
+        stats = self.change_stats
+        get_metrics().set('reporter_change_delta_ratio', stats['delta_ratio'], agent=self.agent_id)
+        annotate(change_mode=stats['mode'], delta_ratio=stats['delta_ratio'])
+        print(f"🧾 文档变化检测: {stats['new_documents']}/{stats['documents']} 篇新增或变化, "
+              f"{stats['removed_documents']} 篇移除 (变化比例 {stats['delta_ratio']:.1%}, 模式 {stats['mode']})")
+        return documents
+    
+    def _reset_run_state(self):
+        """每次执行开始时清除上一次执行的去重统计和变化检测状态"""
+        self.dedup_stats = None
+        self.change_stats = None
+        self._previous_summary = None
+        self._pending_fingerprint = None
+    
+    def _unchanged(self) -> bool:
+        """本次执行的文档与上一次相同"""
+        return self.change_stats is not None and self.change_stats['mode'] == CHANGE_UNCHANGED
+    
+    def _save_fingerprint(self, summary: Optional[str] = None):
+        """
+        保存本次执行的文档指纹
+        
+        Args:
+            summary: 本次报告的摘要，None表示沿用上一次报告的摘要
+        """
+        if self._pending_fingerprint is None:
+            return
+        key, record = self._pending_fingerprint
+        self._pending_fingerprint = None
+        if summary is not None:
+            record = dict(record, summary=summary)
+        try:
+            self._get_fingerprint_cache().set(key, record)
+        except Exception as e:
+            print(f"⚠️  保存文档指纹失败: {str(e)}")
+    
+    def _get_search_cache(self) -> ResultCache:
+        """获取进程内共享的搜索结果缓存"""
+        return get_cache(
+            os.path.join(self.base_config.cache_dir, 'reporter_cache.db'),
+            'search',
+            self.search_cache_max_entries
+        )
+    
+    def _fetch_webpages(self, query: str) -> Optional[list]:
+        """
+        获取BochaAI搜索结果网页列表，优先使用缓存
+        
+        相同 (query, freshness, count) 的请求在TTL内直接复用缓存结果，
+        同一进程内的并发相同请求只会发起一次API调用。
+        
+        Args:
+            query: 查询内容
+        
+        Returns:
+            网页结果列表，请求失败返回None
+        """
+        with StageTimer(self.agent_id, 'search') as stage, \
+                get_tracer().span('bochaai_search', task_id=self.agent_id, freshness=self.freshness, count=self.count) as span:
+            if not self.search_cache_ttl:
+                webpages = self._request_webpages(query)
+            else:
+                cache_key = ResultCache.make_key(query, self.freshness, self.count)
+                webpages, cached = self._get_search_cache().get_or_compute(
+                    cache_key,
+                    self.search_cache_ttl,
+                    lambda: self._request_webpages(query)
+                )
+                
+                if cached and webpages is not None:
+                    print(f"💾 使用缓存的搜索结果: {len(webpages)} 条")
+                span.set_attribute('cached', cached)
+            
+            stage.success = self._record_webpages(webpages, span)
+        
+        return webpages
+    
+    async def _afetch_webpages(self, query: str, engine) -> Optional[list]:
+        """获取BochaAI搜索结果网页列表，优先使用缓存（异步）"""
+        with StageTimer(self.agent_id, 'search') as stage, \
+                get_tracer().span('bochaai_search', task_id=self.agent_id, freshness=self.freshness, count=self.count) as span:
+            if not self.search_cache_ttl:
+                webpages = await self._arequest_webpages(query, engine)
+            else:
+                cache_key = ResultCache.make_key(query, self.freshness, self.count)
+                webpages, cached = await self._get_search_cache().aget_or_compute(
+                    cache_key,
+                    self.search_cache_ttl,
+                    lambda: self._arequest_webpages(query, engine)
+                )
+                
+                if cached and webpages is not None:
+                    print(f"💾 使用缓存的搜索结果: {len(webpages)} 条")
+                span.set_attribute('cached', cached)
+            
+            stage.success = self._record_webpages(webpages, span)
+        
+        return webpages
+    
+    def _record_webpages(self, webpages: Optional[list], span) -> bool:
+        """记录搜索获得的网页数，返回搜索是否成功"""
+        if webpages is None:
+            span.set_error('BochaAI搜索失败')
+            return False
+        get_metrics().observe('reporter_documents_retrieved', len(webpages), agent=self.agent_id)
+        span.set_attribute('webpages', len(webpages))
+        return True
+    
+    def _build_search_request(self, query: str) -> Tuple[str, dict, str]:
+        """构建BochaAI搜索请求: (url, headers, body)"""
+        headers = {
+            'Authorization': f'Bearer {self.base_config.bochaai_api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        payload = {
+            'query': query,
+            'freshness': self.freshness,
+            'summary': True,  # 启用摘要功能
+            'count': self.count
+        }
+        
+        return self.base_config.bochaai_search_url, headers, json.dumps(payload)
+    
+    def _parse_search_response(self, response) -> Optional[list]:
+        """解析BochaAI搜索响应，失败返回None"""
+        if response.status_code != 200:
+            print(f"❌ BochaAI搜索失败，状态码: {response.status_code}")
+            print(response.text)
             return None
+        
+        response_data = response.json()
+        return response_data.get("data", {}).get("webPages", {}).get("value", [])
+    
+    def _request_webpages(self, query: str) -> Optional[list]:
+        """调用BochaAI搜索API获取网页结果列表，失败返回None"""
+        url, headers, body = self._build_search_request(query)
+        response = get_transport().post(url, headers=headers, data=body, upstream='search')
+        return self._parse_search_response(response)
+    
+    async def _arequest_webpages(self, query: str, engine) -> Optional[list]:
+        """调用BochaAI搜索API获取网页结果列表（异步），失败返回None"""
+        url, headers, body = self._build_search_request(query)
+        response = await engine.post('search', url, headers=headers, content=body)
+        return self._parse_search_response(response)
     
     def _rerank_documents(self, query: str, documents: list) -> list:
         """
         使用BochaAI rerank API过滤低相关性文档
         
+        文档较多时先用本地BM25预筛选；相关性分数按 (query, sha256(文档)) 缓存，
+        只有未命中缓存的文档会发送到rerank API，过滤结果按相关性从高到低排列。
+        rerank API失败或超时时使用BM25排序兜底。
+        
         Args:
             query: 查询内容
             documents: 原始文档列表
-            
+        
         Returns:
             过滤后的高相关性文档列表
         """
+        with StageTimer(self.agent_id, 'rerank'), \
+                get_tracer().span('rerank', task_id=self.agent_id, documents=len(documents)) as span:
+            kept = self._rerank_or_fallback(query, documents)
+            span.set_attribute('documents_kept', len(kept))
+        get_metrics().observe('reporter_documents_kept', len(kept), agent=self.agent_id)
+        return kept
+    
+    def _rerank_or_fallback(self, query: str, documents: list) -> list:
+        """rerank过滤文档，失败时使用BM25排序兜底"""
         try:
             if not documents:
                 return documents
             
-            print(f"🔄 正在使用rerank API过滤文档...")
-            print(f"📊 原始完整文档数量: {len(documents)}")
-            print(f"📋 文档内容包含: 标题 + 描述 + 摘要")
-            
-            headers = {
-                'Authorization': f'Bearer {self.base_config.bochaai_api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            rerank_data = {
-                "model": "gte-rerank",
-                "query": query,
-                "documents": documents,
-                "top_n": len(documents),
-                "return_documents": True
-            }
-            
-            response = requests.post(
-                'https://api.bochaai.com/v1/rerank',
-                headers=headers,
-                data=json.dumps(rerank_data),
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                rerank_results = response.json()
-                
-                # 过滤相关性分数 > 0.5 的文档
-                high_quality_docs = []
-                filtered_count = 0
-                
-                for item in rerank_results['data']['results']:
-                    relevance_score = item['relevance_score']
-                    document_text = item['document']['text']
-                    
-                    if relevance_score > 0.5:
-                        high_quality_docs.append(document_text)
-                        print(f"✅ 保留文档 (相关性: {relevance_score:.3f})")
-                    else:
-                        filtered_count += 1
-                        print(f"🗑️  过滤文档 (相关性: {relevance_score:.3f})")
-                
-                print(f"📈 Rerank完成: 保留 {len(high_quality_docs)} 条, 过滤 {filtered_count} 条")
-                print(f"✨ 平均相关性提升: 保留文档质量更高")
-                
-                return high_quality_docs if high_quality_docs else documents[:5]  # 如果全部被过滤，保留前5条
-            else:
-                print(f"❌ Rerank API失败，状态码: {response.status_code}")
-                print(f"⚠️  使用原始文档: {response.text}")
+            documents = self._prefilter_documents(query, documents)
+            self._print_rerank_start(documents)
+            scores = self._score_documents(query, documents)
+            if scores is None:
+                return self._fallback_rank(query, documents)
+            return self._filter_by_scores(documents, scores)
+        
+        except Exception as e:
+            print(f"❌ Rerank API异常: {str(e)}")
+            return self._fallback_rank(query, documents)
+    
+    async def _arerank_documents(self, query: str, documents: list, engine) -> list:
+        """使用BochaAI rerank API过滤低相关性文档（异步）"""
+        with StageTimer(self.agent_id, 'rerank'), \
+                get_tracer().span('rerank', task_id=self.agent_id, documents=len(documents)) as span:
+            kept = await self._arerank_or_fallback(query, documents, engine)
+            span.set_attribute('documents_kept', len(kept))
+        get_metrics().observe('reporter_documents_kept', len(kept), agent=self.agent_id)
+        return kept
+    
+    async def _arerank_or_fallback(self, query: str, documents: list, engine) -> list:
+        """rerank过滤文档（异步），失败时使用BM25排序兜底"""
+        try:
+            if not documents:
                 return documents
-                
+            
+            documents = self._prefilter_documents(query, documents)
+            self._print_rerank_start(documents)
+            scores, cache_keys, miss_positions = self._lookup_cached_scores(query, documents)
+            if miss_positions:
+                miss_documents = [documents[positions[0]] for positions in miss_positions.values()]
+                miss_scores = await self._arequest_rerank_scores(query, miss_documents, engine)
+                scores = self._merge_scores(scores, miss_positions, miss_scores)
+            if scores is None:
+                return self._fallback_rank(query, documents)
+            return self._filter_by_scores(documents, scores)
+        
         except Exception as e:
             print(f"❌ Rerank API异常: {str(e)}")
-            print(f"⚠️  使用原始文档")
+            return self._fallback_rank(query, documents)
+    
+    def _prefilter_documents(self, query: str, documents: list) -> list:
+        """rerank前用本地BM25预筛选，只保留最相关的prefilter_top_n篇（保持原始顺序）"""
+        if not self.prefilter_top_n or len(documents) <= self.prefilter_top_n:
             return documents
+        
+        started = time.perf_counter()
+        keep = sorted(BM25Scorer().rank(query, documents, self.prefilter_top_n))
+        print(f"🧮 BM25预筛选: {len(documents)} → {len(keep)} 条 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+        annotate(prefiltered=len(keep))
+        return [documents[index] for index in keep]
     
-    def _analyze_with_deepseek(self, context: str, query: str) -> Optional[str]:
-        """使用DeepSeek分析"""
-        try:
-            # 使用自定义分析提示词或默认提示词
-            if self.analysis_prompt:
-                analysis_prompt = self.analysis_prompt
+    def _fallback_rank(self, query: str, documents: list) -> list:
+        """rerank不可用时按本地BM25分数从高到低排序，不丢弃文档（由上下文token预算截取）"""
+        print(f"⚠️  Rerank不可用，使用本地BM25排序")
+        get_metrics().inc('reporter_rerank_fallbacks_total', agent=self.agent_id)
+        annotate(fallback=True)
+        return [documents[index] for index in BM25Scorer().rank(query, documents)]
+    
+    def _print_rerank_start(self, documents: list):
+        """输出rerank开始信息"""
+        print(f"🔄 正在使用rerank API过滤文档...")
+        print(f"📊 原始完整文档数量: {len(documents)}")
+        print(f"📋 文档内容包含: 标题 + 描述 + 摘要")
+    
+    def _filter_by_scores(self, documents: list, scores: Optional[list]) -> list:
+        """
+        按相关性分数过滤文档，并按相关性从高到低排序（上下文打包按此顺序填充预算）
+        
+        Args:
+            documents: 文档列表
+            scores: 与documents一一对应的相关性分数，None表示rerank失败
+        
+        Returns:
+            过滤后的文档列表
+        """
+        if scores is None:
+            print(f"⚠️  使用原始文档")
+            return documents
+        
+        # 过滤相关性分数 > 0.5 的文档
+        high_quality_docs = []
+        filtered_count = 0
+        
+        for document_text, relevance_score in zip(documents, scores):
+            if relevance_score > 0.5:
+                high_quality_docs.append((relevance_score, document_text))
+                print(f"✅ 保留文档 (相关性: {relevance_score:.3f})")
             else:
-                analysis_prompt = f"""
+                filtered_count += 1
+                print(f"🗑️  过滤文档 (相关性: {relevance_score:.3f})")
+        
+        # 稳定排序，相关性相同的文档保持原始顺序
+        high_quality_docs.sort(key=lambda item: item[0], reverse=True)
+        high_quality_docs = [document_text for _, document_text in high_quality_docs]
+        
+        print(f"📈 Rerank完成: 保留 {len(high_quality_docs)} 条, 过滤 {filtered_count} 条")
+        print(f"✨ 平均相关性提升: 保留文档质量更高")
+        
+        return high_quality_docs if high_quality_docs else documents[:5]  # 如果全部被过滤，保留前5条
+    
+    def _get_rerank_cache(self) -> ResultCache:
+        """获取进程内共享的rerank分数缓存"""
+        return get_cache(
+            os.path.join(self.base_config.cache_dir, 'reporter_cache.db'),
+            'rerank',
+            self.rerank_cache_max_entries
+        )
+    
+    def _score_documents(self, query: str, documents: list) -> Optional[list]:
+        """
+        获取每个文档的相关性分数，优先使用缓存
+        
+        Args:
+            query: 查询内容
+            documents: 文档列表
+        
+        Returns:
+            与documents一一对应的相关性分数列表，rerank API失败返回None
+        """
+        scores, cache_keys, miss_positions = self._lookup_cached_scores(query, documents)
+        if not miss_positions:
+            return scores
+        
+        miss_documents = [documents[positions[0]] for positions in miss_positions.values()]
+        miss_scores = self._request_rerank_scores(query, miss_documents)
+        return self._merge_scores(scores, miss_positions, miss_scores)
+    
+    def _lookup_cached_scores(self, query: str, documents: list) -> Tuple[list, list, Dict[str, list]]:
+        """
+        从缓存中查找文档的相关性分数
+        
+        Returns:
+            (分数列表（未命中为None）, 缓存key列表, 未命中的 缓存key -> 文档位置列表)
+        """
+        scores: list = [None] * len(documents)
+        cache_keys = [
+            ResultCache.make_key(query, hashlib.sha256(document.encode('utf-8')).hexdigest())
+            for document in documents
+        ]
+        
+        if self.rerank_cache_ttl:
+            cached_scores = self._get_rerank_cache().get_many(cache_keys, self.rerank_cache_ttl)
+            for i, cache_key in enumerate(cache_keys):
+                if cache_key in cached_scores:
+                    scores[i] = cached_scores[cache_key]
+        
+        # 只把未命中缓存的文档（相同内容只发送一次）发送到rerank API
+        miss_positions: Dict[str, list] = {}
+        for i, score in enumerate(scores):
+            if score is None:
+                miss_positions.setdefault(cache_keys[i], []).append(i)
+        
+        print(f"💾 Rerank缓存命中: {len(documents) - sum(len(p) for p in miss_positions.values())}/{len(documents)}")
+        
+        return scores, cache_keys, miss_positions
+    
+    def _merge_scores(self, scores: list, miss_positions: Dict[str, list], miss_scores: Optional[list]) -> Optional[list]:
+        """将rerank API返回的分数合并回原始位置并写入缓存，API失败返回None"""
+        if miss_scores is None:
+            return None
+        
+        new_entries = {}
+        for cache_key, score in zip(miss_positions.keys(), miss_scores):
+            for i in miss_positions[cache_key]:
+                scores[i] = score
+            new_entries[cache_key] = score
+        
+        if self.rerank_cache_ttl:
+            self._get_rerank_cache().set_many(new_entries)
+        
+        return scores
+    
+    def _build_rerank_request(self, query: str, documents: list) -> Tuple[str, dict, str]:
+        """构建BochaAI rerank请求: (url, headers, body)"""
+        headers = {
+            'Authorization': f'Bearer {self.base_config.bochaai_api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        rerank_data = {
+            "model": "gte-rerank",
+            "query": query,
+            "documents": documents,
+            "top_n": len(documents),
+            "return_documents": True
+        }
+        
+        return self.base_config.bochaai_rerank_url, headers, json.dumps(rerank_data)
+    
+    def _parse_rerank_response(self, response, documents: list) -> Optional[list]:
+        """解析rerank响应为与documents一一对应的分数列表，失败返回None"""
+        if response.status_code != 200:
+            print(f"❌ Rerank API失败，状态码: {response.status_code}")
+            print(response.text)
+            return None
+        
+        rerank_results = response.json()
+        
+        # rerank结果按相关性排序返回，按index（或文档内容）映射回原始顺序
+        text_positions = {document: i for i, document in enumerate(documents)}
+        scores = [0.0] * len(documents)
+        for item in rerank_results['data']['results']:
+            index = item.get('index')
+            if index is None:
+                index = text_positions.get(item.get('document', {}).get('text'))
+            if index is not None and 0 <= index < len(documents):
+                scores[index] = item['relevance_score']
+        
+        return scores
+    
+    def _request_rerank_scores(self, query: str, documents: list) -> Optional[list]:
+        """
+        调用BochaAI rerank API获取相关性分数
+        
+        Args:
+            query: 查询内容
+            documents: 待评分的文档列表
+        
+        Returns:
+            与documents一一对应的相关性分数列表，失败返回None
+        """
+        url, headers, body = self._build_rerank_request(query, documents)
+        response = get_transport().post(url, headers=headers, data=body, timeout=self.rerank_timeout, upstream='rerank')
+        return self._parse_rerank_response(response, documents)
+    
+    async def _arequest_rerank_scores(self, query: str, documents: list, engine) -> Optional[list]:
+        """调用BochaAI rerank API获取相关性分数（异步），失败返回None"""
+        url, headers, body = self._build_rerank_request(query, documents)
+        response = await engine.post('rerank', url, headers=headers, content=body, timeout=self.rerank_timeout)
+        return self._parse_rerank_response(response, documents)
+    
+    def _build_analysis_messages(self, context: str, query: str) -> list:
+        """构建DeepSeek分析请求的消息列表"""
+        # 使用自定义分析提示词或默认提示词
+        if self.analysis_prompt:
+            analysis_prompt = self.analysis_prompt
+        else:
+            analysis_prompt = f"""
 请以专业金融分析师的角度分析以下搜索结果，针对查询"{query}"提供深度分析。
 
 要求：
@@ -308,33 +1091,180 @@ class FinancialAgent(BaseAgent):
 • 风险与机会
 • 投资建议
 """
+        
+        return [
+            {
+                "role": "system",
+                "content": "你是一个专业的金融信息分析师，擅长从大量信息中提取核心要点并进行深度分析。"
+            },
+            {
+                "role": "user",
+                "content": f"{analysis_prompt}\n\n搜索结果内容：\n{context}"
+            }
+        ]
+    
+    def _finish_analysis(self, analysis: str) -> str:
+        """DeepSeek分析完成后的后处理"""
+        print("✅ DeepSeek分析完成")
+        
+        # 使用父类的后处理方法清理Markdown格式
+        cleaned_analysis = self.post_execute(analysis)
+        print("🧹 已清理Markdown格式")
+        
+        return cleaned_analysis
+    
+    def _start_stream(self, timings: Optional[_Timings]) -> _AnalysisStream:
+        """创建流式输出收集器"""
+        print(f"📡 流式接收DeepSeek输出 (时长上限 {self.stream_timeout}s"
+              + (f", token上限 {self.stream_max_tokens})" if self.stream_max_tokens else ")"))
+        return _AnalysisStream(self.create_stream_cleaner(), self.stream_timeout, self.stream_max_tokens, timings)
+    
+    def _finish_stream(self, collector: _AnalysisStream) -> str:
+        """流式输出结束后的收尾：清理结果已增量生成，无需再次处理全文"""
+        analysis = collector.finish()
+        self._record_usage(collector.usage, collector.tokens)
+        
+        if collector.truncated:
+            print(f"⚠️  DeepSeek输出达到{collector.truncated}，已截断")
+            # 在报告末尾注明截断，避免读者把不完整的报告当作完整内容
+            if analysis.strip():
+                analysis = analysis.rstrip() + f"\n\n（报告已截断：DeepSeek输出达到{collector.truncated}）"
+        
+        print(f"✅ DeepSeek分析完成 (流式, {collector.tokens} tokens)")
+        print("🧹 已增量清理Markdown格式")
+        
+        return analysis
+    
+    def _record_usage(self, usage, streamed_tokens: int = 0):
+        """
+        记录DeepSeek token用量
+        
+        Args:
+            usage: 响应中的usage（流式输出未返回usage时为None）
+            streamed_tokens: 按流式输出文本估算的token数，usage缺失时作为输出token用量
+        """
+        metrics = get_metrics()
+        if usage is None:
+            if streamed_tokens:
+                metrics.inc('reporter_llm_tokens_total', streamed_tokens, agent=self.agent_id, kind='completion')
+                annotate(completion_tokens=streamed_tokens)
+            return
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        metrics.inc('reporter_llm_tokens_total', prompt_tokens, agent=self.agent_id, kind='prompt')
+        metrics.inc('reporter_llm_tokens_total', completion_tokens, agent=self.agent_id, kind='completion')
+        annotate(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    
+    def _analyze_with_deepseek(self, context: str, query: str, timings: Optional[_Timings] = None) -> Optional[str]:
+        """使用DeepSeek分析"""
+        with StageTimer(self.agent_id, 'analyze') as stage, \
+                get_tracer().span('analyze', task_id=self.agent_id, model=self.base_config.deepseek_model,
+                                  stream=self.stream, context_bytes=len(context.encode('utf-8'))) as span:
+            analysis = self._request_analysis(context, query, timings)
+            stage.success = analysis is not None
+            self._trace_analysis(span, analysis)
+        return analysis
+    
+    def _trace_analysis(self, span, analysis: Optional[str]):
+        """记录分析结果大小，分析失败时span标记为失败"""
+        if analysis is None:
+            span.set_error('DeepSeek分析失败')
+        else:
+            span.set_attribute('analysis_bytes', len(analysis.encode('utf-8')))
+    
+    def _request_analysis(self, context: str, query: str, timings: Optional[_Timings] = None) -> Optional[str]:
+        """请求DeepSeek分析，失败返回None"""
+        try:
+            messages = self._build_analysis_messages(context, query)
             
             print("🧠 正在使用DeepSeek分析...")
             
-            response = self.deepseek_client.chat.completions.create(
-                model=self.base_config.deepseek_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一个专业的金融信息分析师，擅长从大量信息中提取核心要点并进行深度分析。"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"{analysis_prompt}\n\n搜索结果内容：\n{context}"
-                    }
-                ],
-                stream=False
-            )
+            get_rate_limiter().acquire('deepseek')
+            if self.stream:
+                collector = self._start_stream(timings)
+                stream = self.deepseek_client.chat.completions.create(
+                    model=self.base_config.deepseek_model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={'include_usage': True},
+                    timeout=self.stream_timeout
+                )
+                try:
+                    for chunk in stream:
+                        if not collector.add(chunk):
+                            break
+                finally:
+                    stream.close()
+                analysis = self._finish_stream(collector)
+            else:
+                response = self.deepseek_client.chat.completions.create(
+                    model=self.base_config.deepseek_model,
+                    messages=messages,
+                    stream=False
+                )
+                self._record_usage(getattr(response, 'usage', None))
+                analysis = self._finish_analysis(response.choices[0].message.content)
             
-            analysis = response.choices[0].message.content
-            print("✅ DeepSeek分析完成")
+            if timings is not None:
+                timings.mark('analysis')
+            return analysis
+        
+        except Exception as e:
+            print(f"❌ DeepSeek分析失败: {str(e)}")
+            return None
+    
+    async def _aanalyze_with_deepseek(self, context: str, query: str, engine, timings: Optional[_Timings] = None) -> Optional[str]:
+        """使用DeepSeek分析（异步）"""
+        with StageTimer(self.agent_id, 'analyze') as stage, \
+                get_tracer().span('analyze', task_id=self.agent_id, model=self.base_config.deepseek_model,
+                                  stream=self.stream, context_bytes=len(context.encode('utf-8'))) as span:
+            analysis = await self._arequest_analysis(context, query, engine, timings)
+            stage.success = analysis is not None
+            self._trace_analysis(span, analysis)
+        return analysis
+    
+    async def _arequest_analysis(self, context: str, query: str, engine, timings: Optional[_Timings] = None) -> Optional[str]:
+        """请求DeepSeek分析（异步），失败返回None"""
+        try:
+            messages = self._build_analysis_messages(context, query)
             
-            # 使用父类的后处理方法清理Markdown格式
-            cleaned_analysis = self.post_execute(analysis)
-            print("🧹 已清理Markdown格式")
+            print("🧠 正在使用DeepSeek分析...")
             
-            return cleaned_analysis
+            client = engine.get_openai_client(
+                self.base_config.deepseek_api_key,
+                self.base_config.deepseek_base_url
+            )
+            await get_rate_limiter().aacquire('deepseek')
+            async with engine.limit('deepseek'):
+                if self.stream:
+                    collector = self._start_stream(timings)
+                    stream = await client.chat.completions.create(
+                        model=self.base_config.deepseek_model,
+                        messages=messages,
+                        stream=True,
+                        stream_options={'include_usage': True},
+                        timeout=self.stream_timeout
+                    )
+                    try:
+                        async for chunk in stream:
+                            if not collector.add(chunk):
+                                break
+                    finally:
+                        await stream.close()
+                    analysis = self._finish_stream(collector)
+                else:
+                    response = await client.chat.completions.create(
+                        model=self.base_config.deepseek_model,
+                        messages=messages,
+                        stream=False
+                    )
+                    self._record_usage(getattr(response, 'usage', None))
+                    analysis = self._finish_analysis(response.choices[0].message.content)
             
+            if timings is not None:
+                timings.mark('analysis')
+            return analysis
+        
         except Exception as e:
             print(f"❌ DeepSeek分析失败: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config.config import Config
+from .agents.base_agent import BaseAgent
+from .http_client import annotate_response, parse_retry_after, should_retry_status
+from .metrics import get_metrics
+from .rate_limiter import get_rate_limiter
+from .tracing import annotate, get_tracer, record_result
+
+# 各上游默认的最大并发数，可在tasks.yaml的 global.concurrency 中覆盖
+DEFAULT_CONCURRENCY = {
+    'agent': 16,     # 同时执行的Agent数量
+    'search': 8,     # BochaAI搜索
+    'rerank': 4,     # BochaAI rerank
+    'deepseek': 4,   # DeepSeek分析
+    'slack': 2,      # Slack webhook
+}
+
+class AsyncEngine:
+    """
+    异步执行引擎 - 在单个事件循环中并发执行所有Agent
+
+    提供共享的异步HTTP客户端（httpx）、按 (base_url, api_key) 复用的AsyncOpenAI客户端，
+    以及按上游划分的并发限制。原生异步的Agent通过engine发起请求，
+    同步Agent由BaseAgent.aexecute在线程池中适配执行。
+    """
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None):
+        """
+        初始化异步执行引擎
+
+        Args:
+            concurrency: 上游名称 -> 最大并发数，未配置的上游使用DEFAULT_CONCURRENCY
+        """
+        self.concurrency = dict(DEFAULT_CONCURRENCY)
+        self.concurrency.update(concurrency or {})
+
+        self.config = Config()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._openai_clients: Dict[Tuple[str, str], Any] = {}
+        self._http_client = None
+
+    def limit(self, upstream: str) -> asyncio.Semaphore:
+        """获取上游的并发限制信号量"""
+        semaphore = self._semaphores.get(upstream)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency.get(upstream, DEFAULT_CONCURRENCY['agent']))
+            self._semaphores[upstream] = semaphore
+        return semaphore
+
+    def _get_http_client(self):
+        """获取共享的异步HTTP客户端"""
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.AsyncClient(
+                timeout=self.config.http_timeout,
+                limits=httpx.Limits(max_keepalive_connections=self.config.http_pool_maxsize)
+            )
+        return self._http_client
+
+    def get_openai_client(self, api_key: str, base_url: str):
+        """获取按 (base_url, api_key) 复用的AsyncOpenAI客户端"""
+        key = (base_url, api_key)
+        client = self._openai_clients.get(key)
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+            self._openai_clients[key] = client
+        return client
+
+    async def post(self, upstream: str, url: str, idempotent: bool = True, **kwargs: Any):
+        """
+        在上游并发限制和限流内发送异步POST请求，429/5xx和连接错误按带抖动的指数退避重试
+
+        Args:
+            upstream: 上游名称（search/rerank/slack等），用于并发限制
+            url: 请求地址
+            idempotent: 请求是否幂等；非幂等请求只重试连接错误和429，读超时和5xx直接返回
+            **kwargs: 透传给httpx的参数（headers, content, json等）
+
+        Returns:
+            httpx.Response
+        """
+        import httpx
+        client = self._get_http_client()
+        max_retries = self.config.http_max_retries
+        backoff_base = self.config.http_backoff_base
+        rate_limiter = get_rate_limiter()
+        # Slack的限流按webhook独立计算
+        rate_key = f"{upstream}:{url}" if upstream == 'slack' else upstream
+        metrics = get_metrics()
+
+        for attempt in range(max_retries + 1):
+            if attempt:
+                metrics.inc('reporter_upstream_retries_total', upstream=upstream)
+            retry_after = None
+            await rate_limiter.aacquire(rate_key)
+            try:
+                async with self.limit(upstream):
+                    started = time.perf_counter()
+                    response = await client.post(url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as e:
+                outcome = 'timeout' if isinstance(e, httpx.ReadTimeout) else 'connection_error'
+                metrics.inc('reporter_upstream_requests_total', upstream=upstream, outcome=outcome)
+                if attempt >= max_retries or (isinstance(e, httpx.ReadTimeout) and not idempotent):
+                    annotate(http_error=outcome, attempts=attempt + 1)
+                    raise
+                print(f"⚠️  请求异常 {urlsplit(url).netloc}: {str(e) or type(e).__name__}，重试 ({attempt + 1}/{max_retries})")
+            else:
+                metrics.observe('reporter_upstream_request_duration_seconds', time.perf_counter() - started, upstream=upstream)
+                metrics.inc('reporter_upstream_requests_total', upstream=upstream, outcome=str(response.status_code))
+                if not should_retry_status(response.status_code, idempotent) or attempt >= max_retries:
+                    annotate_response(response, attempt + 1, kwargs.get('content'))
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    rate_limiter.pause(rate_key, retry_after)
+                print(f"⚠️  {urlsplit(url).netloc} 返回状态码 {response.status_code}，重试 ({attempt + 1}/{max_retries})")
+
+            delay = random.uniform(0, min(30, backoff_base * (2 ** attempt)))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, 30))
+            await asyncio.sleep(delay)
+
+        annotate_response(response, max_retries + 1, kwargs.get('content'))
+        return response
+
+    async def _run_agent(self, agent: BaseAgent) -> Dict[str, Any]:
+        """在Agent并发限制内执行单个Agent（每个Agent一个trace）"""
+        async with self.limit('agent'):
+            with get_tracer().span('execute_agent', task_id=agent.agent_id, agent_name=agent.agent_name, engine='async') as span:
+                try:
+                    result = await agent.aexecute(engine=self)
+                except Exception as e:
+                    print(f"❌ Agent '{agent.agent_id}' 执行异常: {str(e)}")
+                    result = {
+                        'success': False,
+                        'error': str(e),
+                        'agent_id': agent.agent_id
+                    }
+                record_result(span, result)
+                return result
+
+    async def run_agents(self, agents: List[BaseAgent]) -> Dict[str, Dict[str, Any]]:
+        """
+        并发执行一组Agent
+
+        Args:
+            agents: Agent列表
+
+        Returns:
+            每个Agent的执行结果字典
+        """
+        try:
+            results = await asyncio.gather(*(self._run_agent(agent) for agent in agents))
+            return {agent.agent_id: result for agent, result in zip(agents, results)}
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """关闭异步HTTP客户端和OpenAI客户端"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        for client in self._openai_clients.values():
+            await client.close()
+        self._openai_clients.clear()
+
+def run_agents_async(agents: List[BaseAgent], concurrency: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    使用异步执行引擎执行一组Agent（同步入口）
+
+    Args:
+        agents: Agent列表
+        concurrency: 上游名称 -> 最大并发数
+
+    Returns:
+        每个Agent的执行结果字典
+    """
+    engine = AsyncEngine(concurrency)
+    return asyncio.run(engine.run_agents(agents))
@@ -0,0 +1,100 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+
+# 连续的中日韩文字、或连续的字母数字
+_CJK_CLASS = r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]'
+_TOKEN_PATTERN = re.compile(_CJK_CLASS + r'+|[a-z0-9]+(?:\.[0-9]+)?')
+_CJK_PATTERN = re.compile(_CJK_CLASS)
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：英文和数字按单词切分，中日韩文字按相邻两字（bigram）切分
+
+    Args:
+        text: 文本
+
+    Returns:
+        词项列表
+    """
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+class BM25Scorer:
+    """
+    本地BM25相关性打分 - 用于rerank前的预筛选，以及rerank不可用时的兜底排序
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        初始化BM25打分器
+
+        Args:
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+        """
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, documents: List[str]) -> List[float]:
+        """
+        计算每篇文档与查询的BM25分数
+
+        Args:
+            query: 查询内容
+            documents: 文档列表
+
+        Returns:
+            与documents一一对应的分数列表
+        """
+        if not documents:
+            return []
+
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        term_counts = [Counter(tokenize(document)) for document in documents]
+        if not query_terms:
+            return [0.0] * len(documents)
+
+        lengths = [sum(counts.values()) for counts in term_counts]
+        average_length = (sum(lengths) / len(lengths)) or 1.0
+        document_count = len(documents)
+        idf = []
+        for term in query_terms:
+            frequency = sum(1 for counts in term_counts if term in counts)
+            idf.append(math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5)))
+
+        scores = []
+        for counts, length in zip(term_counts, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / average_length)
+            total = 0.0
+            for term, term_idf in zip(query_terms, idf):
+                frequency = counts.get(term, 0)
+                if frequency:
+                    total += term_idf * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append(total)
+        return scores
+
+    def rank(self, query: str, documents: List[str], top_n: Optional[int] = None) -> List[int]:
+        """
+        按BM25分数从高到低返回文档下标
+
+        Args:
+            query: 查询内容
+            documents: 文档列表
+            top_n: 只返回前top_n篇，None表示全部
+
+        Returns:
+            文档下标列表（分数相同的保持原始顺序）
+        """
+        scores = self.score(query, documents)
+        order = sorted(range(len(documents)), key=lambda index: -scores[index])
+        return order if top_n is None else order[:top_n]
@@ -0,0 +1,273 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class ResultCache:
+    """
+    带TTL和LRU淘汰的结果缓存 - 基于SQLite持久化，多个进程可共享
+
+    同一进程内对同一个key的并发请求只会触发一次计算，其余调用等待同一个结果。
+    """
+
+    def __init__(self, db_path: str, namespace: str, max_entries: int = 1000):
+        """
+        初始化结果缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+            namespace: 缓存命名空间（同一数据库中区分不同用途）
+            max_entries: 该命名空间最多保留的条目数，超出时淘汰最久未访问的条目
+        """
+        self.db_path = db_path
+        self.namespace = namespace
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache (namespace, accessed_at)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """由多个字段生成稳定的缓存key"""
+        return json.dumps(parts, ensure_ascii=False, sort_keys=True)
+
+    def get(self, key: str, ttl: float) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存key
+            ttl: 有效期（秒），超过有效期的条目视为未命中
+
+        Returns:
+            缓存的值，未命中返回None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row is None or now - row[1] > ttl:
+                return None
+
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+            self._conn.commit()
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """写入缓存，并按LRU淘汰超出容量的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def get_many(self, keys: List[str], ttl: float) -> Dict[str, Any]:
+        """
+        批量读取缓存
+
+        Args:
+            keys: 缓存key列表
+            ttl: 有效期（秒）
+
+        Returns:
+            命中的 key -> 值 字典
+        """
+        if not keys:
+            return {}
+
+        now = time.time()
+        hits = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # 分批查询，避免超过SQLite的参数个数限制
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM cache WHERE namespace = ? AND key IN ({placeholders})",
+                    [self.namespace] + batch
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if now - created_at <= ttl:
+                        hits[key] = json.loads(value)
+
+            if hits:
+                self._conn.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    [(now, self.namespace, key) for key in hits]
+                )
+                self._conn.commit()
+
+        return hits
+
+    def set_many(self, items: Dict[str, Any]):
+        """批量写入缓存，并按LRU淘汰超出容量的条目"""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [
+                    (self.namespace, key, json.dumps(value, ensure_ascii=False), now, now)
+                    for key, value in items.items()
+                ]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """淘汰超出容量的最久未访问条目（调用方需持有锁）"""
+        self._conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache WHERE namespace = ?"
+            " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def get_or_compute(self, key: str, ttl: float, compute: Callable[[], Optional[Any]]) -> Tuple[Optional[Any], bool]:
+        """
+        读取缓存，未命中时计算并写入；同一进程内相同key的并发调用共享一次计算
+
+        Args:
+            key: 缓存key
+            ttl: 有效期（秒）
+            compute: 计算函数，返回None表示失败（失败结果不会被缓存）
+
+        Returns:
+            (值, 是否来自缓存或其他进行中的请求)
+        """
+        value = self.get(key, ttl)
+        if value is not None:
+            return value, True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_owner:
+            return future.result(), True
+
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+            future.set_result(value)
+            return value, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_compute(self, key: str, ttl: float,
+                              compute: Callable[[], Awaitable[Optional[Any]]]) -> Tuple[Optional[Any], bool]:
+        """
+        get_or_compute的异步版本，与同步调用共享同一组进行中的请求
+
+        Args:
+            key: 缓存key
+            ttl: 有效期（秒）
+            compute: 返回协程的计算函数，结果为None表示失败（失败结果不会被缓存）
+
+        Returns:
+            (值, 是否来自缓存或其他进行中的请求)
+        """
+        value = self.get(key, ttl)
+        if value is not None:
+            return value, True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_owner:
+            import asyncio
+            return await asyncio.wrap_future(future), True
+
+        try:
+            value = await compute()
+            if value is not None:
+                self.set(key, value)
+            future.set_result(value)
+            return value, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+# 进程内共享的缓存实例: (数据库路径, 命名空间) -> ResultCache
+_caches: Dict[Tuple[str, str], ResultCache] = {}
+_caches_lock = threading.Lock()
+
+def get_cache(db_path: str, namespace: str, max_entries: int = 1000) -> ResultCache:
+    """
+    获取进程内共享的缓存实例
+
+    同一命名空间被多个配置了不同max_entries的调用方共享时，取其中的最大值，
+    避免配置较小的调用方淘汰其他调用方的条目。
+
+    Args:
+        db_path: SQLite数据库文件路径
+        namespace: 缓存命名空间
+        max_entries: 该命名空间最多保留的条目数
+
+    Returns:
+        ResultCache实例
+    """
+    with _caches_lock:
+        cache = _caches.get((db_path, namespace))
+        if cache is None:
+            cache = ResultCache(db_path, namespace, max_entries)
+            _caches[(db_path, namespace)] = cache
+        elif max_entries > cache.max_entries:
+            cache.max_entries = max_entries
+        return cache
@@ -0,0 +1,96 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+# 变化检测结果：full 完整分析（没有上一次的指纹，或变化的文档比例较高），
+# delta 只分析新增或内容变化的文档，unchanged 没有新的文档，跳过分析和发送
+CHANGE_FULL = 'full'
+CHANGE_DELTA = 'delta'
+CHANGE_UNCHANGED = 'unchanged'
+
+def content_hash(text: str) -> str:
+    """文档内容的sha256"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def summarize_report(report: str, max_chars: int) -> str:
+    """
+    上一次报告的简短摘要：按行保留报告开头的内容（报告按核心要点在前组织）
+
+    Args:
+        report: 报告全文
+        max_chars: 摘要的最大字符数
+
+    Returns:
+        不超过max_chars个字符的摘要
+    """
+    lines = [line.strip() for line in report.splitlines() if line.strip()]
+    summary = ''
+    for line in lines:
+        candidate = f"{summary}\n{line}" if summary else line
+        if len(candidate) > max_chars:
+            break
+        summary = candidate
+    if not summary and lines and max_chars > 0:
+        summary = lines[0][:max_chars - 1] + '…'
+    return summary
+
+class ChangeDetector:
+    """
+    文档集合变化检测 - 为分析的文档集合生成指纹（URL -> 内容哈希，没有URL的文档以内容哈希为key），
+    与上一次执行的指纹比较，找出新增或内容变化的文档
+
+    只有文档被移除而没有新文档时视为没有变化。
+    """
+
+    def __init__(self, full_ratio: float = 0.5):
+        """
+        初始化变化检测器
+
+        Args:
+            full_ratio: 变化的文档比例达到该值时完整分析所有文档，而不是只分析变化的文档
+        """
+        self.full_ratio = full_ratio
+
+    def compare(self, documents: List[str], urls: Dict[str, str],
+                previous: Optional[Dict[str, str]]) -> Tuple[List[str], Dict[str, str], Dict[str, Any]]:
+        """
+        比较本次的文档集合与上一次的指纹
+
+        Args:
+            documents: 本次的文档列表（按相关性从高到低）
+            urls: 文档 -> 来源URL
+            previous: 上一次执行的指纹，None表示没有
+
+        Returns:
+            (需要分析的文档, 本次的指纹, 统计信息)
+        """
+        current = {}
+        new_documents = []
+        for document in documents:
+            digest = content_hash(document)
+            key = urls.get(document) or digest
+            current[key] = digest
+            if previous is None or previous.get(key) != digest:
+                new_documents.append(document)
+
+        delta_ratio = len(new_documents) / len(documents) if documents else 0.0
+        if previous is None:
+            mode = CHANGE_FULL
+        elif not new_documents:
+            mode = CHANGE_UNCHANGED
+        elif delta_ratio >= self.full_ratio:
+            mode = CHANGE_FULL
+        else:
+            mode = CHANGE_DELTA
+
+        stats = {
+            'mode': mode,
+            'documents': len(documents),
+            'new_documents': len(new_documents),
+            'removed_documents': len(set(previous) - set(current)) if previous else 0,
+            'delta_ratio': round(delta_ratio, 4),
+        }
+        if mode == CHANGE_DELTA:
+            return new_documents, current, stats
+        if mode == CHANGE_UNCHANGED:
+            return [], current, stats
+        return documents, current, stats
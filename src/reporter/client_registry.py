@@ -0,0 +1,137 @@
+import atexit
+import copy
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from config.config import Config
+from .http_client import get_transport
+from .slack_service import SlackService
+from .slack_outbox import close_slack_outbox, get_slack_outbox
+
+class ClientRegistry:
+    """
+    进程内共享的客户端注册表
+
+    所有Agent共用同一份基础配置、按 (base_url, api_key) 复用的OpenAI客户端，
+    以及按 (webhook, 消息格式) 复用的Slack发送器，避免每个Agent各自创建客户端和连接池。
+    OpenAI客户端和requests Session都是线程安全的，可以在线程池和流水线的多个线程间共享。
+    进程退出时（或调用close时）统一关闭。
+    """
+
+    def __init__(self):
+        self._config: Optional[Config] = None
+        self._openai_clients: Dict[Tuple[str, str], Any] = {}
+        self._slack_services: Dict[Tuple[str, bool, float], SlackService] = {}
+        self._lock = threading.Lock()
+        self._counters = {'openai_created': 0, 'openai_reused': 0, 'slack_created': 0, 'slack_reused': 0}
+
+    @property
+    def config(self) -> Config:
+        """共享的基础配置（API密钥等，按环境变量创建一次）"""
+        with self._lock:
+            if self._config is None:
+                self._config = Config()
+            return self._config
+
+    def get_openai_client(self, api_key: str, base_url: str):
+        """
+        获取按 (base_url, api_key) 复用的OpenAI客户端（首次使用时导入openai SDK）
+
+        Args:
+            api_key: API密钥
+            base_url: API地址
+
+        Returns:
+            OpenAI客户端
+        """
+        key = (base_url, api_key)
+        with self._lock:
+            client = self._openai_clients.get(key)
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(api_key=api_key, base_url=base_url)
+                self._openai_clients[key] = client
+                self._counters['openai_created'] += 1
+            else:
+                self._counters['openai_reused'] += 1
+            return client
+
+    def get_slack_service(self, webhook_url: str, use_slack_blocks: bool = True,
+                          coalesce_window: float = 0) -> SlackService:
+        """
+        获取按 (webhook, 消息格式, 合并窗口) 复用的Slack发送器
+
+        Args:
+            webhook_url: Slack webhook地址
+            use_slack_blocks: 是否使用Block Kit格式
+            coalesce_window: 合并窗口（秒），0表示不合并
+
+        Returns:
+            SlackService实例
+        """
+        base_config = self.config
+        key = (webhook_url, use_slack_blocks, coalesce_window)
+        with self._lock:
+            service = self._slack_services.get(key)
+            if service is None:
+                # 复制基础配置，只替换webhook和消息格式，不再重新读取环境变量
+                slack_config = copy.copy(base_config)
+                slack_config.slack_webhook_url = webhook_url
+                slack_config.use_slack_blocks = use_slack_blocks
+                # 配置了SLACK_OUTBOX_DB时消息写入发件箱，由后台线程投递
+                service = SlackService(slack_config, coalesce_window, get_slack_outbox())
+                self._slack_services[key] = service
+                self._counters['slack_created'] += 1
+            else:
+                self._counters['slack_reused'] += 1
+            return service
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        客户端和连接池统计
+
+        Returns:
+            包含OpenAI客户端数、Slack发送器数、复用次数以及各host连接池请求数/连接数的字典
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['openai_clients'] = len(self._openai_clients)
+            stats['slack_services'] = len(self._slack_services)
+        stats['http_pools'] = get_transport().pool_stats()
+        return stats
+
+    def print_stats(self):
+        """输出客户端和连接池统计"""
+        stats = self.stats()
+        print(f"🔌 客户端: OpenAI {stats['openai_clients']} 个 (复用 {stats['openai_reused']} 次), "
+              f"Slack {stats['slack_services']} 个 (复用 {stats['slack_reused']} 次)")
+        for host, pool in stats['http_pools'].items():
+            print(f"   {host}: {pool['requests']} 次请求, {pool['connections']} 个连接")
+
+    def close(self):
+        """发送Slack发件箱中剩余的消息，关闭所有OpenAI客户端和HTTP连接池"""
+        close_slack_outbox()
+
+        with self._lock:
+            clients = list(self._openai_clients.values())
+            self._openai_clients.clear()
+            self._slack_services.clear()
+
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                print(f"⚠️  关闭OpenAI客户端失败: {str(e)}")
+        get_transport().close()
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_client_registry() -> ClientRegistry:
+    """获取进程内共享的客户端注册表（进程退出时自动关闭所有客户端）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+            atexit.register(_registry.close)
+        return _registry
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 快照文件格式版本，格式变化时递增，旧快照会被忽略并重新编译
+SNAPSHOT_VERSION = 1
+
+def merge_task_config(global_config: Dict[str, Any], task_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    合并全局配置和任务配置，得到创建Agent使用的配置
+
+    Args:
+        global_config: 配置文件的global部分
+        task_config: 单个任务的配置
+
+    Returns:
+        合并后的Agent配置（任务配置覆盖全局配置）
+    """
+    agent_config = {}
+    agent_config.update(global_config)
+    agent_config.update(task_config)
+
+    # 确保必需字段存在
+    if 'type' not in agent_config:
+        agent_config['type'] = global_config.get('agent_type', 'financial')
+
+    if 'slack_webhook_url' not in agent_config:
+        agent_config['slack_webhook_url'] = global_config.get('slack_webhook_url', '')
+
+    return agent_config
+
+def _digest(value: Any) -> str:
+    """配置内容的摘要，用于判断任务定义是否变化"""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+class CompiledTask:
+    """编译后的任务：原始任务配置、合并后的Agent配置及其摘要"""
+
+    __slots__ = ('task_id', 'task', 'agent_config', 'digest')
+
+    def __init__(self, task_id: str, task: Dict[str, Any], agent_config: Dict[str, Any], digest: str):
+        self.task_id = task_id
+        self.task = task
+        self.agent_config = agent_config
+        self.digest = digest
+
+def compile_tasks(global_config: Dict[str, Any], task_configs: List[Dict[str, Any]],
+                  reusable: Optional[Dict[str, CompiledTask]] = None) -> List[CompiledTask]:
+    """
+    编译任务列表：合并全局配置并计算每个任务的摘要
+
+    Args:
+        global_config: 配置文件的global部分
+        task_configs: 任务配置列表
+        reusable: 摘要 -> 已编译任务，摘要相同的任务沿用已有的编译结果
+
+    Returns:
+        编译后的任务列表（与task_configs顺序一致）
+    """
+    tasks = []
+    for task_config in task_configs:
+        agent_config = merge_task_config(global_config, task_config)
+        digest = _digest(agent_config)
+        compiled = reusable.get(digest) if reusable else None
+        if compiled is None:
+            compiled = CompiledTask(task_config.get('id', 'unknown'), task_config, agent_config, digest)
+        tasks.append(compiled)
+    return tasks
+
+class ConfigSnapshot:
+    """
+    配置文件的编译快照
+
+    同一个配置文件内容不变时，ConfigSnapshotCache返回的是同一个快照对象，
+    调用方可以直接用 `is` 判断配置是否变化，再按任务摘要找出具体变化的任务。
+    """
+
+    def __init__(self, config_file: str, stat_key: Tuple[int, int, int], content_hash: str,
+                 global_config: Dict[str, Any], tasks: List[CompiledTask]):
+        self.config_file = config_file
+        self.stat_key = stat_key
+        self.content_hash = content_hash
+        self.global_config = global_config
+        self.tasks = tasks
+
+    def task_digests(self) -> Dict[str, str]:
+        """任务ID -> 任务摘要（ID重复时以最后一个为准）"""
+        return {task.task_id: task.digest for task in self.tasks}
+
+    def changed_task_ids(self, previous: Optional['ConfigSnapshot']) -> Tuple[List[str], List[str]]:
+        """
+        与上一个快照比较
+
+        Args:
+            previous: 上一个快照，None表示首次加载
+
+        Returns:
+            (新增或修改的任务ID列表, 删除的任务ID列表)
+        """
+        old = previous.task_digests() if previous is not None else {}
+        new = self.task_digests()
+        changed = [task_id for task_id, digest in new.items() if old.get(task_id) != digest]
+        removed = [task_id for task_id in old if task_id not in new]
+        return changed, removed
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为只包含内置类型的字典，用于持久化"""
+        return {
+            'version': SNAPSHOT_VERSION,
+            'config_file': self.config_file,
+            'stat_key': self.stat_key,
+            'content_hash': self.content_hash,
+            'global_config': self.global_config,
+            'tasks': [(task.task_id, task.task, task.agent_config, task.digest) for task in self.tasks],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConfigSnapshot':
+        """从持久化的字典恢复快照"""
+        return cls(
+            data['config_file'],
+            tuple(data['stat_key']),
+            data['content_hash'],
+            data['global_config'],
+            [CompiledTask(*task) for task in data['tasks']],
+        )
+
+class ConfigSnapshotCache:
+    """
+    任务配置文件的编译缓存
+
+    配置文件按修改时间（及大小、inode）判断是否变化，未变化时直接返回内存中或磁盘上的
+    pickle快照，不再解析YAML；修改时间变了但内容哈希相同（例如只是touch）时沿用原快照；
+    内容确实变化时重新解析，未变化任务的编译结果沿用上一个快照。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        初始化配置快照缓存
+
+        Args:
+            cache_dir: 快照文件目录，None表示只在进程内缓存
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._snapshots: Dict[str, ConfigSnapshot] = {}
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'unchanged': 0, 'compiled': 0}
+
+    def load(self, config_file: str) -> ConfigSnapshot:
+        """
+        获取配置文件的编译快照
+
+        Args:
+            config_file: 配置文件路径
+
+        Returns:
+            ConfigSnapshot实例
+
+        Raises:
+            OSError: 配置文件无法读取时
+            yaml.YAMLError: 配置文件格式错误时
+        """
+        path = os.path.abspath(config_file)
+        with self._lock:
+            stat = os.stat(path)
+            stat_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+            snapshot = self._snapshots.get(path)
+            if snapshot is not None and snapshot.stat_key == stat_key:
+                self.stats['memory_hits'] += 1
+                return snapshot
+
+            stored = self._read_snapshot(path)
+            if stored is not None and stored.stat_key == stat_key:
+                self.stats['disk_hits'] += 1
+                self._snapshots[path] = stored
+                return stored
+
+            previous = snapshot or stored
+            with open(path, 'rb') as file:
+                content = file.read()
+            content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+
+            if previous is not None and previous.content_hash == content_hash:
+                self.stats['unchanged'] += 1
+                previous.stat_key = stat_key
+            else:
+                self.stats['compiled'] += 1
+                previous = self._compile(path, stat_key, content_hash, content, previous)
+
+            self._snapshots[path] = previous
+            self._write_snapshot(path, previous)
+            return previous
+
+    def _compile(self, path: str, stat_key: Tuple[int, int, int], content_hash: str, content: bytes,
+                 previous: Optional[ConfigSnapshot]) -> ConfigSnapshot:
+        """解析配置文件并编译为快照，未变化任务的编译结果沿用上一个快照"""
+        import yaml
+
+        config_data = yaml.safe_load(content.decode('utf-8')) or {}
+        global_config = config_data.get('global') or {}
+        reusable = {task.digest: task for task in previous.tasks} if previous is not None else None
+        tasks = compile_tasks(global_config, config_data.get('tasks') or [], reusable)
+
+        snapshot = ConfigSnapshot(path, stat_key, content_hash, global_config, tasks)
+        if previous is not None:
+            changed, removed = snapshot.changed_task_ids(previous)
+            print(f"🔄 配置已变化: {Path(path).name} (新增/修改 {len(changed)} 个任务, 删除 {len(removed)} 个任务)")
+        return snapshot
+
+    def _snapshot_path(self, path: str) -> Path:
+        """配置文件对应的快照文件路径"""
+        name = hashlib.blake2b(path.encode('utf-8'), digest_size=8).hexdigest()
+        return self.cache_dir / f"{name}.pickle"
+
+    def _read_snapshot(self, path: str) -> Optional[ConfigSnapshot]:
+        """读取磁盘上的快照，不存在、版本不符或损坏时返回None"""
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._snapshot_path(path), 'rb') as file:
+                data = pickle.load(file)
+            if data.get('version') != SNAPSHOT_VERSION or data.get('config_file') != path:
+                return None
+            return ConfigSnapshot.from_dict(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  读取配置快照失败 {Path(path).name}: {str(e)}")
+            return None
+
+    def _write_snapshot(self, path: str, snapshot: ConfigSnapshot):
+        """写入快照（先写临时文件再替换，多个进程同时写入时不会读到半个文件）"""
+        if self.cache_dir is None:
+            return
+        target = self._snapshot_path(path)
+        temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(temp, 'wb') as file:
+                pickle.dump(snapshot.to_dict(), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, target)
+        except Exception as e:
+            print(f"⚠️  写入配置快照失败 {Path(path).name}: {str(e)}")
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+
+    def invalidate(self, config_file: Optional[str] = None):
+        """
+        丢弃进程内缓存的快照
+
+        Args:
+            config_file: 配置文件路径，None表示全部
+        """
+        with self._lock:
+            if config_file is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(os.path.abspath(config_file), None)
+
+# 进程内共享的配置快照缓存
+_config_cache: Optional[ConfigSnapshotCache] = None
+_config_cache_lock = threading.Lock()
+
+def get_config_cache() -> ConfigSnapshotCache:
+    """
+    获取进程内共享的配置快照缓存（快照文件保存在缓存目录的config_snapshots子目录下）
+
+    Returns:
+        ConfigSnapshotCache实例
+    """
+    global _config_cache
+    with _config_cache_lock:
+        if _config_cache is None:
+            from config.config import Config
+            _config_cache = ConfigSnapshotCache(os.path.join(Config().cache_dir, 'config_snapshots'))
+        return _config_cache
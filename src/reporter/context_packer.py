@@ -0,0 +1,135 @@
+import math
+import re
+from typing import Any, Dict, List, Tuple
+
+# 中日韩文字及全角符号（按DeepSeek官方估算：1个中文字符约0.6 token，1个英文字符约0.3 token）
+_CJK_PATTERN = re.compile(
+    r'[\u2e80-\u2fdf\u3000-\u303f\u3040-\u30ff\u3100-\u31ff\u3400-\u4dbf'
+    r'\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]'
+)
+CJK_TOKENS_PER_CHAR = 0.6
+OTHER_TOKENS_PER_CHAR = 0.3
+
+# 文档被截断时追加的标记
+TRUNCATION_MARK = '…'
+
+def token_weight(text: str) -> float:
+    """
+    估算文本的token数量（不取整，流式输出逐段累加时使用）
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的token数量
+    """
+    if not text:
+        return 0.0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk * CJK_TOKENS_PER_CHAR + (len(text) - cjk) * OTHER_TOKENS_PER_CHAR
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的token数量（区分中日韩字符和其他字符）
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的token数量
+    """
+    return math.ceil(token_weight(text))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    把文本截断到不超过max_tokens（含截断标记）
+
+    Args:
+        text: 文本
+        max_tokens: token上限
+
+    Returns:
+        截断后的文本；未超过上限时原样返回
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # token估算随前缀长度单调递增，二分查找能放下的最长前缀
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARK)
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + TRUNCATION_MARK
+
+class ContextPacker:
+    """
+    上下文打包器 - 在token预算内按优先级顺序填充文档
+
+    文档按传入顺序（rerank相关性从高到低）依次放入，单篇文档超过上限时截断；
+    放不下的文档被跳过，后面更短的文档仍可能放入。
+    """
+
+    def __init__(self, max_tokens: int, document_max_tokens: int = 0, separator: str = ' '):
+        """
+        初始化上下文打包器
+
+        Args:
+            max_tokens: 整个上下文的token预算，0表示不限制
+            document_max_tokens: 单篇文档的token上限，0表示不限制
+            separator: 文档之间的分隔符
+        """
+        self.max_tokens = max_tokens
+        self.document_max_tokens = document_max_tokens
+        self.separator = separator
+
+    def pack(self, documents: List[str]) -> Tuple[str, Dict[str, Any]]:
+        """
+        打包文档
+
+        Args:
+            documents: 按优先级排列的文档列表
+
+        Returns:
+            (上下文文本, 统计信息)，统计信息包含放入/截断/丢弃的文档数和token数
+        """
+        separator_tokens = estimate_tokens(self.separator)
+        packed: List[str] = []
+        used = 0
+        truncated = 0
+        dropped = 0
+        dropped_tokens = 0
+
+        for document in documents:
+            original_tokens = estimate_tokens(document)
+            limit = self.document_max_tokens
+            # 第一篇文档也放不下时截断到预算内，保证上下文不为空
+            if not packed and self.max_tokens and (not limit or limit > self.max_tokens):
+                limit = self.max_tokens
+            if limit and original_tokens > limit:
+                document = truncate_to_tokens(document, limit)
+                truncated += 1
+                dropped_tokens += original_tokens - estimate_tokens(document)
+
+            tokens = estimate_tokens(document) + (separator_tokens if packed else 0)
+            if self.max_tokens and used + tokens > self.max_tokens:
+                dropped += 1
+                dropped_tokens += tokens
+                continue
+
+            packed.append(document)
+            used += tokens
+
+        stats = {
+            'documents': len(documents),
+            'packed_documents': len(packed),
+            'truncated_documents': truncated,
+            'dropped_documents': dropped,
+            'tokens': used,
+            'dropped_tokens': dropped_tokens,
+            'max_tokens': self.max_tokens,
+        }
+        return self.separator.join(packed), stats
@@ -0,0 +1,125 @@
+import hashlib
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+# 计算指纹前去掉的字符：空白、标点和文档组装时加入的字段标签
+_NOISE_PATTERN = re.compile(r'(?:标题|描述|摘要):|[\W_]+')
+
+FINGERPRINT_BITS = 64
+
+# 把64位哈希的每一位展开为16位宽的计数通道（一个十六进制数4位），
+# 对所有shingle的展开值求和即可一次得到每一位为1的次数（每个通道最多计数0xFFFF个shingle）
+_LANE_HEX_DIGITS = 4
+_MAX_SHINGLES = 0xFFFF
+_SPREAD_TABLE = str.maketrans({'0': '0' * _LANE_HEX_DIGITS, '1': '0' * (_LANE_HEX_DIGITS - 1) + '1'})
+
+def _shingles(text: str, size: int) -> set:
+    """把文本归一化后切分为字符n-gram（对中文和英文都适用）"""
+    normalized = _NOISE_PATTERN.sub('', text.lower())[:_MAX_SHINGLES + size - 1]
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+@lru_cache(maxsize=65536)
+def _shingle_vector(shingle: str) -> int:
+    """shingle哈希按位展开后的计数向量（同一shingle在多篇转载中反复出现，缓存结果）"""
+    digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=FINGERPRINT_BITS // 8).digest()
+    bits = format(int.from_bytes(digest, 'big'), f'0{FINGERPRINT_BITS}b')
+    return int(bits.translate(_SPREAD_TABLE), 16)
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    计算文本的64位SimHash指纹
+
+    Args:
+        text: 文本
+        shingle_size: 字符n-gram长度
+
+    Returns:
+        指纹整数，相似文本的指纹汉明距离小
+    """
+    shingles = _shingles(text, shingle_size)
+    if not shingles:
+        return 0
+
+    # 按位统计：超过一半的shingle该位为1，则指纹该位为1
+    counts = format(sum(_shingle_vector(shingle) for shingle in shingles), f'0{FINGERPRINT_BITS * _LANE_HEX_DIGITS}x')
+    half = len(shingles) / 2
+    return int(''.join(
+        '1' if int(counts[i:i + _LANE_HEX_DIGITS], 16) > half else '0'
+        for i in range(0, len(counts), _LANE_HEX_DIGITS)
+    ), 2)
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹之间的汉明距离"""
+    return bin(a ^ b).count('1')
+
+class NearDuplicateDetector:
+    """
+    近似重复文档检测器 - 基于字符n-gram的SimHash
+
+    同一篇通稿被多个网站转载时，各个副本的指纹汉明距离很小；
+    检测器把这些副本聚为一簇，只保留信息最完整（最长）的一篇。
+    """
+
+    def __init__(self, max_distance: int = 8, shingle_size: int = 3):
+        """
+        初始化检测器
+
+        Args:
+            max_distance: 判定为近似重复的最大汉明距离（64位指纹）
+            shingle_size: 字符n-gram长度
+        """
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+
+    def cluster(self, documents: List[str]) -> List[List[int]]:
+        """
+        把文档聚类为近似重复簇
+
+        Args:
+            documents: 文档列表
+
+        Returns:
+            簇列表，每个簇是文档下标列表，按簇中第一篇文档的位置排列
+        """
+        clusters: List[List[int]] = []
+        centers: List[int] = []  # 每个簇第一篇文档的指纹
+
+        for index, document in enumerate(documents):
+            fingerprint = simhash(document, self.shingle_size)
+            for cluster_index, center in enumerate(centers):
+                if hamming_distance(fingerprint, center) <= self.max_distance:
+                    clusters[cluster_index].append(index)
+                    break
+            else:
+                clusters.append([index])
+                centers.append(fingerprint)
+
+        return clusters
+
+    def deduplicate(self, documents: List[str]) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        去除近似重复文档
+
+        Args:
+            documents: 文档列表（按搜索结果顺序）
+
+        Returns:
+            (去重后的文档列表, 统计信息)；每个簇保留最长的文档，放在簇首次出现的位置
+        """
+        started = time.perf_counter()
+        clusters = self.cluster(documents)
+        unique = [documents[max(cluster, key=lambda index: len(documents[index]))] for cluster in clusters]
+
+        removed = len(documents) - len(unique)
+        stats = {
+            'documents': len(documents),
+            'unique_documents': len(unique),
+            'removed_documents': removed,
+            'dedupe_ratio': round(removed / len(documents), 4) if documents else 0.0,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        return unique, stats
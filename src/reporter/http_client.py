@@ -0,0 +1,246 @@
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from config.config import Config
+from .metrics import get_metrics, upstream_label
+from .rate_limiter import get_rate_limiter
+from .tracing import annotate, body_size
+
+# requests只在真正发出请求时导入，避免只读取配置的命令行调用承担导入开销
+if TYPE_CHECKING:
+    import requests
+
+# 需要重试的HTTP状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def should_retry_status(status_code: int, idempotent: bool = True) -> bool:
+    """
+    响应状态码是否需要重试
+
+    非幂等请求（如Slack webhook）返回5xx时服务端可能已经处理了请求，重试会重复投递，
+    只重试明确表示未处理的429。
+    """
+    if status_code not in RETRY_STATUS_CODES:
+        return False
+    return idempotent or status_code == 429
+
+class HttpTransport:
+    """
+    共享HTTP传输层 - 每个host一个带连接池的Session，统一超时和重试策略
+
+    所有对外HTTP请求（搜索、rerank、Slack以及后续新增的Agent类型）都应通过该类发出，
+    以复用TCP+TLS连接。遇到429/5xx或连接错误时按指数退避+随机抖动重试，
+    并优先遵循服务端返回的Retry-After。
+    """
+
+    def __init__(self, pool_maxsize: int = 10, timeout: float = 30,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 30):
+        """
+        初始化HTTP传输层
+
+        Args:
+            pool_maxsize: 每个host连接池的最大连接数
+            timeout: 默认请求超时（秒）
+            max_retries: 最大重试次数
+            backoff_base: 退避基数（秒），第n次重试最多等待 backoff_base * 2^n 秒
+            backoff_max: 单次退避等待上限（秒）
+        """
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._sessions: Dict[str, 'requests.Session'] = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, url: str) -> 'requests.Session':
+        """获取url所在host的共享Session"""
+        parts = urlsplit(url)
+        host_key = f"{parts.scheme}://{parts.netloc}"
+
+        with self._lock:
+            session = self._sessions.get(host_key)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host_key] = session
+            return session
+
+    def _backoff_delay(self, attempt: int, response: Optional['requests.Response'] = None) -> float:
+        """计算第attempt次重试前的等待时间（full jitter，优先使用Retry-After）"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.backoff_max))
+
+        return delay
+
+    def request(self, method: str, url: str, idempotent: bool = True,
+                timeout: Optional[float] = None, upstream: Optional[str] = None,
+                **kwargs: Any) -> 'requests.Response':
+        """
+        发送HTTP请求
+
+        Args:
+            method: HTTP方法
+            url: 请求地址
+            idempotent: 请求是否幂等；非幂等请求只重试连接错误和429，读超时和5xx直接返回，避免重复投递
+            timeout: 请求超时（秒），默认使用传输层配置
+            upstream: 限流器中的上游名称（search/rerank/slack:<webhook>等），None表示不限流
+            **kwargs: 透传给requests的参数（headers, data, json等）
+
+        Returns:
+            最后一次请求的响应（重试用尽后可能仍为429/5xx，由调用方检查状态码）
+
+        Raises:
+            requests.RequestException: 重试用尽后仍然出现网络异常
+        """
+        import requests
+        session = self.get_session(url)
+        timeout = timeout if timeout is not None else self.timeout
+        rate_limiter = get_rate_limiter()
+        metrics = get_metrics()
+        label = upstream_label(upstream)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                metrics.inc('reporter_upstream_retries_total', upstream=label)
+            rate_limiter.acquire(upstream)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except requests.ConnectionError as e:
+                metrics.inc('reporter_upstream_requests_total', upstream=label, outcome='connection_error')
+                # 连接阶段失败（包括连接超时）可以安全重试
+                if attempt >= self.max_retries:
+                    annotate(http_error='connection_error', attempts=attempt + 1)
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"⚠️  请求异常 {urlsplit(url).netloc}: {str(e)}，{delay:.1f}s 后重试 ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+                continue
+            except requests.exceptions.ReadTimeout:
+                metrics.inc('reporter_upstream_requests_total', upstream=label, outcome='timeout')
+                # 读超时时请求可能已被处理，只对幂等请求重试
+                if attempt >= self.max_retries or not idempotent:
+                    annotate(http_error='timeout', attempts=attempt + 1)
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"⚠️  请求超时 {urlsplit(url).netloc}，{delay:.1f}s 后重试 ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+                continue
+
+            metrics.observe('reporter_upstream_request_duration_seconds', time.perf_counter() - started, upstream=label)
+            metrics.inc('reporter_upstream_requests_total', upstream=label, outcome=str(response.status_code))
+            if not should_retry_status(response.status_code, idempotent) or attempt >= self.max_retries:
+                annotate_response(response, attempt + 1, kwargs.get('data'))
+                return response
+
+            # 遵循Retry-After：暂停该上游的令牌发放，其他线程的请求也一起等待
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                rate_limiter.pause(upstream, retry_after)
+
+            delay = self._backoff_delay(attempt, response)
+            print(f"⚠️  {urlsplit(url).netloc} 返回状态码 {response.status_code}，{delay:.1f}s 后重试 ({attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+
+        annotate_response(response, self.max_retries + 1, kwargs.get('data'))
+        return response
+
+    def post(self, url: str, **kwargs: Any) -> 'requests.Response':
+        """发送POST请求，参数同request"""
+        return self.request('POST', url, **kwargs)
+
+    def max_request_seconds(self, timeout: Optional[float] = None) -> float:
+        """
+        一次request调用在重试用尽前最长可能耗时（不含限流等待）
+
+        Args:
+            timeout: 请求超时（秒），默认使用传输层配置
+
+        Returns:
+            每次尝试都超时、每次重试前都等待退避上限时的总秒数
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        return (self.max_retries + 1) * timeout + self.max_retries * self.backoff_max
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        各host连接池的统计信息
+
+        Returns:
+            host -> {'requests': 发出的请求数, 'connections': 新建的连接数}，
+            请求数远大于连接数说明连接得到了复用
+        """
+        stats = {}
+        with self._lock:
+            for host_key, session in self._sessions.items():
+                adapter = session.get_adapter(host_key)
+                pools = adapter.poolmanager.pools
+                requests_count = connections = 0
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    if pool is not None:
+                        requests_count += pool.num_requests
+                        connections += pool.num_connections
+                stats[host_key] = {'requests': requests_count, 'connections': connections}
+        return stats
+
+    def close(self):
+        """关闭所有Session及其连接池"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+def annotate_response(response: Any, attempts: int, body: Any = None):
+    """
+    把HTTP状态码、请求/响应字节数和尝试次数记录到当前span
+
+    Args:
+        response: requests或httpx的响应
+        attempts: 包括重试在内的请求次数
+        body: 请求体（str或bytes）
+    """
+    annotate(
+        http_status=response.status_code,
+        request_bytes=body_size(body),
+        response_bytes=len(response.content),
+        attempts=attempts
+    )
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数格式），无法解析返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> HttpTransport:
+    """获取进程内共享的HTTP传输层（按环境变量配置连接池、超时和重试）"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            config = Config()
+            _transport = HttpTransport(
+                pool_maxsize=config.http_pool_maxsize,
+                timeout=config.http_timeout,
+                max_retries=config.http_max_retries,
+                backoff_base=config.http_backoff_base
+            )
+        return _transport
@@ -0,0 +1,252 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .task_lease import fire_key
+
+# 任务状态：queued 等待执行（包括等待重试），running 执行中，done 执行成功，
+# skipped 由其他副本执行，failed 重试次数用尽
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_SKIPPED = 'skipped'
+JOB_FAILED = 'failed'
+
+_JOB_COLUMNS = ('id', 'config_file', 'task_id', 'task_name', 'schedule', 'fire_time', 'status',
+                'attempts', 'available_at', 'lease_until', 'worker', 'enqueued_at', 'finished_at', 'last_error')
+
+class JobQueue:
+    """
+    持久化的本地任务队列 - 基于SQLite（WAL模式），调度器进程入队，多个worker进程消费
+
+    同一个 (配置文件, 任务, 计划触发时间) 只会入队一次。worker取出任务时获得可见性超时，
+    执行期间定期续期；worker崩溃后超时的任务重新对其他worker可见。执行失败的任务按指数退避
+    重新入队，超过最大尝试次数后标记为失败。
+    """
+
+    def __init__(self, db_path: str, visibility_timeout: float = 900, max_attempts: int = 3,
+                 retry_delay: float = 60, retention_seconds: float = 7 * 86400):
+        """
+        初始化任务队列
+
+        Args:
+            db_path: SQLite数据库文件路径
+            visibility_timeout: 可见性超时（秒），worker在此期间没有续期则任务重新可见
+            max_attempts: 每个任务的最大尝试次数
+            retry_delay: 第一次重试前的等待时间（秒），之后每次翻倍
+            retention_seconds: 已结束任务的保留时间（秒），更早的记录在初始化时清理
+        """
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " config_file TEXT NOT NULL,"
+                " task_id TEXT NOT NULL,"
+                " task_name TEXT,"
+                " schedule TEXT,"
+                " fire_time TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " available_at REAL NOT NULL,"
+                " lease_until REAL,"
+                " worker TEXT,"
+                " enqueued_at REAL NOT NULL,"
+                " finished_at REAL,"
+                " last_error TEXT,"
+                " UNIQUE (config_file, task_id, fire_time))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)"
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (JOB_DONE, JOB_SKIPPED, JOB_FAILED, time.time() - retention_seconds)
+            )
+            self._conn.commit()
+
+    def enqueue(self, config_file: str, task_id: str, fire_time: datetime, task_name: Optional[str] = None,
+                schedule: Optional[str] = None) -> Optional[int]:
+        """
+        加入一次任务触发
+
+        Args:
+            config_file: 任务配置文件路径
+            task_id: 任务ID
+            fire_time: 计划触发时间
+            task_name: 任务名称（用于日志）
+            schedule: cron表达式（用于日志）
+
+        Returns:
+            新任务的ID，同一次触发已经入队时返回None
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs"
+                " (config_file, task_id, task_name, schedule, fire_time, status, available_at, enqueued_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (config_file, task_id, task_name, schedule, fire_key(fire_time), JOB_QUEUED, now, now)
+            )
+            self._conn.commit()
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def dequeue(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        取出一个可执行的任务（等待中且已到重试时间，或执行中但可见性已超时）
+
+        Args:
+            worker: worker标识
+
+        Returns:
+            任务记录（attempts已加1），没有可执行的任务时返回None
+        """
+        with self._lock:
+            while True:
+                now = time.time()
+                # 可见性超时且尝试次数已用尽的任务不再执行
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, last_error = ?"
+                    " WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (JOB_FAILED, now, '可见性超时（worker未完成）', JOB_RUNNING, now, self.max_attempts)
+                )
+                self._conn.commit()
+                row = self._conn.execute(
+                    "SELECT id FROM jobs"
+                    " WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?)"
+                    " ORDER BY available_at, id LIMIT 1",
+                    (JOB_QUEUED, now, JOB_RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                # 条件更新保证多个worker进程同时取到同一条记录时只有一个成功
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, worker = ?"
+                    " WHERE id = ? AND ((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))",
+                    (JOB_RUNNING, now + self.visibility_timeout, worker, row[0],
+                     JOB_QUEUED, now, JOB_RUNNING, now)
+                )
+                self._conn.commit()
+                if cursor.rowcount:
+                    return self._get(row[0])
+
+    def extend(self, job_id: int, worker: str) -> bool:
+        """
+        延长执行中任务的可见性超时
+
+        Returns:
+            任务仍由该worker持有返回True
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND worker = ?",
+                (time.time() + self.visibility_timeout, job_id, JOB_RUNNING, worker)
+            )
+            self._conn.commit()
+            return bool(cursor.rowcount)
+
+    def complete(self, job_id: int, worker: str, success: Optional[bool], error: Optional[str] = None) -> str:
+        """
+        记录任务执行结果，失败时按指数退避重新入队
+
+        Args:
+            job_id: 任务ID
+            worker: worker标识（任务已被其他worker接手时不修改）
+            success: 是否执行成功，None表示由其他副本执行
+            error: 失败原因
+
+        Returns:
+            任务的当前状态
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return JOB_FAILED
+
+            if success is None:
+                status, available_at = JOB_SKIPPED, now
+            elif success:
+                status, available_at = JOB_DONE, now
+            elif row[0] < self.max_attempts:
+                status, available_at = JOB_QUEUED, now + self.retry_delay * (2 ** (row[0] - 1))
+            else:
+                status, available_at = JOB_FAILED, now
+
+            finished_at = None if status == JOB_QUEUED else now
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_until = NULL, last_error = ?, finished_at = ?"
+                " WHERE id = ? AND status = ? AND worker = ?",
+                (status, available_at, error, finished_at, job_id, JOB_RUNNING, worker)
+            )
+            self._conn.commit()
+            if not cursor.rowcount:
+                # 可见性超时后已被其他worker接手，以当前状态为准
+                return self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            return status
+
+    def is_final_attempt(self, job: Dict[str, Any]) -> bool:
+        """任务失败后是否不再重试"""
+        return job['attempts'] >= self.max_attempts
+
+    def has_ready_jobs(self) -> bool:
+        """是否有可以立即执行的任务（等待中已到时间，或执行中但可见性已超时）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM jobs"
+                " WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?) LIMIT 1",
+                (JOB_QUEUED, now, JOB_RUNNING, now)
+            ).fetchone()
+        return row is not None
+
+    def counts(self, job_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """
+        按状态统计任务数
+
+        Args:
+            job_ids: 只统计这些任务，None表示全部
+        """
+        with self._lock:
+            if job_ids is None:
+                rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            else:
+                rows = []
+                # 分批查询，避免超过SQLite的参数个数限制
+                for i in range(0, len(job_ids), 500):
+                    batch = job_ids[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows.extend(self._conn.execute(
+                        f"SELECT status, COUNT(*) FROM jobs WHERE id IN ({placeholders}) GROUP BY status", batch
+                    ).fetchall())
+        counts: Dict[str, int] = {}
+        for status, count in rows:
+            counts[status] = counts.get(status, 0) + count
+        return counts
+
+    def _get(self, job_id: int) -> Dict[str, Any]:
+        """读取任务记录（调用方需持有锁）"""
+        row = self._conn.execute(
+            f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        job = dict(zip(_JOB_COLUMNS, row))
+        job['fire_time'] = datetime.strptime(job['fire_time'], '%Y-%m-%d %H:%M')
+        return job
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,261 @@
+import re
+
+# 可能跨行生效的行首标记字符（标题、引用、列表、分割线及行内标记），以及行内空白
+_MARKER_CHARS = '#>-*+_`' + ' \t\r\f\v'
+
+# 预编译的行首规则和链接规则；成对的行内标记用字符串切分处理（见_remove_paired）
+_HEADING_PATTERN = re.compile(r'^#{1,6}\s+', re.MULTILINE)
+_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+_QUOTE_PATTERN = re.compile(r'^>\s+', re.MULTILINE)
+_LIST_PATTERN = re.compile(r'^[-*+]\s+', re.MULTILINE)
+_HR_PATTERN = re.compile(r'^[-*]{3,}$', re.MULTILINE)
+_BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+
+def _strip_inline_markers(line: str) -> str:
+    """
+    去掉行内标记字符 * _ `：它们会被先删除，删除后可能拼出新的 "](" ，判断链接闭合前先去掉
+
+    （连续的replace比带删除表的str.translate快一个数量级）
+    """
+    return line.replace('*', '').replace('_', '').replace('`', '')
+
+def _remove_paired(text: str, marker: str) -> str:
+    """
+    删除同一行内成对出现的标记，等价于 re.sub(r'<marker>(.*?)<marker>', r'\\1', text)
+    
+    按标记切分后从左到右配对，两个标记之间跨行时前一个标记保留原样
+    
+    Args:
+        text: 待处理文本
+        marker: 成对出现的标记，如 ** 或 `
+    
+    Returns:
+        删除成对标记后的文本
+    """
+    parts = text.split(marker)
+    if len(parts) < 3:
+        return text
+    
+    output = [parts[0]]
+    pending = False  # 上一个标记是否在等待配对
+    for part in parts[1:]:
+        if not pending:
+            pending = True
+        elif '\n' in output[-1]:
+            # 跨行无法配对，保留等待中的标记，当前标记开始等待配对
+            output.insert(len(output) - 1, marker)
+        else:
+            pending = False
+        output.append(part)
+    
+    if pending:
+        output.insert(len(output) - 1, marker)
+    return ''.join(output)
+
+def _has_line_start(text: str, chars: str) -> bool:
+    """判断是否有以chars中任一字符开头的行（用于跳过行首规则）"""
+    return any(text.startswith(char) or '\n' + char in text for char in chars)
+
+def clean_markdown_body(text: str) -> str:
+    """
+    按顺序应用Markdown清理规则（不包括空行合并和首尾空白去除）
+    
+    规则依次作用于前一条规则的输出，后面的规则可能匹配前面规则删除标记后拼出的内容，
+    因此不能合并为一个正则；文本中不含某条规则的触发字符时直接跳过该规则，
+    成对的行内标记用字符串切分代替正则。
+    
+    Args:
+        text: 包含Markdown格式的文本
+    
+    Returns:
+        清理后的文本
+    """
+    # 去除粗体标记 **文本** 或 __文本__，斜体标记 *文本* 或 _文本_
+    if '*' in text:
+        text = _remove_paired(text, '**')
+    if '_' in text:
+        text = _remove_paired(text, '__')
+    if '*' in text:
+        text = _remove_paired(text, '*')
+    if '_' in text:
+        text = _remove_paired(text, '_')
+    
+    # 去除标题标记 # ## ### 等
+    if _has_line_start(text, '#'):
+        text = _HEADING_PATTERN.sub('', text)
+    
+    if '`' in text:
+        # 去除代码块标记 ```（成对删除后再删除落单的标记，等价于删除所有 ```）
+        text = text.replace('```', '')
+        
+        # 去除行内代码标记 `代码`
+        text = _remove_paired(text, '`')
+    
+    # 去除链接标记 [文本](链接)
+    if '](' in text:
+        text = _LINK_PATTERN.sub(r'\1', text)
+    
+    # 去除引用标记 >
+    if _has_line_start(text, '>'):
+        text = _QUOTE_PATTERN.sub('', text)
+    
+    # 将Markdown列表标记转换为简单的项目符号，并去除分割线 --- 或 ***
+    if _has_line_start(text, '-*+'):
+        text = _LIST_PATTERN.sub('• ', text)
+        text = _HR_PATTERN.sub('', text)
+    
+    return text
+
+def clean_markdown(text: str) -> str:
+    """
+    清理Markdown格式标记，转换为纯文本
+    
+    Args:
+        text: 包含Markdown格式的文本
+    
+    Returns:
+        清理后的纯文本
+    """
+    if not text:
+        return text
+    
+    text = clean_markdown_body(text)
+    
+    # 清理多余的空行（保留段落间的单个空行）
+    if '\n\n\n' in text:
+        text = _BLANK_LINES_PATTERN.sub('\n\n', text)
+    
+    # 去除行首行尾的空白字符
+    return text.strip()
+
+def _line_probe(line: str) -> str:
+    """去掉链接标记后的行内容（去除首尾空白），用于判断行边界是否安全"""
+    if '](' in line:
+        line = _LINK_PATTERN.sub(r'\1', line)
+    return line.strip()
+
+def _is_marker_line(probe: str) -> bool:
+    """判断一行是否只剩标记字符（行首标记的 \\s+ 可能吞掉后续的换行）"""
+    return not probe.strip(_MARKER_CHARS)
+
+class StreamingMarkdownCleaner:
+    """
+    流式Markdown清理器 - 随LLM输出增量清理，输出拼接后与clean_markdown的结果一致
+    
+    文本按完整行累积，在不会被任何清理规则跨越的行边界处切分为片段，
+    每个片段独立清理后输出；空行合并和首尾空白去除在输出端增量完成。
+    每个片段的清理有固定开销，累积到至少min_segment个字符后才切分，避免逐行清理。
+    """
+    
+    def __init__(self, min_segment: int = 1024):
+        """
+        Args:
+            min_segment: 累积到该字符数后才切分清理，0表示每个完整行都立即清理（输出拼接后的结果不变）
+        """
+        self.min_segment = min_segment
+        self._chunks = []         # 尚未并入_pending的输入片段
+        self._pending = ''        # 尚未切分的原始文本
+        self._scan_position = 0   # _pending中已扫描到的位置
+        self._hazard = False      # 最近的非空白行是否为只含标记的行
+        self._open_bracket = False  # 是否有未闭合的 [
+        self._open_paren = False    # 是否有未闭合的 ](
+        self._held = ''           # 已清理但暂缓输出的尾部空白
+        self._started = False     # 是否已输出过非空白内容
+    
+    def feed(self, chunk: str) -> str:
+        """
+        输入一段新文本
+        
+        Args:
+            chunk: LLM新输出的文本片段
+        
+        Returns:
+            本次可以确定的清理后文本（可能为空字符串）
+        """
+        if not chunk:
+            return ''
+        
+        # 输入片段先放入列表，避免逐个片段拼接字符串；只有含换行的片段才可能产生安全的切分点
+        self._chunks.append(chunk)
+        if '\n' not in chunk:
+            return ''
+        
+        text = ''.join(self._chunks)
+        self._chunks = [text]
+        if len(self._pending) + len(text) < self.min_segment:
+            return ''
+        
+        self._pending += text
+        self._chunks = []
+        return self._emit(self._take_segments())
+    
+    def finish(self) -> str:
+        """结束输入，返回剩余的清理后文本"""
+        segment = self._pending + ''.join(self._chunks)
+        self._pending, self._chunks = '', []
+        self._scan_position = 0
+        output = self._emit(clean_markdown_body(segment)) if segment else ''
+        # 丢弃末尾空白（等价于strip）
+        self._held = ''
+        return output
+    
+    def _take_segments(self) -> str:
+        """切出所有以安全行边界结尾的片段并清理"""
+        safe_end = 0
+        position = self._scan_position
+        
+        while True:
+            newline = self._pending.find('\n', position)
+            if newline < 0:
+                break
+            
+            line = self._pending[position:newline]
+            position = newline + 1
+            
+            # 空白行（包括去掉链接后为空白的行）延续前一行的状态：行首标记的 \s+ 会继续吞掉空白行；
+            # 闭合跨行链接的行会和前面的行合并，合并后的行首也可能只剩标记
+            in_link = self._open_bracket or self._open_paren
+            line_probe = _line_probe(line)
+            if line_probe:
+                self._hazard = in_link or _is_marker_line(line_probe)
+            elif in_link:
+                self._hazard = True
+            
+            # 链接的 [文本] 和 (链接) 部分都可以跨行
+            if '[' in line or ']' in line or ')' in line:
+                probe = _strip_inline_markers(line)
+                last_open, last_close = probe.rfind('['), probe.rfind(']')
+                if last_open >= 0 or last_close >= 0:
+                    self._open_bracket = last_open > last_close
+                last_open, last_close = probe.rfind(']('), probe.rfind(')')
+                if last_open >= 0 or last_close >= 0:
+                    self._open_paren = last_open > last_close
+            
+            if not (self._hazard or self._open_bracket or self._open_paren):
+                safe_end = position
+        
+        # 相邻的安全片段可以合并后一次清理，结果不变
+        cleaned = clean_markdown_body(self._pending[:safe_end]) if safe_end else ''
+        self._pending = self._pending[safe_end:]
+        self._scan_position = position - safe_end
+        return cleaned
+    
+    def _emit(self, text: str) -> str:
+        """合并多余空行、去除首部空白，并暂缓末尾空白直到后续出现非空白内容"""
+        if not text:
+            return ''
+        
+        text = self._held + text
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                self._held = ''
+                return ''
+        
+        stripped = text.rstrip()
+        self._held = text[len(stripped):]
+        if not stripped:
+            return ''
+        
+        self._started = True
+        return _BLANK_LINES_PATTERN.sub('\n\n', stripped)
@@ -0,0 +1,402 @@
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 直方图分桶：耗时（秒）、文档数、token数
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+COUNT_BUCKETS = (0, 1, 5, 10, 20, 30, 50, 100)
+TOKEN_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 内置指标: (名称, 类型, 说明, 标签, 分桶)
+_DEFINITIONS = [
+    ('reporter_agent_runs_total', 'counter', 'Agent执行次数', ('agent', 'status'), None),
+    ('reporter_stage_duration_seconds', 'histogram', 'Agent各阶段耗时', ('agent', 'stage'), SECONDS_BUCKETS),
+    ('reporter_stage_failures_total', 'counter', 'Agent各阶段失败次数', ('agent', 'stage'), None),
+    ('reporter_upstream_requests_total', 'counter', '上游HTTP请求次数（按状态码或错误类型）', ('upstream', 'outcome'), None),
+    ('reporter_upstream_request_duration_seconds', 'histogram', '上游HTTP单次请求耗时', ('upstream',), SECONDS_BUCKETS),
+    ('reporter_upstream_retries_total', 'counter', '上游HTTP请求重试次数', ('upstream',), None),
+    ('reporter_documents_retrieved', 'histogram', '每次搜索获得的网页数', ('agent',), COUNT_BUCKETS),
+    ('reporter_documents_kept', 'histogram', 'rerank后保留的文档数', ('agent',), COUNT_BUCKETS),
+    ('reporter_rerank_fallbacks_total', 'counter', 'rerank不可用时使用BM25排序兜底的次数', ('agent',), None),
+    ('reporter_context_tokens', 'histogram', '分析上下文的估算token数', ('agent',), TOKEN_BUCKETS),
+    ('reporter_llm_tokens_total', 'counter', 'DeepSeek token用量', ('agent', 'kind'), None),
+    ('reporter_last_run_timestamp_seconds', 'gauge', 'Agent最近一次执行结束的时间', ('agent',), None),
+    ('reporter_change_delta_ratio', 'gauge', '最近一次执行中新增或内容变化的文档比例', ('agent',), None),
+    ('reporter_slack_outbox_deliveries_total', 'counter', 'Slack发件箱投递次数（sent/retry/failed）', ('outcome',), None),
+]
+
+def upstream_label(upstream: Optional[str]) -> str:
+    """上游名称作为标签值（slack:<webhook> 只保留 slack，避免webhook地址出现在指标中）"""
+    return upstream.partition(':')[0] if upstream else 'other'
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """格式化标签集合，例如 {agent="a",stage="search"}"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_value(value: float) -> str:
+    """格式化样本值（整数不带小数点）"""
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """单个指标及其各标签组合的取值"""
+
+    def __init__(self, name: str, kind: str, help_text: str, label_names: Tuple[str, ...],
+                 buckets: Optional[Sequence[float]] = None):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets) if buckets else ()
+        # 标签值 -> 计数器/仪表值，或直方图的 [各分桶计数..., 总和, 样本数]
+        self.values: Dict[Tuple[str, ...], Any] = {}
+
+    def samples(self) -> Iterator[Tuple[str, float]]:
+        """生成 (样本名{标签}, 值)，直方图分桶为累计计数"""
+        for label_values, value in sorted(self.values.items()):
+            if self.kind != 'histogram':
+                yield self.name + _format_labels(self.label_names, label_values), value
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets, value):
+                cumulative += count
+                yield self.name + '_bucket' + _format_labels(self.label_names, label_values, f'le="{_format_value(bound)}"'), cumulative
+            yield self.name + '_bucket' + _format_labels(self.label_names, label_values, 'le="+Inf"'), value[-1]
+            yield self.name + '_sum' + _format_labels(self.label_names, label_values), value[-2]
+            yield self.name + '_count' + _format_labels(self.label_names, label_values), value[-1]
+
+class MetricsRegistry:
+    """
+    进程内指标注册表 - 计数器、仪表和直方图，输出Prometheus文本格式
+
+    守护模式下通过HTTP端点供Prometheus抓取；cron模式下每次运行结束后把指标累加写入
+    node_exporter的textfile collector文件，多次运行之间计数器和直方图持续累计。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        for name, kind, help_text, label_names, buckets in _DEFINITIONS:
+            self.register(name, kind, help_text, label_names, buckets)
+
+    def register(self, name: str, kind: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Optional[Sequence[float]] = None):
+        """
+        注册指标（重复注册同名指标会被忽略）
+
+        Args:
+            name: 指标名称
+            kind: counter、gauge 或 histogram
+            help_text: 指标说明
+            label_names: 标签名称
+            buckets: 直方图分桶上界（从小到大）
+        """
+        if kind not in ('counter', 'gauge', 'histogram'):
+            raise ValueError(f"未知的指标类型: {kind}")
+        if kind == 'histogram' and not buckets:
+            raise ValueError(f"直方图 {name} 缺少分桶")
+        with self._lock:
+            self._metrics.setdefault(name, _Metric(name, kind, help_text, tuple(label_names), buckets))
+
+    def _label_values(self, metric: _Metric, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        """按指标的标签顺序取出标签值"""
+        return tuple(str(labels.get(name, '')) for name in metric.label_names)
+
+    def inc(self, name: str, value: float = 1, **labels: Any):
+        """计数器增加value"""
+        metric = self._metrics[name]
+        key = self._label_values(metric, labels)
+        with self._lock:
+            metric.values[key] = metric.values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any):
+        """设置仪表的值"""
+        metric = self._metrics[name]
+        key = self._label_values(metric, labels)
+        with self._lock:
+            metric.values[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any):
+        """直方图记录一个样本"""
+        metric = self._metrics[name]
+        key = self._label_values(metric, labels)
+        with self._lock:
+            state = metric.values.get(key)
+            if state is None:
+                state = [0] * len(metric.buckets) + [0.0, 0]
+                metric.values[key] = state
+            index = bisect.bisect_left(metric.buckets, value)
+            if index < len(metric.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def record_stage(self, agent_id: str, stage: str, seconds: float, success: bool = True):
+        """
+        记录Agent一个阶段的耗时和结果
+
+        Args:
+            agent_id: Agent ID
+            stage: 阶段名称（search/rerank/analyze/deliver）
+            seconds: 耗时（秒）
+            success: 阶段是否成功
+        """
+        self.observe('reporter_stage_duration_seconds', seconds, agent=agent_id, stage=stage)
+        if not success:
+            self.inc('reporter_stage_failures_total', agent=agent_id, stage=stage)
+
+    def drain(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """
+        取出自上次取出以来的指标增量：计数器和直方图取出后清零，仪表保留当前值
+
+        Returns:
+            指标名称 -> {标签值: 值}，没有样本的指标不包含在内
+        """
+        values: Dict[str, Dict[Tuple[str, ...], Any]] = {}
+        with self._lock:
+            for metric in self._metrics.values():
+                if not metric.values:
+                    continue
+                if metric.kind == 'gauge':
+                    values[metric.name] = dict(metric.values)
+                else:
+                    values[metric.name] = metric.values
+                    metric.values = {}
+        return values
+
+    def merge(self, values: Dict[str, Dict[Tuple[str, ...], Any]]):
+        """
+        合并其他进程取出的指标增量（drain的返回值）：计数器和直方图累加，仪表取新值
+
+        Args:
+            values: 指标名称 -> {标签值: 值}，未注册的指标被忽略
+        """
+        with self._lock:
+            for name, samples in values.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in samples.items():
+                    if metric.kind == 'gauge':
+                        metric.values[key] = value
+                    elif metric.kind == 'counter':
+                        metric.values[key] = metric.values.get(key, 0) + value
+                    else:
+                        state = metric.values.get(key)
+                        metric.values[key] = list(value) if state is None else [a + b for a, b in zip(state, value)]
+
+    def render(self) -> str:
+        """输出Prometheus文本格式"""
+        lines: List[str] = []
+        with self._lock:
+            for metric in self._metrics.values():
+                if not metric.values:
+                    continue
+                lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(f"{sample} {_format_value(value)}" for sample, value in metric.samples())
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def write_textfile(self, path: str, accumulate: bool = True):
+        """
+        写入node_exporter textfile collector文件（先写临时文件再替换）
+
+        Args:
+            path: 输出文件路径（应以 .prom 结尾）
+            accumulate: 是否与文件中已有的计数器和直方图样本累加（cron模式每次运行是新进程）
+        """
+        target = os.path.abspath(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with _FileLock(target + '.lock'):
+            previous = _parse_textfile(target) if accumulate else {}
+            with self._lock:
+                blocks = []
+                for metric in self._metrics.values():
+                    samples = dict(metric.samples())
+                    old_samples = previous.get(metric.name, {})
+                    if metric.kind != 'gauge':
+                        for sample, value in old_samples.items():
+                            samples[sample] = samples.get(sample, 0) + value
+                    else:
+                        samples = {**old_samples, **samples}
+                    if not samples:
+                        continue
+                    blocks.append(f"# HELP {metric.name} {metric.help_text}")
+                    blocks.append(f"# TYPE {metric.name} {metric.kind}")
+                    blocks.extend(f"{sample} {_format_value(value)}"
+                                  for sample, value in sorted(samples.items(), key=_sample_order))
+
+            temp = f"{target}.{os.getpid()}.tmp"
+            with open(temp, 'w', encoding='utf-8') as file:
+                file.write('\n'.join(blocks) + '\n' if blocks else '')
+            os.replace(temp, target)
+
+    def start_http_server(self, port: int, host: str = '127.0.0.1'):
+        """
+        在后台线程中启动 /metrics HTTP端点（没有认证，默认只监听本机地址）
+
+        Args:
+            port: 监听端口
+            host: 监听地址，需要从其他主机或容器外采集时设为 0.0.0.0
+
+        Returns:
+            HTTP服务器实例（调用shutdown()停止）
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+        thread.start()
+        print(f"📈 指标端点: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+def _sample_order(item: Tuple[str, float]) -> Tuple[str, float]:
+    """textfile样本排序键：按样本名和标签排序，直方图分桶按上界数值从小到大"""
+    sample = item[0]
+    head, marker, tail = sample.partition('le="')
+    if not marker:
+        return sample, 0.0
+    bound = tail.split('"', 1)[0]
+    return head, float('inf') if bound == '+Inf' else float(bound)
+
+def _parse_textfile(path: str) -> Dict[str, Dict[str, float]]:
+    """读取已有的textfile，返回 指标名称 -> {样本名{标签}: 值}"""
+    metrics: Dict[str, Dict[str, float]] = {}
+    current = None
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith('# TYPE '):
+                    current = line.split()[2]
+                    continue
+                if not line or line.startswith('#') or current is None:
+                    continue
+                sample, _, value = line.rpartition(' ')
+                try:
+                    metrics.setdefault(current, {})[sample] = float(value)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return metrics
+
+class _FileLock:
+    """跨进程文件锁（重叠执行的cron进程依次写入），不支持fcntl的平台上不加锁"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        try:
+            import fcntl
+        except ImportError:
+            return self
+        self._file = open(self.path, 'a')
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            import fcntl
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> MetricsRegistry:
+    """获取进程内共享的指标注册表"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
+
+def forward_metrics(queue):
+    """
+    把本进程的指标增量发送给父进程（守护模式的worker进程每个任务完成后调用）
+
+    Args:
+        queue: multiprocessing.Queue，由父进程的start_metrics_collector读取
+    """
+    values = get_metrics().drain()
+    if values:
+        queue.put(values)
+
+def start_metrics_collector(queue) -> threading.Thread:
+    """
+    在后台线程中把worker进程发来的指标增量合并到本进程的注册表，/metrics端点因此包含worker的指标；
+    向queue放入None后线程退出
+
+    Args:
+        queue: multiprocessing.Queue
+
+    Returns:
+        收集线程
+    """
+    def collect():
+        while True:
+            values = queue.get()
+            if values is None:
+                break
+            get_metrics().merge(values)
+
+    thread = threading.Thread(target=collect, name='metrics-collector', daemon=True)
+    thread.start()
+    return thread
+
+class StageTimer:
+    """
+    阶段计时上下文: with StageTimer(agent_id, 'search') as stage: ...
+
+    退出时记录耗时；出现异常或把 stage.success 设为False时计为失败。
+    """
+
+    def __init__(self, agent_id: str, stage: str):
+        self.agent_id = agent_id
+        self.stage = stage
+        self.success = True
+        self._started = 0.0
+
+    def __enter__(self) -> 'StageTimer':
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        success = self.success and exc_type is None
+        get_metrics().record_stage(self.agent_id, self.stage, time.perf_counter() - self._started, success)
+        return False
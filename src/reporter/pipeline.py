@@ -0,0 +1,152 @@
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .agents.base_agent import BaseAgent
+from .tracing import get_tracer, record_result
+
+# 各阶段默认的工作线程数，可在tasks.yaml的 global.pipeline 中覆盖
+DEFAULT_STAGE_WORKERS = {
+    'search': 4,     # BochaAI搜索 + 文档组装
+    'rerank': 2,     # rerank过滤 + 上下文组装
+    'analyze': 2,    # DeepSeek分析
+    'deliver': 2,    # Slack发送
+    'execute': 3,    # 未拆分阶段的Agent整体执行
+}
+
+# 每个阶段队列的默认容量
+DEFAULT_QUEUE_SIZE = 8
+
+# 阶段函数: 接收并返回执行状态字典，状态中出现 'result' 表示Agent执行结束
+StageFunc = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+class StagePipeline:
+    """
+    阶段流水线执行器 - 把Agent拆分为搜索、rerank、分析、发送等阶段并行流水执行
+
+    每个阶段有独立的有界队列和工作线程，一个Agent在等待DeepSeek时，
+    其他Agent的搜索可以同时进行；队列满时上游阶段阻塞，避免单个上游被压垮。
+    阶段按Agent声明的顺序单向流转，不应出现回到前面阶段的循环。
+    每个Agent的根span在入队时创建、随状态在各阶段线程间传递，结束时导出。
+    """
+
+    def __init__(self, workers: Optional[Dict[str, int]] = None, queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        初始化流水线
+
+        Args:
+            workers: 阶段名称 -> 工作线程数，未配置的阶段使用DEFAULT_STAGE_WORKERS
+            queue_size: 每个阶段队列的容量
+        """
+        self.workers = dict(DEFAULT_STAGE_WORKERS)
+        self.workers.update(workers or {})
+        self.queue_size = queue_size
+
+    def run(self, agents: List[BaseAgent]) -> Dict[str, Dict[str, Any]]:
+        """
+        以流水线方式执行一组Agent
+
+        Args:
+            agents: Agent列表
+
+        Returns:
+            每个Agent的执行结果字典
+        """
+        if not agents:
+            return {}
+
+        plans: List[Tuple[BaseAgent, List[Tuple[str, StageFunc]]]] = [
+            (agent, agent.get_pipeline_stages()) for agent in agents
+        ]
+
+        # 按首次出现的顺序收集阶段
+        stage_names: List[str] = []
+        for _, steps in plans:
+            for stage_name, _ in steps:
+                if stage_name not in stage_names:
+                    stage_names.append(stage_name)
+
+        queues = {name: queue.Queue(maxsize=self.queue_size) for name in stage_names}
+        results: Dict[str, Dict[str, Any]] = {}
+        finished = [0]
+        all_done = threading.Condition()
+
+        tracer = get_tracer()
+
+        def finish(agent: BaseAgent, result: Dict[str, Any], span=None):
+            if span is not None:
+                record_result(span, result)
+                span.end()
+            with all_done:
+                results[agent.agent_id] = result
+                finished[0] += 1
+                all_done.notify_all()
+
+        def worker(stage_name: str):
+            stage_queue = queues[stage_name]
+            while True:
+                job = stage_queue.get()
+                if job is None:
+                    return
+
+                agent, steps, index, state = job
+                try:
+                    with tracer.use_span(state.get('span')):
+                        state = steps[index][1](state)
+                except Exception as e:
+                    print(f"❌ Agent '{agent.agent_id}' 阶段 {stage_name} 执行异常: {str(e)}")
+                    state['result'] = {
+                        'success': False,
+                        'error': str(e),
+                        'agent_id': agent.agent_id
+                    }
+
+                if 'result' in state:
+                    finish(agent, state['result'], state.get('span'))
+                elif index + 1 >= len(steps):
+                    finish(agent, {
+                        'success': False,
+                        'error': '流水线阶段结束但没有产生结果',
+                        'agent_id': agent.agent_id
+                    }, state.get('span'))
+                else:
+                    queues[steps[index + 1][0]].put((agent, steps, index + 1, state))
+
+        threads = []
+        for stage_name in stage_names:
+            for i in range(max(1, self.workers.get(stage_name, 2))):
+                thread = threading.Thread(
+                    target=worker,
+                    args=(stage_name,),
+                    name=f"pipeline-{stage_name}-{i}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append((stage_name, thread))
+
+        print("🔀 流水线阶段: " + " → ".join(
+            f"{name}({max(1, self.workers.get(name, 2))})" for name in stage_names
+        ))
+
+        for agent, steps in plans:
+            if not steps:
+                finish(agent, {
+                    'success': False,
+                    'error': 'Agent没有可执行的阶段',
+                    'agent_id': agent.agent_id
+                })
+                continue
+            span = tracer.start_span('execute_agent', task_id=agent.agent_id, agent_name=agent.agent_name, engine='pipeline')
+            queues[steps[0][0]].put((agent, steps, 0, {'span': span}))
+
+        with all_done:
+            while finished[0] < len(plans):
+                all_done.wait()
+
+        # 所有Agent完成后停止工作线程
+        for stage_name, _ in threads:
+            queues[stage_name].put(None)
+        for _, thread in threads:
+            thread.join()
+
+        return results
@@ -0,0 +1,173 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# 各上游默认的限流配置: rate为每秒补充的令牌数，burst为桶容量
+# 可在tasks.yaml的 global.rate_limits 中覆盖，slack的限制对每个webhook独立生效
+DEFAULT_RATE_LIMITS = {
+    'search': {'rate': 2.0, 'burst': 4},
+    'rerank': {'rate': 2.0, 'burst': 4},
+    'deepseek': {'rate': 1.0, 'burst': 2},
+    'slack': {'rate': 1.0, 'burst': 1},
+}
+
+def _strictness(limit: Dict[str, Any]) -> float:
+    """限流配置的严格程度（每秒请求数，不限流为无穷大）"""
+    rate = limit.get('rate')
+    return float(rate) if rate else float('inf')
+
+class TokenBucket:
+    """令牌桶 - 线程安全，支持按Retry-After暂停"""
+
+    def __init__(self, rate: float, burst: float):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        预留一个令牌
+
+        Returns:
+            获得令牌前需要等待的秒数（0表示可以立即发送）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+
+            wait = 0.0
+            if self._tokens < 0:
+                wait = -self._tokens / self.rate
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float):
+        """在指定秒数内暂停发放令牌（用于遵循Retry-After）"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+class RateLimiter:
+    """按上游划分的限流器 - 搜索、rerank、DeepSeek和每个Slack webhook各有一个令牌桶"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        初始化限流器
+
+        Args:
+            limits: 上游名称 -> {'rate': 每秒请求数, 'burst': 突发容量}
+        """
+        self._limits: Dict[str, Dict[str, Any]] = {}
+        # 配置来源（任务配置文件） -> 该来源覆盖的限流配置
+        self._sources: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.configure(limits)
+
+    def configure(self, limits: Optional[Dict[str, Dict[str, Any]]] = None, source: str = 'default'):
+        """
+        设置一个配置来源的限流配置，只有生效配置发生变化的上游会重建令牌桶
+
+        多个来源（多个任务配置文件）配置同一个上游时取最严格的限制（rate最小，0表示不限流），
+        重复加载相同的配置不会重置令牌桶的状态。
+
+        Args:
+            limits: 上游名称 -> {'rate': 每秒请求数, 'burst': 突发容量}，
+                    rate为0或null表示不限流
+            source: 配置来源（如任务配置文件路径）
+        """
+        overrides = {
+            name: dict(limit) if isinstance(limit, dict) else {'rate': limit}
+            for name, limit in (limits or {}).items()
+        }
+        with self._lock:
+            self._sources[source] = overrides
+            self._apply_sources()
+
+    def remove_source(self, source: str):
+        """移除一个配置来源（如已删除的任务配置文件）的限流配置"""
+        with self._lock:
+            if self._sources.pop(source, None) is not None:
+                self._apply_sources()
+
+    def _apply_sources(self):
+        """合并默认配置和各来源的配置，丢弃生效配置发生变化的上游的令牌桶（调用方需持有锁）"""
+        merged = {name: dict(limit) for name, limit in DEFAULT_RATE_LIMITS.items()}
+        overridden: Dict[str, Dict[str, Any]] = {}
+        for overrides in self._sources.values():
+            for name, limit in overrides.items():
+                current = overridden.get(name)
+                if current is None or _strictness(limit) < _strictness(current):
+                    overridden[name] = limit
+        merged.update(overridden)
+
+        changed = {name for name in set(merged) | set(self._limits) if merged.get(name) != self._limits.get(name)}
+        self._limits = merged
+        if changed:
+            self._buckets = {
+                upstream: bucket for upstream, bucket in self._buckets.items()
+                if upstream.split(':', 1)[0] not in changed
+            }
+
+    def _get_bucket(self, upstream: str) -> Optional[TokenBucket]:
+        """获取上游的令牌桶；'slack:<webhook>'使用slack的配置，未配置或不限流返回None"""
+        with self._lock:
+            bucket = self._buckets.get(upstream)
+            if bucket is not None:
+                return bucket
+
+            limit = self._limits.get(upstream.split(':', 1)[0])
+            if not limit or not limit.get('rate'):
+                return None
+
+            rate = float(limit['rate'])
+            bucket = TokenBucket(rate, float(limit.get('burst', max(1.0, rate))))
+            self._buckets[upstream] = bucket
+            return bucket
+
+    def acquire(self, upstream: Optional[str]):
+        """阻塞等待上游的一个令牌"""
+        if not upstream:
+            return
+        bucket = self._get_bucket(upstream)
+        if bucket is None:
+            return
+        wait = bucket.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, upstream: Optional[str]):
+        """异步等待上游的一个令牌"""
+        if not upstream:
+            return
+        bucket = self._get_bucket(upstream)
+        if bucket is None:
+            return
+        wait = bucket.reserve()
+        if wait > 0:
+            import asyncio
+            await asyncio.sleep(wait)
+
+    def pause(self, upstream: Optional[str], seconds: float):
+        """上游返回Retry-After时暂停该上游的令牌发放"""
+        if not upstream or seconds <= 0:
+            return
+        bucket = self._get_bucket(upstream)
+        if bucket is not None:
+            bucket.pause(seconds)
+
+_rate_limiter = RateLimiter()
+
+def get_rate_limiter() -> RateLimiter:
+    """获取进程内共享的限流器"""
+    return _rate_limiter
@@ -0,0 +1,394 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .http_client import get_transport
+from .metrics import get_metrics
+from .task_lease import default_replica_id
+from .tracing import get_tracer
+
+# 消息状态：pending 等待发送（包括等待重试），sending 发送中，sent 已发送，failed 重试次数用尽或webhook拒绝
+MESSAGE_PENDING = 'pending'
+MESSAGE_SENDING = 'sending'
+MESSAGE_SENT = 'sent'
+MESSAGE_FAILED = 'failed'
+
+_MESSAGE_COLUMNS = ('id', 'webhook_url', 'payload', 'source', 'status', 'attempts', 'available_at',
+                    'lease_until', 'sender', 'enqueued_at', 'sent_at', 'last_error')
+
+class SlackOutbox:
+    """
+    持久化的Slack发件箱 - 基于SQLite（WAL模式），Agent把渲染好的消息体写入发件箱后立即返回，
+    由后台发送线程投递
+
+    同一个webhook的消息按入队顺序逐条发送：只有最早一条未完成的消息可以被取出，
+    它等待重试期间后面的消息也不会发送。多个进程共享同一个数据库时，发送中的消息带有租约，
+    同一个webhook同时只有一条消息在发送；进程崩溃后租约过期的消息会被重新发送（可能重复一次）。
+    失败的消息按指数退避重试，webhook返回4xx（429除外）或重试次数用尽时标记为失败，不再阻塞后面的消息。
+    """
+
+    # 发送线程在没有可发送的消息时的轮询间隔（秒）
+    POLL_INTERVAL = 1
+
+    # 按传输层计算发送租约时额外预留的时间（秒），覆盖限流等待和数据库写入
+    SEND_LEASE_MARGIN = 60
+
+    def __init__(self, db_path: str, max_attempts: int = 8, retry_delay: float = 30,
+                 max_retry_delay: float = 3600, send_lease_seconds: Optional[float] = None,
+                 retention_seconds: float = 7 * 86400):
+        """
+        初始化发件箱
+
+        Args:
+            db_path: SQLite数据库文件路径
+            max_attempts: 每条消息的最大发送次数
+            retry_delay: 第一次重试前的等待时间（秒），之后每次翻倍
+            max_retry_delay: 重试等待时间的上限（秒）
+            send_lease_seconds: 发送租约（秒），超过该时间仍未完成的发送视为进程已崩溃；
+                                None表示按传输层的超时和重试计算（一次发送最长耗时 + SEND_LEASE_MARGIN），
+                                租约短于一次发送的最长耗时会导致其他进程重复发送
+            retention_seconds: 已发送消息的保留时间（秒），更早的记录在初始化时清理
+        """
+        self.db_path = db_path
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        if send_lease_seconds is None:
+            send_lease_seconds = get_transport().max_request_seconds() + self.SEND_LEASE_MARGIN
+        self.send_lease_seconds = send_lease_seconds
+        self.sender_id = default_replica_id()
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS slack_outbox ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " webhook_url TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " source TEXT,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " available_at REAL NOT NULL,"
+                " lease_until REAL,"
+                " sender TEXT,"
+                " enqueued_at REAL NOT NULL,"
+                " sent_at REAL,"
+                " last_error TEXT)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_slack_outbox_webhook ON slack_outbox (webhook_url, status, id)"
+            )
+            self._conn.execute(
+                "DELETE FROM slack_outbox WHERE status = ? AND sent_at < ?",
+                (MESSAGE_SENT, time.time() - retention_seconds)
+            )
+            self._conn.commit()
+
+    def enqueue(self, webhook_url: str, payloads: List[dict],
+                sources: Optional[List[Optional[str]]] = None) -> List[int]:
+        """
+        把一批消息体（一份或合并发送的多份报告，可能拆成多条）在同一个事务中加入发件箱，并唤醒发送线程
+
+        任何一条写入失败时整批都不会写入，调用方可以安全地改为直接发送整批消息。
+
+        Args:
+            webhook_url: Slack webhook地址
+            payloads: Slack webhook请求体列表，按顺序发送
+            sources: 与payloads一一对应的报告来源（Agent名称，用于查看），None表示不记录
+
+        Returns:
+            消息ID列表
+        """
+        now = time.time()
+        sources = sources if sources is not None else [None] * len(payloads)
+        with self._lock:
+            ids = []
+            # 连接作为上下文管理器：全部写入成功后提交，出现异常时回滚
+            with self._conn:
+                for payload, source in zip(payloads, sources):
+                    cursor = self._conn.execute(
+                        "INSERT INTO slack_outbox (webhook_url, payload, source, status, available_at, enqueued_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (webhook_url, json.dumps(payload, ensure_ascii=False), source, MESSAGE_PENDING, now, now)
+                    )
+                    ids.append(cursor.lastrowid)
+        self._wakeup.set()
+        return ids
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        取出一条可以发送的消息：各webhook最早一条未完成的消息中，已到重试时间或发送租约已过期的一条
+
+        Returns:
+            消息记录（attempts已加1），没有可发送的消息时返回None
+        """
+        with self._lock:
+            while True:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT id FROM slack_outbox"
+                    " WHERE id IN (SELECT MIN(id) FROM slack_outbox WHERE status IN (?, ?) GROUP BY webhook_url)"
+                    " AND ((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))"
+                    " ORDER BY available_at, id LIMIT 1",
+                    (MESSAGE_PENDING, MESSAGE_SENDING, MESSAGE_PENDING, now, MESSAGE_SENDING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                # 条件更新保证多个进程同时取到同一条消息时只有一个成功
+                cursor = self._conn.execute(
+                    "UPDATE slack_outbox SET status = ?, attempts = attempts + 1, lease_until = ?, sender = ?"
+                    " WHERE id = ? AND ((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))",
+                    (MESSAGE_SENDING, now + self.send_lease_seconds, self.sender_id, row[0],
+                     MESSAGE_PENDING, now, MESSAGE_SENDING, now)
+                )
+                self._conn.commit()
+                if cursor.rowcount:
+                    return self._get(row[0])
+
+    def mark_sent(self, message_id: int):
+        """记录消息已发送"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE slack_outbox SET status = ?, sent_at = ?, lease_until = NULL, last_error = NULL"
+                " WHERE id = ? AND status = ?",
+                (MESSAGE_SENT, time.time(), message_id, MESSAGE_SENDING)
+            )
+            self._conn.commit()
+
+    def mark_failed(self, message_id: int, error: str, retry: bool = True) -> str:
+        """
+        记录消息发送失败，可以重试时按指数退避重新等待发送
+
+        Args:
+            message_id: 消息ID
+            error: 失败原因
+            retry: 是否可以重试（webhook拒绝的消息不重试）
+
+        Returns:
+            消息的新状态
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM slack_outbox WHERE id = ?", (message_id,)).fetchone()
+            if row is None:
+                return MESSAGE_FAILED
+            if retry and row[0] < self.max_attempts:
+                status = MESSAGE_PENDING
+                available_at = now + min(self.max_retry_delay, self.retry_delay * (2 ** (row[0] - 1)))
+            else:
+                status, available_at = MESSAGE_FAILED, now
+            self._conn.execute(
+                "UPDATE slack_outbox SET status = ?, available_at = ?, lease_until = NULL, last_error = ?"
+                " WHERE id = ? AND status = ?",
+                (status, available_at, error, message_id, MESSAGE_SENDING)
+            )
+            self._conn.commit()
+            return status
+
+    def deliver(self, message: Dict[str, Any]) -> str:
+        """
+        发送一条已取出的消息并记录结果
+
+        Returns:
+            消息的新状态
+        """
+        url = message['webhook_url']
+        with get_tracer().span('slack_outbox_send', message_id=message['id'], attempt=message['attempts'],
+                               source=message['source']) as span:
+            try:
+                # Webhook投递不是幂等的，读超时和5xx后不重试，避免重复消息（由发件箱按退避重新发送）
+                response = get_transport().post(
+                    url,
+                    data=message['payload'].encode('utf-8'),
+                    headers={'Content-Type': 'application/json'},
+                    idempotent=False,
+                    upstream=f"slack:{url}"
+                )
+            except Exception as e:
+                span.set_error(str(e))
+                status = self.mark_failed(message['id'], str(e))
+            else:
+                if response.status_code == 200:
+                    self.mark_sent(message['id'])
+                    status = MESSAGE_SENT
+                else:
+                    error = f"HTTP {response.status_code}: {response.text[:200]}"
+                    span.set_error(error)
+                    # 4xx（限流除外）表示消息或webhook本身有问题，重试也不会成功
+                    retry = response.status_code == 429 or response.status_code >= 500
+                    status = self.mark_failed(message['id'], error, retry)
+            span.set_attribute('status', status)
+
+        get_metrics().inc('reporter_slack_outbox_deliveries_total',
+                          outcome='retry' if status == MESSAGE_PENDING else status)
+        if status == MESSAGE_SENT:
+            print(f"📮 发件箱消息 #{message['id']} 已发送到Slack ({message['source']})")
+        elif status == MESSAGE_PENDING:
+            print(f"🔁 发件箱消息 #{message['id']} 发送失败（第 {message['attempts']} 次），稍后重试")
+        else:
+            print(f"❌ 发件箱消息 #{message['id']} 发送失败，不再重试 ({message['source']})")
+        return status
+
+    def deliver_ready(self, deadline: Optional[float] = None, stop: Optional[threading.Event] = None) -> int:
+        """
+        在当前线程中发送所有可以发送的消息
+
+        截止时间和停止信号只在取出下一条消息前检查，正在发送的消息会发送完成（最长为传输层的重试时间）。
+
+        Args:
+            deadline: time.monotonic()截止时间，None表示不限制
+            stop: 设置后不再取出新的消息
+
+        Returns:
+            本次处理的消息数
+        """
+        processed = 0
+        while (deadline is None or time.monotonic() < deadline) and not (stop is not None and stop.is_set()):
+            message = self.claim_next()
+            if message is None:
+                break
+            self.deliver(message)
+            processed += 1
+        return processed
+
+    def start(self):
+        """启动后台发送线程（已启动时不重复启动）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run_sender, name='slack-outbox-sender', daemon=True)
+            self._thread.start()
+
+    def _run_sender(self):
+        """后台发送线程：发送可以发送的消息，没有时等待新消息或下一次轮询"""
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            try:
+                if self.deliver_ready(stop=self._stop) == 0:
+                    self._wakeup.wait(self.POLL_INTERVAL)
+            except Exception as e:
+                print(f"⚠️  Slack发件箱发送异常: {str(e)}")
+                self._stop.wait(self.POLL_INTERVAL)
+
+    def counts(self) -> Dict[str, int]:
+        """按状态统计消息数"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM slack_outbox GROUP BY status").fetchall()
+        return dict(rows)
+
+    def list_messages(self, statuses: Optional[List[str]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        查看发件箱中的消息（按入队顺序）
+
+        Args:
+            statuses: 只列出这些状态的消息，None表示全部
+            limit: 最多列出的消息数
+        """
+        statuses = statuses or [MESSAGE_PENDING, MESSAGE_SENDING, MESSAGE_SENT, MESSAGE_FAILED]
+        placeholders = ",".join("?" * len(statuses))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_MESSAGE_COLUMNS)} FROM slack_outbox"
+                f" WHERE status IN ({placeholders}) ORDER BY id LIMIT ?",
+                (*statuses, limit)
+            ).fetchall()
+        return [dict(zip(_MESSAGE_COLUMNS, row)) for row in rows]
+
+    def requeue_failed(self, message_ids: Optional[List[int]] = None) -> int:
+        """
+        把失败的消息重新放回发件箱（重新计算尝试次数）
+
+        Args:
+            message_ids: 只重新发送这些消息，None表示所有失败的消息
+
+        Returns:
+            重新放回的消息数
+        """
+        sql = "UPDATE slack_outbox SET status = ?, attempts = 0, available_at = ? WHERE status = ?"
+        params: List[Any] = [MESSAGE_PENDING, time.time(), MESSAGE_FAILED]
+        if message_ids is not None:
+            if not message_ids:
+                return 0
+            sql += f" AND id IN ({','.join('?' * len(message_ids))})"
+            params.extend(message_ids)
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+        self._wakeup.set()
+        return cursor.rowcount
+
+    def _get(self, message_id: int) -> Dict[str, Any]:
+        """读取消息记录（调用方需持有锁）"""
+        row = self._conn.execute(
+            f"SELECT {', '.join(_MESSAGE_COLUMNS)} FROM slack_outbox WHERE id = ?", (message_id,)
+        ).fetchone()
+        return dict(zip(_MESSAGE_COLUMNS, row))
+
+    def close(self, flush_timeout: float = 30):
+        """
+        停止发送线程，在flush_timeout秒内发送剩余可以发送的消息后关闭数据库连接
+
+        等待重试的消息保留在发件箱中，由之后的进程继续发送。发送线程在flush_timeout秒内
+        仍未完成当前消息时不再等待，该消息在发送租约过期后由之后的进程重新发送（可能重复一次）。
+        """
+        deadline = time.monotonic() + flush_timeout
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+            if self._thread.is_alive():
+                # 数据库连接仍由发送线程使用，不关闭（发送线程为守护线程，随进程退出）
+                print("⚠️  Slack发件箱发送线程未在超时时间内完成当前消息，放弃等待")
+                return
+            self._thread = None
+
+        self.deliver_ready(deadline)
+        counts = self.counts()
+        waiting = counts.get(MESSAGE_PENDING, 0) + counts.get(MESSAGE_SENDING, 0)
+        if waiting or counts.get(MESSAGE_FAILED, 0):
+            print(f"📮 Slack发件箱: {waiting} 条待发送, {counts.get(MESSAGE_FAILED, 0)} 条失败")
+
+        with self._lock:
+            self._conn.close()
+
+_outbox: Optional[SlackOutbox] = None
+_outbox_lock = threading.Lock()
+
+def get_slack_outbox() -> Optional[SlackOutbox]:
+    """获取进程内共享的Slack发件箱并启动发送线程（未配置SLACK_OUTBOX_DB时返回None，直接发送）"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            from config.config import Config
+            config = Config()
+            if not config.slack_outbox_db:
+                return None
+            _outbox = SlackOutbox(
+                config.slack_outbox_db,
+                max_attempts=config.slack_outbox_max_attempts,
+                retry_delay=config.slack_outbox_retry_delay,
+            )
+            _outbox.start()
+            print(f"📮 Slack发件箱: {config.slack_outbox_db}")
+        return _outbox
+
+def close_slack_outbox():
+    """关闭进程内的Slack发件箱（发送剩余消息，超时时间为SLACK_OUTBOX_FLUSH_TIMEOUT）"""
+    global _outbox
+    with _outbox_lock:
+        outbox, _outbox = _outbox, None
+    if outbox is not None:
+        from config.config import Config
+        outbox.close(Config().slack_outbox_flush_timeout)
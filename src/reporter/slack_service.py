@@ -1,115 +1,467 @@
-import requests
 import json
-from typing import Optional
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from datetime import datetime
 from config.config import Config
+from .http_client import get_transport
+from .tracing import get_tracer
+
+if TYPE_CHECKING:
+    from .slack_outbox import SlackOutbox
+
+# Slack消息限制：每条消息最多50个block，section文本最多3000字符，header文本最多150字符；
+# 简单文本消息超过40000字符会被截断
+SLACK_MAX_BLOCKS = 50
+SLACK_MAX_SECTION_CHARS = 3000
+SLACK_MAX_HEADER_CHARS = 150
+SLACK_MAX_TEXT_CHARS = 40000
+
+_FOOTER = "This report is automatically generated by BochaAI Search + DeepSeek Analysis"
+
+# 一份报告: (内容, 前缀, 查询)
+Report = Tuple[str, str, Optional[str]]
+
+# 当前线程/协程声明的待发送报告: (SlackService, 是否尚未加入合并批次)
+_expected_report: contextvars.ContextVar = contextvars.ContextVar('slack_expected_report', default=None)
+
+def split_text(text: str, limit: int) -> List[str]:
+    """
+    把文本切分为不超过limit个字符的片段，尽量在换行处断开
+    
+    Args:
+        text: 文本
+        limit: 每个片段的最大字符数
+    
+    Returns:
+        文本片段列表
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    chunks.append(text)
+    return chunks
+
+class _CoalesceBatch:
+    """合并窗口内等待发送到同一个webhook的报告"""
+    
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.reports: List[Report] = []
+        # 发送完成后的结果: 报告序号 -> 是否发送成功
+        self.future: Future = Future()
 
 class SlackService:
     """Slack 服务类 - 支持 Block Kit 和简单文本格式"""
     
-    def __init__(self, config: Config):
+    # 异步发送时检查合并批次是否可以提前发送的间隔（秒）
+    COALESCE_POLL_INTERVAL = 0.05
+    
+    def __init__(self, config: Config, coalesce_window: float = 0, outbox: Optional['SlackOutbox'] = None):
+        """
+        Args:
+            config: 配置（slack_webhook_url、use_slack_blocks）
+            coalesce_window: 合并窗口（秒），窗口内就绪的多份报告合并为一条消息发送，0表示不合并
+            outbox: Slack发件箱，设置后消息写入发件箱由后台线程投递，不在调用线程中发送
+        """
         self.config = config
+        self.coalesce_window = coalesce_window
+        self.outbox = outbox
+        self._batch: Optional[_CoalesceBatch] = None
+        self._batch_lock = threading.Lock()
+        # 批次变化（报告加入、声明的报告放弃发送）时通知等待中的批次
+        self._batch_changed = threading.Condition(self._batch_lock)
+        # 已声明（expecting_report）但尚未加入批次的报告数
+        self._expected = 0
     
-    def send_message(self, content: str, prefix: str = "AI分析报告", query: str = None) -> bool:
+    @contextmanager
+    def expecting_report(self):
         """
-        发送分析报告到Slack（支持Block Kit和简单文本两种格式）
+        声明当前执行（线程或协程）稍后可能发送一份报告
+        
+        合并窗口只在还有其他已声明的报告可能到达时等待：串行执行、守护模式逐个执行任务
+        或流水线的发送阶段没有其他声明的报告，第一份报告立即发送，不增加窗口延迟；
+        所有声明的报告都已加入批次（或放弃发送）时也提前发送。
+        """
+        if self.coalesce_window <= 0:
+            yield
+            return
+        
+        state = [self, True]
+        with self._batch_lock:
+            self._expected += 1
+        token = _expected_report.set(state)
+        try:
+            yield
+        finally:
+            _expected_report.reset(token)
+            with self._batch_lock:
+                if state[1]:
+                    state[1] = False
+                    self._expected -= 1
+                    self._batch_changed.notify_all()
+    
+    def _others_expected(self) -> bool:
+        """是否还有其他已声明的报告可能加入当前批次（调用方需持有锁）"""
+        return self._expected > 0
+    
+    def build_payload(self, content: str, prefix: str = "AI分析报告", query: str = None) -> dict:
+        """
+        构建Slack消息体（Block Kit或简单文本格式）
         
         Args:
             content: 要发送的消息内容
             prefix: 消息前缀
+            query: 查询内容
             
         Returns:
-            发送成功返回True，否则返回False
+            Slack webhook请求体（报告超过单条消息的限制时只包含第一部分，完整内容见build_payloads）
         """
-        try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            display_query = query or getattr(self.config, 'default_query', 'N/A')
-            
-            if self.config.use_slack_blocks:
-                # 使用 Slack Block Kit 格式（更美观）
-                slack_data = {
-                    "blocks": [
-                        {
-                            "type": "header",
-                            "text": {
-                                "type": "plain_text",
-                                "text": f"🤖 {prefix}"
-                            }
-                        },
-                        {
-                            "type": "section",
-                            "fields": [
-                                {
-                                    "type": "mrkdwn",
-                                    "text": f"*📅 Generated Time:*\n{current_time}"
-                                },
-                                {
-                                    "type": "mrkdwn",
-                                    "text": f"*🔍 Query Content:*\n{display_query}"
-                                }
-                            ]
-                        },
-                        {
-                            "type": "divider"
-                        },
-                        {
-                            "type": "section",
-                            "text": {
-                                "type": "mrkdwn",
-                                "text": f"*📊 Analysis Result:*\n{content}"
-                            }
-                        },
-                        {
-                            "type": "divider"
-                        },
-                        {
-                            "type": "context",
-                            "elements": [
-                                {
-                                    "type": "mrkdwn",
-                                    "text": "_This report is automatically generated by BochaAI Search + DeepSeek Analysis_"
-                                }
-                            ]
-                        }
-                    ]
+        return self.build_payloads([(content, prefix, query)])[0][0]
+    
+    def build_payloads(self, reports: List[Report]) -> List[Tuple[dict, List[int]]]:
+        """
+        把一份或多份报告打包为Slack消息体，每份报告保留自己的标题和查询信息
+        
+        多份报告尽量放在同一条消息中，超过block数或字符数限制时拆成多条；
+        单份报告本身超过限制时拆开发送。
+        
+        Args:
+            reports: 报告列表
+        
+        Returns:
+            [(Slack webhook请求体, 其中包含的报告序号列表)]
+        """
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if self.config.use_slack_blocks:
+            # 使用 Slack Block Kit 格式（更美观）
+            return self._pack_blocks(reports, current_time)
+        # 使用简单文本格式（兼容性更好）
+        return self._pack_text(reports, current_time)
+    
+    def _display_query(self, query: Optional[str]) -> str:
+        """消息中显示的查询内容"""
+        return query or getattr(self.config, 'default_query', 'N/A')
+    
+    def _report_blocks(self, report: Report, current_time: str) -> List[dict]:
+        """单份报告的Block Kit blocks：标题、时间和查询、分析结果（超过section长度限制时拆成多个section）"""
+        content, prefix, query = report
+        header = f"🤖 {prefix}"
+        if len(header) > SLACK_MAX_HEADER_CHARS:
+            header = header[:SLACK_MAX_HEADER_CHARS - 3] + "..."
+        
+        blocks = [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": header
+                }
+            },
+            {
+                "type": "section",
+                "fields": [
+                    {
+                        "type": "mrkdwn",
+                        "text": f"*📅 Generated Time:*\n{current_time}"
+                    },
+                    {
+                        "type": "mrkdwn",
+                        "text": f"*🔍 Query Content:*\n{self._display_query(query)}"
+                    }
+                ]
+            },
+            {
+                "type": "divider"
+            }
+        ]
+        for chunk in split_text(f"*📊 Analysis Result:*\n{content}", SLACK_MAX_SECTION_CHARS):
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": chunk
+                }
+            })
+        blocks.append({
+            "type": "divider"
+        })
+        return blocks
+    
+    def _pack_blocks(self, reports: List[Report], current_time: str) -> List[Tuple[dict, List[int]]]:
+        """按block数限制打包Block Kit消息，每条消息末尾附加一次说明"""
+        footer = {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"_{_FOOTER}_"
                 }
-            else:
-                # 使用简单文本格式（兼容性更好）
-                slack_message = f"""🤖 {prefix}
+            ]
+        }
+        limit = SLACK_MAX_BLOCKS - 1
+        
+        packed: List[Tuple[List[dict], List[int]]] = []
+        blocks: List[dict] = []
+        indices: List[int] = []
+        for index, report in enumerate(reports):
+            report_blocks = self._report_blocks(report, current_time)
+            if blocks and len(blocks) + len(report_blocks) > limit:
+                packed.append((blocks, indices))
+                blocks, indices = [], []
+            while len(report_blocks) > limit:
+                packed.append((report_blocks[:limit], [index]))
+                report_blocks = report_blocks[limit:]
+            blocks = blocks + report_blocks
+            indices.append(index)
+        if blocks:
+            packed.append((blocks, indices))
+        
+        return [({"blocks": blocks + [footer]}, indices) for blocks, indices in packed]
+    
+    def _pack_text(self, reports: List[Report], current_time: str) -> List[Tuple[dict, List[int]]]:
+        """按字符数限制打包简单文本消息，每条消息末尾附加一次说明"""
+        footer = f"\n\n───────────────────────────\n{_FOOTER}"
+        limit = SLACK_MAX_TEXT_CHARS - len(footer)
+        
+        packed: List[Tuple[str, List[int]]] = []
+        text = ""
+        indices: List[int] = []
+        for index, (content, prefix, query) in enumerate(reports):
+            report_text = f"""🤖 {prefix}
 
 📅 Generated Time: {current_time}
-🔍 Query Content: {display_query}
+🔍 Query Content: {self._display_query(query)}
 
 📊 Analysis Result:
-{content}
+{content}"""
+            separator = "\n\n═══════════════════════════\n\n" if text else ""
+            if text and len(text) + len(separator) + len(report_text) > limit:
+                packed.append((text, indices))
+                text, indices, separator = "", [], ""
+            chunks = split_text(report_text, limit)
+            for chunk in chunks[:-1]:
+                packed.append((chunk, [index]))
+            text = text + separator + chunks[-1]
+            indices.append(index)
+        if text:
+            packed.append((text, indices))
 
-───────────────────────────
-This report is automatically generated by BochaAI Search + DeepSeek Analysis"""
+        return [({'text': text + footer}, indices) for text, indices in packed]
+
+    def send_message(self, content: str, prefix: str = "AI分析报告", query: str = None) -> bool:
+        """
+        发送分析报告到Slack（支持Block Kit和简单文本两种格式）
+        
+        配置了合并窗口时，报告先加入当前批次，与同一webhook的其他报告合并发送；
+        只有其他声明了待发送报告（expecting_report）的执行尚未到达时才等待窗口。
+        
+        Args:
+            content: 要发送的消息内容
+            prefix: 消息前缀
+            
+        Returns:
+            发送成功返回True，否则返回False
+        """
+        with get_tracer().span('slack_send', blocks=self.config.use_slack_blocks, content_bytes=len(content.encode('utf-8'))) as span:
+            try:
+                report = (content, prefix, query)
+                if self.coalesce_window <= 0:
+                    return self._send_payloads([report], self.build_payloads([report]), span)[0]
                 
-                slack_data = {
-                    'text': slack_message
-                }
+                batch, index, is_leader = self._join_batch(report)
+                if not is_leader:
+                    return batch.future.result()[index]
+                
+                # 第一份报告负责发送整个批次：窗口结束或没有其他报告可能加入时发送
+                with self._batch_lock:
+                    while self._others_expected():
+                        remaining = batch.deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._batch_changed.wait(remaining)
+                payloads = self._close_batch(batch, span)
+                try:
+                    results = self._send_payloads(batch.reports, payloads, span)
+                except BaseException as e:
+                    batch.future.set_exception(e)
+                    raise
+                batch.future.set_result(results)
+                return results[index]
+            
+            except Exception as e:
+                print(f"❌ Slack service error: {str(e)}")
+                span.set_error(str(e))
+                return False
+    
+    async def asend_message(self, content: str, engine, prefix: str = "AI分析报告", query: str = None) -> bool:
+        """
+        异步发送分析报告到Slack
+        
+        Args:
+            content: 要发送的消息内容
+            engine: AsyncEngine实例
+            prefix: 消息前缀
+            query: 查询内容
+            
+        Returns:
+            发送成功返回True，否则返回False
+        """
+        with get_tracer().span('slack_send', blocks=self.config.use_slack_blocks, content_bytes=len(content.encode('utf-8'))) as span:
+            try:
+                report = (content, prefix, query)
+                if self.coalesce_window <= 0:
+                    return (await self._asend_payloads([report], self.build_payloads([report]), engine, span))[0]
+                
+                batch, index, is_leader = self._join_batch(report)
+                if not is_leader:
+                    return (await asyncio.wrap_future(batch.future))[index]
+                
+                # 事件循环中不能阻塞等待条件变量，按短间隔检查
+                while self._others_expected() and time.monotonic() < batch.deadline:
+                    await asyncio.sleep(min(self.COALESCE_POLL_INTERVAL, batch.deadline - time.monotonic()))
+                payloads = self._close_batch(batch, span)
+                try:
+                    results = await self._asend_payloads(batch.reports, payloads, engine, span)
+                except BaseException as e:
+                    batch.future.set_exception(e)
+                    raise
+                batch.future.set_result(results)
+                return results[index]
             
-            print("📱 Sending message to Slack...")
-            print(f"🔗 Using webhook URL: {self.config.slack_webhook_url[:50]}...{self.config.slack_webhook_url[-20:]}")
-            response = requests.post(
+            except Exception as e:
+                print(f"❌ Slack service error: {str(e)}")
+                span.set_error(str(e))
+                return False
+    
+    def _join_batch(self, report: Report) -> Tuple[_CoalesceBatch, int, bool]:
+        """
+        把报告加入当前合并批次（没有批次时创建）
+        
+        Returns:
+            (批次, 报告在批次中的序号, 是否为批次的第一份报告)
+        """
+        expected = _expected_report.get()
+        with self._batch_lock:
+            if expected is not None and expected[0] is self and expected[1]:
+                expected[1] = False
+                self._expected -= 1
+            batch = self._batch
+            is_leader = batch is None
+            if is_leader:
+                batch = _CoalesceBatch(time.monotonic() + self.coalesce_window)
+                self._batch = batch
+            batch.reports.append(report)
+            index = len(batch.reports) - 1
+            self._batch_changed.notify_all()
+        
+        if not is_leader:
+            print(f"📦 报告已加入合并批次 ({index + 1} 份)，等待合并发送")
+        return batch, index, is_leader
+    
+    def _close_batch(self, batch: _CoalesceBatch, span) -> List[Tuple[dict, List[int]]]:
+        """结束批次（之后的报告进入新批次），返回合并后的消息体"""
+        with self._batch_lock:
+            if self._batch is batch:
+                self._batch = None
+        
+        payloads = self.build_payloads(batch.reports)
+        span.set_attributes(coalesced_reports=len(batch.reports), payloads=len(payloads))
+        if len(batch.reports) > 1:
+            print(f"📦 合并 {len(batch.reports)} 份报告为 {len(payloads)} 条Slack消息")
+        return payloads
+    
+    def _send_payloads(self, reports: List[Report], payloads: List[Tuple[dict, List[int]]], span) -> Dict[int, bool]:
+        """
+        依次发送消息体（配置了发件箱时写入发件箱）
+        
+        Returns:
+            报告序号 -> 该报告的所有消息是否都发送成功（或已写入发件箱）
+        """
+        if self.outbox is not None and self._enqueue_payloads(reports, payloads, span):
+            return {index: True for index in range(len(reports))}
+        
+        self._print_sending()
+        results: Dict[int, bool] = {}
+        for slack_data, indices in payloads:
+            # Webhook投递不是幂等的，读超时和5xx后不重试，避免重复消息
+            response = get_transport().post(
                 self.config.slack_webhook_url,
                 data=json.dumps(slack_data),
-                headers={'Content-Type': 'application/json'}
+                headers={'Content-Type': 'application/json'},
+                idempotent=False,
+                upstream=f"slack:{self.config.slack_webhook_url}"
             )
-            
-            if response.status_code == 200:
-                print("✅ Message sent to Slack successfully!")
-                return True
-            else:
-                print(f"❌ Slack request failed, status code: {response.status_code}")
-                print(response.text)
-                return False
-                
+            success = self._handle_response(response, span)
+            for index in indices:
+                results[index] = results.get(index, True) and success
+        return results
+    
+    async def _asend_payloads(self, reports: List[Report], payloads: List[Tuple[dict, List[int]]], engine,
+                              span) -> Dict[int, bool]:
+        """依次异步发送消息体（配置了发件箱时写入发件箱），返回值同_send_payloads"""
+        if self.outbox is not None and self._enqueue_payloads(reports, payloads, span):
+            return {index: True for index in range(len(reports))}
+        
+        self._print_sending()
+        results: Dict[int, bool] = {}
+        for slack_data, indices in payloads:
+            response = await engine.post(
+                'slack',
+                self.config.slack_webhook_url,
+                content=json.dumps(slack_data),
+                headers={'Content-Type': 'application/json'},
+                idempotent=False
+            )
+            success = self._handle_response(response, span)
+            for index in indices:
+                results[index] = results.get(index, True) and success
+        return results
+    
+    def _enqueue_payloads(self, reports: List[Report], payloads: List[Tuple[dict, List[int]]], span) -> bool:
+        """
+        把消息体按顺序在同一个事务中写入发件箱（本地SQLite写入，不等待Slack响应）
+        
+        Returns:
+            写入成功返回True；发件箱不可用时返回False（没有任何消息写入），由调用方直接发送，不丢弃也不重复发送报告
+        """
+        try:
+            sources = [", ".join(reports[index][1] for index in indices) for _, indices in payloads]
+            message_ids = self.outbox.enqueue(self.config.slack_webhook_url,
+                                              [slack_data for slack_data, _ in payloads], sources)
         except Exception as e:
-            print(f"❌ Slack service error: {str(e)}")
+            print(f"⚠️  写入Slack发件箱失败，直接发送: {str(e)}")
+            return False
+        
+        span.set_attributes(outbox=True, outbox_messages=len(message_ids))
+        print(f"📮 已写入Slack发件箱: 消息 #{', #'.join(str(message_id) for message_id in message_ids)}")
+        return True
+    
+    def _print_sending(self):
+        """输出发送信息"""
+        print("📱 Sending message to Slack...")
+        print(f"🔗 Using webhook URL: {self.config.slack_webhook_url[:50]}...{self.config.slack_webhook_url[-20:]}")
+    
+    def _handle_response(self, response, span=None) -> bool:
+        """处理Slack响应"""
+        if response.status_code == 200:
+            print("✅ Message sent to Slack successfully!")
+            return True
+        else:
+            print(f"❌ Slack request failed, status code: {response.status_code}")
+            print(response.text)
+            if span is not None:
+                span.set_error(f"HTTP {response.status_code}")
             return False
     
     def send_error_message(self, error_msg: str) -> bool:
         """发送错误消息到Slack"""
-        return self.send_message(error_msg, "Error Report") 
\ No newline at end of file
+        return self.send_message(error_msg, "Error Report")
@@ -0,0 +1,159 @@
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# 租约状态：running 执行中（过期后其他副本可以接手），done 已执行完毕（不会再被认领）
+LEASE_RUNNING = 'running'
+LEASE_DONE = 'done'
+
+def default_replica_id() -> str:
+    """默认的副本ID：主机名（容器中为容器ID）加进程号"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def fire_key(fire_time: datetime) -> str:
+    """触发时间精确到分钟，cron模式和守护模式对同一次触发得到相同的key"""
+    return fire_time.strftime('%Y-%m-%d %H:%M')
+
+class TaskLeaseStore:
+    """
+    任务认领租约 - 基于SQLite，多个调度器副本共享同一个数据库文件
+
+    每个 (任务, 计划触发时间) 只会被一个副本认领：认领是一条原子的upsert，
+    只有不存在记录、或者记录仍在执行中但租约已过期（认领的副本崩溃）时才会成功。
+    执行完成的记录不会被再次认领。
+
+    数据库使用WAL模式，要求所有副本在同一台主机上（共享卷或bind mount），不支持NFS等网络文件系统。
+    """
+
+    def __init__(self, db_path: str, replica_id: Optional[str] = None, lease_seconds: float = 900,
+                 retention_seconds: float = 7 * 86400):
+        """
+        初始化租约存储
+
+        Args:
+            db_path: SQLite数据库文件路径
+            replica_id: 当前副本的ID，None时使用主机名和进程号
+            lease_seconds: 租约有效期（秒），应大于任务的最长执行时间
+            retention_seconds: 租约记录的保留时间（秒），更早的记录在初始化时清理
+        """
+        self.db_path = db_path
+        self.replica_id = replica_id or default_replica_id()
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+
+        self._lock = threading.Lock()
+        # (任务key, 触发时间) -> 本副本持有的租约ID
+        self._held: Dict[Tuple[str, str], str] = {}
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_leases ("
+                " task_key TEXT NOT NULL,"
+                " fire_time TEXT NOT NULL,"
+                " lease_id TEXT NOT NULL,"
+                " owner TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " success INTEGER,"
+                " acquired_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " finished_at REAL,"
+                " PRIMARY KEY (task_key, fire_time))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_task_leases_acquired ON task_leases (acquired_at)"
+            )
+            self._conn.execute(
+                "DELETE FROM task_leases WHERE acquired_at < ?",
+                (time.time() - retention_seconds,)
+            )
+            self._conn.commit()
+
+    def claim(self, task_key: str, fire_time: datetime) -> bool:
+        """
+        认领一次任务触发
+
+        Args:
+            task_key: 任务key（配置文件名和任务ID）
+            fire_time: 计划触发时间
+
+        Returns:
+            认领成功返回True；已被其他副本认领或已执行完毕返回False
+        """
+        now = time.time()
+        fire = fire_key(fire_time)
+        lease_id = secrets.token_hex(8)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO task_leases (task_key, fire_time, lease_id, owner, status, acquired_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (task_key, fire_time) DO UPDATE SET"
+                " lease_id = excluded.lease_id, owner = excluded.owner,"
+                " acquired_at = excluded.acquired_at, expires_at = excluded.expires_at"
+                " WHERE task_leases.status = ? AND task_leases.expires_at < ?",
+                (task_key, fire, lease_id, self.replica_id, LEASE_RUNNING, now, now + self.lease_seconds,
+                 LEASE_RUNNING, now)
+            )
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT lease_id FROM task_leases WHERE task_key = ? AND fire_time = ?",
+                (task_key, fire)
+            ).fetchone()
+
+            claimed = row is not None and row[0] == lease_id
+            if claimed:
+                self._held[(task_key, fire)] = lease_id
+            return claimed
+
+    def complete(self, task_key: str, fire_time: datetime, success: bool):
+        """
+        标记本副本认领的任务触发已执行完毕（租约已被其他副本接手时不修改）
+
+        Args:
+            task_key: 任务key
+            fire_time: 计划触发时间
+            success: 任务是否执行成功
+        """
+        fire = fire_key(fire_time)
+        with self._lock:
+            lease_id = self._held.pop((task_key, fire), None)
+            if lease_id is None:
+                return
+            self._conn.execute(
+                "UPDATE task_leases SET status = ?, success = ?, finished_at = ?"
+                " WHERE task_key = ? AND fire_time = ? AND lease_id = ?",
+                (LEASE_DONE, int(success), time.time(), task_key, fire, lease_id)
+            )
+            self._conn.commit()
+
+    def release(self, task_key: str, fire_time: datetime):
+        """
+        释放本副本认领的任务触发（执行失败、稍后由本副本重试时使用），释放后可以再次认领
+
+        Args:
+            task_key: 任务key
+            fire_time: 计划触发时间
+        """
+        fire = fire_key(fire_time)
+        with self._lock:
+            lease_id = self._held.pop((task_key, fire), None)
+            if lease_id is None:
+                return
+            self._conn.execute(
+                "DELETE FROM task_leases WHERE task_key = ? AND fire_time = ? AND lease_id = ?",
+                (task_key, fire, lease_id)
+            )
+            self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
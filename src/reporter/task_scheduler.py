@@ -1,12 +1,16 @@
 import os
 import json
 import yaml
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import time
 
 from .agent_factory import AgentFactory
+from .config_snapshot import CompiledTask, ConfigSnapshot, compile_tasks, get_config_cache
+from .pipeline import StagePipeline, DEFAULT_STAGE_WORKERS, DEFAULT_QUEUE_SIZE
+from .rate_limiter import get_rate_limiter
+from .tracing import get_tracer, record_result
 from .agents.base_agent import BaseAgent
 
 class TaskScheduler:
@@ -20,9 +24,16 @@ class TaskScheduler:
             config_file: 任务配置文件路径
         """
         self.config_file = config_file or self._get_default_config_file()
-        self.agents: List[BaseAgent] = []
         self.global_config = {}
         
+        # 任务描述（合并后的配置及摘要），Agent在执行或验证时才创建
+        self.tasks: List[CompiledTask] = []
+        self.snapshot: Optional[ConfigSnapshot] = None
+        
+        # 已创建的Agent: (任务ID, 任务摘要) -> Agent（创建失败为None），重新加载时复用摘要未变化的Agent
+        self._built_agents: Dict[Tuple[str, str], Optional[BaseAgent]] = {}
+        self._build_lock = threading.Lock()
+        
         # 加载所有任务配置
         self._load_tasks()
     
@@ -42,47 +53,98 @@ class TaskScheduler:
             return
         
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as file:
-                config_data = yaml.safe_load(file)
-            
-            # 加载全局配置
-            self.global_config = config_data.get('global', {})
-            print(f"✅ 加载全局配置: {len(self.global_config)} 项")
-            
-            # 加载任务列表
-            tasks = config_data.get('tasks', [])
-            
-            for task_config in tasks:
-                try:
-                    self._create_agent_from_task(task_config)
-                except Exception as e:
-                    print(f"❌ 创建任务Agent失败 '{task_config.get('id', 'unknown')}': {str(e)}")
-            
-            print(f"✅ 成功加载 {len(self.agents)} 个任务Agent")
+            # 编译后的配置快照在进程内和多次运行之间缓存，配置未变化时不再解析YAML
+            self._apply_snapshot(get_config_cache().load(self.config_file))
+            print(f"✅ 成功加载 {len(self.tasks)} 个任务")
             
         except Exception as e:
             print(f"❌ 加载任务配置文件失败: {str(e)}")
             print("正在创建默认任务配置...")
             self._create_default_config()
     
-    def _create_agent_from_task(self, task_config: Dict[str, Any]):
-        """从任务配置创建Agent"""
-        # 合并全局配置和任务配置
-        agent_config = {}
+    def reload(self) -> bool:
+        """
+        重新加载配置文件，定义发生变化的任务在下次执行时重新创建Agent
         
-        # 应用全局配置
-        agent_config.update(self.global_config)
+        Returns:
+            配置有变化返回True
+        """
+        try:
+            snapshot = get_config_cache().load(self.config_file)
+        except Exception as e:
+            print(f"❌ 重新加载任务配置文件失败: {str(e)}")
+            return False
         
-        # 应用任务特定配置（会覆盖全局配置）
-        agent_config.update(task_config)
+        if snapshot is self.snapshot:
+            return False
         
-        # 确保必需字段存在
-        if 'type' not in agent_config:
-            agent_config['type'] = self.global_config.get('agent_type', 'financial')
+        self._apply_snapshot(snapshot)
+        print(f"✅ 重新加载 {len(self.tasks)} 个任务")
+        return True
+    
+    def _apply_snapshot(self, snapshot: ConfigSnapshot):
+        """按配置快照更新全局配置和任务描述，摘要未变化的任务沿用已创建的Agent"""
+        self._apply_tasks(snapshot.global_config, snapshot.tasks)
+        self.snapshot = snapshot
+    
+    def _apply_tasks(self, global_config: Dict[str, Any], tasks: List[CompiledTask]):
+        """更新全局配置和任务描述，丢弃已不在配置中的Agent"""
+        # 加载全局配置
+        self.global_config = global_config
+        print(f"✅ 加载全局配置: {len(self.global_config)} 项")
         
-        if 'slack_webhook_url' not in agent_config:
-            agent_config['slack_webhook_url'] = self.global_config.get('slack_webhook_url', '')
+        # 按全局配置设置各上游的限流（进程内共享，多个配置文件配置同一上游时取最严格的限制）
+        get_rate_limiter().configure(self.global_config.get('rate_limits'), source=self.config_file)
         
+        keys = {(task.task_id, task.digest) for task in tasks}
+        with self._build_lock:
+            self._built_agents = {key: agent for key, agent in self._built_agents.items() if key in keys}
+        self.tasks = tasks
+    
+    def _build_agent(self, task: CompiledTask) -> Optional[BaseAgent]:
+        """
+        获取任务对应的Agent，首次使用时创建并缓存
+        
+        Args:
+            task: 任务描述
+        
+        Returns:
+            Agent实例，创建或验证失败时返回None
+        """
+        key = (task.task_id, task.digest)
+        with self._build_lock:
+            if key in self._built_agents:
+                return self._built_agents[key]
+            
+            try:
+                agent = self._create_agent_from_task(task.agent_config)
+            except Exception as e:
+                print(f"❌ 创建任务Agent失败 '{task.task_id}': {str(e)}")
+                agent = None
+            
+            self._built_agents[key] = agent
+            return agent
+    
+    @staticmethod
+    def _is_task_enabled(task: CompiledTask) -> bool:
+        """根据任务描述判断任务是否启用（不创建Agent）"""
+        return bool(task.agent_config.get('enabled', True))
+    
+    @property
+    def agents(self) -> List[BaseAgent]:
+        """所有有效的Agent（会创建尚未创建的Agent）"""
+        return [agent for agent in map(self._build_agent, self.tasks) if agent is not None]
+    
+    def _create_agent_from_task(self, agent_config: Dict[str, Any]) -> Optional[BaseAgent]:
+        """
+        从合并后的任务配置创建Agent
+        
+        Args:
+            agent_config: 合并了全局配置的任务配置
+        
+        Returns:
+            Agent实例，配置验证失败时返回None
+        """
         # 创建Agent实例
         agent = AgentFactory.create_agent(agent_config)
         
@@ -90,10 +152,10 @@ class TaskScheduler:
         is_valid, error_msg = agent.validate()
         if not is_valid:
             print(f"❌ 任务Agent '{agent.agent_id}' 配置验证失败: {error_msg}")
-            return
+            return None
         
-        self.agents.append(agent)
         print(f"✅ 任务Agent '{agent.agent_id}' 创建成功")
+        return agent
     
     def _create_default_config(self):
         """创建默认的任务配置文件"""
@@ -104,53 +166,84 @@ class TaskScheduler:
             with open(self.config_file, 'r', encoding='utf-8') as file:
                 config_data = yaml.safe_load(file)
             
-            self.global_config = config_data.get('global', {})
-            tasks = config_data.get('tasks', [])
-            
-            for task_config in tasks:
-                try:
-                    self._create_agent_from_task(task_config)
-                except Exception as e:
-                    print(f"❌ 创建任务Agent失败 '{task_config.get('id', 'unknown')}': {str(e)}")
-            
-            print(f"✅ 成功加载 {len(self.agents)} 个任务Agent")
+            global_config = config_data.get('global', {})
+            self._apply_tasks(global_config, compile_tasks(global_config, config_data.get('tasks', [])))
+            print(f"✅ 成功加载 {len(self.tasks)} 个任务")
         else:
             print(f"❌ 配置文件不存在且无法自动创建: {self.config_file}")
             print("请手动创建配置文件或检查路径是否正确")
     
-    def get_agent_by_id(self, agent_id: str) -> Optional[BaseAgent]:
-        """根据ID获取Agent"""
-        for agent in self.agents:
-            if agent.agent_id == agent_id:
-                return agent
+    def get_task_by_id(self, agent_id: str) -> Optional[CompiledTask]:
+        """根据ID获取任务描述（不创建Agent）"""
+        for task in self.tasks:
+            if task.task_id == agent_id:
+                return task
         return None
     
+    def get_agent_by_id(self, agent_id: str) -> Optional[BaseAgent]:
+        """根据ID获取Agent（只创建该任务的Agent）"""
+        task = self.get_task_by_id(agent_id)
+        return self._build_agent(task) if task is not None else None
+    
     def get_enabled_agents(self) -> List[BaseAgent]:
-        """获取所有启用的Agent"""
-        return [agent for agent in self.agents if agent.is_enabled()]
+        """获取所有启用的Agent（禁用的任务不创建Agent）"""
+        agents = []
+        for task in self.tasks:
+            if not self._is_task_enabled(task):
+                continue
+            agent = self._build_agent(task)
+            if agent is not None and agent.is_enabled():
+                agents.append(agent)
+        return agents
     
-    def execute_agent(self, agent: BaseAgent) -> Dict[str, Any]:
-        """执行单个Agent"""
-        try:
-            result = agent.execute()
+    def execute_agent(self, agent: BaseAgent, engine: str = 'serial') -> Dict[str, Any]:
+        """
+        执行单个Agent（每次执行是一个trace，各阶段的span都挂在这个根span下）
+        
+        Args:
+            agent: 要执行的Agent
+            engine: 执行方式，记录在trace中
+        
+        Returns:
+            执行结果字典
+        """
+        with get_tracer().span('execute_agent', task_id=agent.agent_id, agent_name=agent.agent_name, engine=engine) as span:
+            try:
+                result = agent.execute()
+            except Exception as e:
+                result = {
+                    'success': False,
+                    'error': str(e),
+                    'agent_id': agent.agent_id
+                }
+            record_result(span, result)
             return result
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'agent_id': agent.agent_id
-            }
     
     def execute_agent_by_id(self, agent_id: str) -> Dict[str, Any]:
         """根据ID执行特定Agent"""
-        agent = self.get_agent_by_id(agent_id)
-        if not agent:
+        task = self.get_task_by_id(agent_id)
+        if task is None:
             return {
                 'success': False,
                 'error': f'未找到Agent: {agent_id}',
                 'agent_id': agent_id
             }
         
+        if not self._is_task_enabled(task):
+            return {
+                'success': False,
+                'error': f'Agent已禁用: {agent_id}',
+                'agent_id': agent_id
+            }
+        
+        agent = self._build_agent(task)
+        if not agent:
+            return {
+                'success': False,
+                'error': f'Agent配置无效: {agent_id}',
+                'agent_id': agent_id
+            }
+        
         if not agent.is_enabled():
             return {
                 'success': False,
@@ -160,12 +253,13 @@ class TaskScheduler:
         
         return self.execute_agent(agent)
     
-    def execute_all_agents(self, parallel: bool = True) -> Dict[str, Dict[str, Any]]:
+    def execute_all_agents(self, parallel: bool = True, engine: str = 'thread') -> Dict[str, Dict[str, Any]]:
         """
         执行所有启用的Agent
         
         Args:
             parallel: 是否并行执行
+            engine: 执行引擎，thread（线程池）、async（asyncio原生异步）或 pipeline（分阶段流水线）
             
         Returns:
             每个Agent的执行结果字典
@@ -179,13 +273,29 @@ class TaskScheduler:
         print(f"🎯 准备执行 {len(enabled_agents)} 个Agent")
         results = {}
         
-        if parallel and len(enabled_agents) > 1:
+        if engine == 'async':
+            # 异步执行：单个事件循环内并发，按上游限制并发数
+            print("⚡ 使用异步模式执行...")
+            concurrency = dict(self.global_config.get('concurrency') or {})
+            if not parallel:
+                concurrency['agent'] = 1
+            from .async_engine import run_agents_async
+            results = run_agents_async(enabled_agents, concurrency)
+        elif engine == 'pipeline':
+            # 流水线执行：搜索、rerank、分析、发送分阶段重叠执行
+            print("🔀 使用流水线模式执行...")
+            pipeline_config = dict(self.global_config.get('pipeline') or {})
+            queue_size = pipeline_config.pop('queue_size', DEFAULT_QUEUE_SIZE)
+            if not parallel:
+                pipeline_config = {stage: 1 for stage in DEFAULT_STAGE_WORKERS}
+            results = StagePipeline(pipeline_config, queue_size).run(enabled_agents)
+        elif parallel and len(enabled_agents) > 1:
             # 并行执行
             print("🔄 使用并行模式执行...")
             with ThreadPoolExecutor(max_workers=3) as executor:
                 # 提交所有任务
                 future_to_agent = {
-                    executor.submit(self.execute_agent, agent): agent.agent_id
+                    executor.submit(self.execute_agent, agent, 'thread'): agent.agent_id
                     for agent in enabled_agents
                 }
                 
@@ -204,11 +314,9 @@ class TaskScheduler:
         else:
             # 串行执行
             print("⏳ 使用串行模式执行...")
+            # API限制由各上游的令牌桶控制，不再固定等待
             for agent in enabled_agents:
                 results[agent.agent_id] = self.execute_agent(agent)
-                # 添加延迟避免API限制
-                if len(enabled_agents) > 1:
-                    time.sleep(2)
         
         # 打印执行结果摘要
         success_count = sum(1 for result in results.values() if result.get('success'))
@@ -220,19 +328,21 @@ class TaskScheduler:
         return results
     
     def list_agents(self):
-        """列出所有Agent"""
-        if not self.agents:
+        """列出所有Agent（只读取任务描述，不创建Agent）"""
+        if not self.tasks:
             print("📝 没有配置的Agent")
             return
         
-        print(f"📝 Agent列表 (共 {len(self.agents)} 个):")
-        for i, agent in enumerate(self.agents, 1):
-            status = "✅ 启用" if agent.is_enabled() else "❌ 禁用"
-            print(f"   {i}. [{agent.agent_id}] {agent.agent_name} - {status}")
-            print(f"      类型: {agent.agent_type}")
-            print(f"      查询: {agent.query[:50]}{'...' if len(agent.query) > 50 else ''}")
-            if agent.schedule:
-                print(f"      计划: {agent.schedule}")
+        print(f"📝 Agent列表 (共 {len(self.tasks)} 个):")
+        for i, task in enumerate(self.tasks, 1):
+            config = task.agent_config
+            query = config.get('query', '')
+            status = "✅ 启用" if self._is_task_enabled(task) else "❌ 禁用"
+            print(f"   {i}. [{task.task_id}] {config.get('name', 'Default Agent')} - {status}")
+            print(f"      类型: {config.get('type')}")
+            print(f"      查询: {query[:50]}{'...' if len(query) > 50 else ''}")
+            if config.get('schedule'):
+                print(f"      计划: {config.get('schedule')}")
     
     def validate_all_agents(self) -> bool:
         """验证所有Agent配置的有效性"""
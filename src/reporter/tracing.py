@@ -0,0 +1,234 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# 当前线程/协程正在执行的span；asyncio任务会自动继承，线程之间需要通过use_span显式传递
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('reporter_current_span', default=None)
+
+class Span:
+    """
+    一次调用的耗时记录：名称、所属trace、父span、开始时间、耗时、属性和状态
+
+    同一次Agent执行中的所有span共享trace_id，show_trace.py按trace_id渲染瀑布图。
+    """
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_time', 'duration',
+                 'attributes', 'status', 'error', '_tracer', '_started')
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: Optional['Span'] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(8)
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        self._tracer = tracer
+        self._started = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any):
+        """设置属性（None会被忽略）"""
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        """批量设置属性（None会被忽略）"""
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, error: str):
+        """标记span失败"""
+        self.status = 'error'
+        self.error = error
+
+    def end(self):
+        """结束span并导出（重复调用只导出一次）"""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        self._tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为JSON可序列化的字典"""
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start_time, 6),
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'status': self.status,
+            'error': self.error,
+            'pid': os.getpid(),
+            'attributes': self.attributes,
+        }
+
+class JsonlSpanExporter:
+    """
+    把结束的span逐行追加写入JSONL文件，文件超过max_bytes时轮转
+
+    轮转方式同logging.RotatingFileHandler：traces.jsonl → traces.jsonl.1 → ... → traces.jsonl.N，
+    最旧的文件被删除。每个span一行、一次write调用，多个cron进程同时追加时不会交错。
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        """
+        初始化导出器
+
+        Args:
+            path: JSONL文件路径
+            max_bytes: 单个文件的最大字节数，0表示不轮转
+            backup_count: 保留的轮转文件数
+        """
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        """写入一个span，写入失败只输出警告，不影响Agent执行"""
+        line = (json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._rotate_if_needed(len(line))
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                print(f"⚠️  写入trace失败: {str(e)}")
+
+    def _rotate_if_needed(self, incoming: int):
+        """文件写入incoming字节后会超过上限时轮转"""
+        if not self.max_bytes:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+
+        if self.backup_count <= 0:
+            os.unlink(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def files(self) -> List[str]:
+        """按从旧到新的顺序返回现有的trace文件"""
+        rotated = [f"{self.path}.{index}" for index in range(self.backup_count, 0, -1)]
+        return [path for path in rotated + [self.path] if os.path.exists(path)]
+
+class Tracer:
+    """
+    进程内的span创建器
+
+    span通过contextvars记录父子关系：在同一线程或asyncio任务中嵌套的span自动成为子span；
+    跨线程执行的阶段（流水线引擎）通过use_span把Agent的根span带到工作线程。
+    未配置导出器时仍然创建span，只是不写入文件。
+    """
+
+    def __init__(self, exporter: Optional[JsonlSpanExporter] = None):
+        self.exporter = exporter
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """
+        创建span（需要调用end结束），parent为None时使用当前span作为父span
+
+        Args:
+            name: span名称
+            parent: 父span
+            **attributes: 初始属性
+
+        Returns:
+            Span实例
+        """
+        return Span(self, name, parent or _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        在上下文中执行一个span: with get_tracer().span('rerank', task_id=...) as span: ...
+
+        上下文中抛出的异常会记录为span的错误后继续抛出。
+        """
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    @contextmanager
+    def use_span(self, span: Optional[Span]) -> Iterator[Optional[Span]]:
+        """把已有的span设为当前span（不会结束它），用于在其他线程中继续同一个trace"""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    def export(self, span: Span):
+        """导出结束的span"""
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+def current_span() -> Optional[Span]:
+    """当前线程/协程正在执行的span，没有时返回None"""
+    return _current_span.get()
+
+def annotate(**attributes: Any):
+    """给当前span设置属性（没有当前span时忽略），供HTTP传输层等底层代码记录状态码和字节数"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attributes(**attributes)
+
+def record_result(span: Span, result: Dict[str, Any]):
+    """把Agent执行结果记录到span（失败时span标记为error）"""
+    span.set_attribute('success', bool(result.get('success')))
+    if not result.get('success'):
+        span.set_error(str(result.get('error', '未知错误')))
+
+def body_size(body: Any) -> Optional[int]:
+    """请求体的字节数（str按UTF-8计算），无法确定时返回None"""
+    if body is None:
+        return None
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return None
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """获取进程内共享的Tracer（TRACE_FILE为空时不写入文件）"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            from config.config import Config
+            config = Config()
+            exporter = None
+            if config.trace_file:
+                exporter = JsonlSpanExporter(config.trace_file, config.trace_max_bytes, config.trace_backup_count)
+            _tracer = Tracer(exporter)
+        return _tracer
@@ -0,0 +1,37 @@
+import unittest
+from types import SimpleNamespace
+
+from src.reporter.agents.financial_agent import _AnalysisStream
+from src.reporter.markdown_cleaner import StreamingMarkdownCleaner
+
+def _chunk(content=None, reasoning=None):
+    delta = SimpleNamespace(content=content, reasoning_content=reasoning)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+class AnalysisStreamTest(unittest.TestCase):
+    def make_stream(self, max_tokens):
+        return _AnalysisStream(StreamingMarkdownCleaner(), timeout=60, max_tokens=max_tokens, timings=None)
+
+    def test_limit_counts_estimated_tokens_not_chunks(self):
+        stream = self.make_stream(max_tokens=30)
+        # 每个chunk 10个中文字符，约6个token：5个chunk达到上限，而不是30个chunk
+        chunks_read = 0
+        for _ in range(30):
+            chunks_read += 1
+            if not stream.add(_chunk('美股市场今日全线上涨')):
+                break
+        self.assertEqual(chunks_read, 5)
+        self.assertEqual(stream.content_tokens, 30)
+        self.assertIsNotNone(stream.truncated)
+
+    def test_reasoning_does_not_count_toward_limit(self):
+        stream = self.make_stream(max_tokens=10)
+        for _ in range(20):
+            self.assertTrue(stream.add(_chunk(reasoning='先分析搜索结果中的主要事件')))
+        self.assertEqual(stream.content_tokens, 0)
+        self.assertGreater(stream.tokens, 10)
+        self.assertTrue(stream.add(_chunk('结论')))
+        self.assertEqual(stream.finish(), '结论')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.reporter.cache import get_cache
+
+class GetCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+        self.db_path = os.path.join(self.work_dir, 'cache.db')
+
+    def test_shared_namespace_uses_largest_max_entries(self):
+        small = get_cache(self.db_path, 'search', 2)
+        self.addCleanup(small.close)
+        large = get_cache(self.db_path, 'search', 5)
+        again = get_cache(self.db_path, 'search', 3)
+
+        self.assertIs(small, large)
+        self.assertIs(small, again)
+        self.assertEqual(small.max_entries, 5)
+
+        for index in range(5):
+            small.set(f"key-{index}", index)
+        self.assertEqual([small.get(f"key-{index}", 60) for index in range(5)], [0, 1, 2, 3, 4])
+
+    def test_namespaces_keep_their_own_max_entries(self):
+        search = get_cache(self.db_path, 'search', 10)
+        self.addCleanup(search.close)
+        rerank = get_cache(self.db_path, 'rerank', 20)
+        self.addCleanup(rerank.close)
+
+        self.assertEqual(search.max_entries, 10)
+        self.assertEqual(rerank.max_entries, 20)
+
+if __name__ == '__main__':
+    unittest.main()
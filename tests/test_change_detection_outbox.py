@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.reporter.agents.financial_agent import FinancialAgent
+from src.reporter.change_detector import CHANGE_UNCHANGED
+from src.reporter.client_registry import get_client_registry
+from src.reporter.slack_outbox import SlackOutbox
+from src.reporter.slack_service import SlackService
+
+DOCUMENTS = ['文档一：央行公布利率决议', '文档二：股市收盘上涨']
+
+class ChangeDetectionWithOutboxTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config = get_client_registry().config
+        for name, value in (('cache_dir', tmp.name), ('bochaai_api_key', 'test'), ('deepseek_api_key', 'test')):
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.outbox = SlackOutbox(os.path.join(tmp.name, 'outbox.db'), send_lease_seconds=60)
+        self.addCleanup(self.outbox.close, 0)
+
+        self.agent = FinancialAgent({
+            'id': 'outbox-change', 'name': 'Outbox Change', 'type': 'financial',
+            'query': '央行利率', 'slack_webhook_url': 'https://hooks.slack.com/services/T000/B000/test',
+            'use_slack_blocks': False, 'change_detection': True,
+        })
+        self.agent.slack_service = SlackService(self.agent.slack_service.config, outbox=self.outbox)
+
+    def run_once(self):
+        """一次执行：变化检测 → 发送（写入发件箱）→ 构建结果，返回变化检测的模式和执行结果"""
+        self.agent._reset_run_state()
+        self.agent._document_urls = {doc: f"https://example.com/{i}" for i, doc in enumerate(DOCUMENTS)}
+        self.agent._detect_changes(list(DOCUMENTS))
+        mode = self.agent.change_stats['mode']
+        content = '今日要点：央行维持利率不变。'
+        return mode, self.agent._build_result(content, self.agent.slack_service.send_message(content))
+
+    def test_queued_report_saves_fingerprint(self):
+        first_mode, result = self.run_once()
+        self.assertNotEqual(first_mode, CHANGE_UNCHANGED)
+        self.assertEqual(result['slack_delivery'], 'queued')
+        self.assertEqual(self.outbox.counts().get('pending'), 1)
+
+        second_mode, _ = self.run_once()
+        self.assertEqual(second_mode, CHANGE_UNCHANGED)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.reporter.http_client import HttpTransport, should_retry_status
+
+class _StatusServer:
+    """本地HTTP服务：POST请求按预设的状态码依次返回，并记录收到的请求数"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status = server.statuses[min(server.hits, len(server.statuses) - 1)]
+                server.hits += 1
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/hook"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class HttpTransportRetryTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = HttpTransport(max_retries=2, backoff_base=0, backoff_max=0)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def post(self, statuses, idempotent):
+        server = _StatusServer(statuses)
+        self.addCleanup(server.close)
+        response = self.transport.post(server.url, data=b'{}', idempotent=idempotent)
+        return response.status_code, server.hits
+
+    def test_idempotent_request_retries_5xx(self):
+        self.assertEqual(self.post([503, 503, 200], idempotent=True), (200, 3))
+
+    def test_non_idempotent_request_returns_5xx_without_retry(self):
+        self.assertEqual(self.post([503, 200], idempotent=False), (503, 1))
+
+    def test_non_idempotent_request_retries_429(self):
+        self.assertEqual(self.post([429, 200], idempotent=False), (200, 2))
+
+    def test_should_retry_status(self):
+        self.assertTrue(should_retry_status(502))
+        self.assertFalse(should_retry_status(502, idempotent=False))
+        self.assertTrue(should_retry_status(429, idempotent=False))
+        self.assertFalse(should_retry_status(400))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from src.reporter.markdown_cleaner import StreamingMarkdownCleaner, clean_markdown
+
+# (输入, 期望输出)
+GOLDEN = [
+    ("# 标题\n\n**粗体** 和 *斜体*，__下划线__ 与 _强调_\n", "标题\n\n粗体 和 斜体，下划线 与 强调"),
+    ("- 第一项\n* 第二项\n+ 第三项\n---\n> 引用内容\n", "• 第一项\n• 第二项\n• 第三项\n\n引用内容"),
+    ("详见 [美联储声明](https://example.com/a) 和 `代码`\n```python\nx = 1\n```\n", "详见 美联储声明 和 代码\npython\nx = 1"),
+    # 链接文本跨行
+    ("[跨行\n链接](https://example.com)\n\n\n\n结尾", "跨行\n链接\n\n结尾"),
+    # 只有标记的行：行首规则的 \s+ 吞掉后面的空行
+    ("#\n\n标题\n", "标题"),
+    # 成对标记不能跨行配对
+    ("a *b\nc* d\n", "a *b\nc* d"),
+    ("\n\n  开头空白\n\n\n\n\n中间\n\n\n", "开头空白\n\n中间"),
+    # 超过min_segment，流式清理分多个片段切分
+    ("## 要点\n- **上涨** 0.8%，详见 [链接](https://example.com)\n\n\n" * 200,
+     ("要点\n• 上涨 0.8%，详见 链接\n\n" * 200).strip()),
+]
+
+def stream_clean(text: str, size: int, min_segment: int) -> str:
+    """按固定长度切块后用流式清理器处理"""
+    cleaner = StreamingMarkdownCleaner(min_segment)
+    output = [cleaner.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    output.append(cleaner.finish())
+    return ''.join(output)
+
+class CleanMarkdownTest(unittest.TestCase):
+    def test_batch_golden(self):
+        for text, expected in GOLDEN:
+            with self.subTest(text=text[:40]):
+                self.assertEqual(clean_markdown(text), expected)
+
+    def test_stream_golden_with_boundaries_inside_markers(self):
+        # 1-7字符的块让切分点落在 **、](、``` 等标记内部
+        for text, expected in GOLDEN:
+            for min_segment in (0, 1024):
+                for size in (1, 2, 3, 5, 7, 64):
+                    with self.subTest(text=text[:40], size=size, min_segment=min_segment):
+                        self.assertEqual(stream_clean(text, size, min_segment), expected)
+
+    def test_stream_emits_before_finish(self):
+        text, expected = GOLDEN[-1]
+        cleaner = StreamingMarkdownCleaner()
+        output = ''.join(cleaner.feed(text[i:i + 8]) for i in range(0, len(text), 8))
+        self.assertTrue(output)
+        self.assertTrue(expected.startswith(output))
+        self.assertEqual(output + cleaner.finish(), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import multiprocessing
+import time
+import unittest
+
+from src.reporter.metrics import MetricsRegistry, forward_metrics, get_metrics, start_metrics_collector
+
+def _worker(queue, done):
+    """模拟守护模式的worker进程：完成一个任务后发送指标，然后继续运行直到done被设置"""
+    metrics = get_metrics()
+    metrics.inc('reporter_agent_runs_total', agent='worker-agent', status='success')
+    metrics.observe('reporter_stage_duration_seconds', 0.3, agent='worker-agent', stage='total')
+    forward_metrics(queue)
+    done.wait(30)
+
+class MetricsMergeTest(unittest.TestCase):
+    def test_drain_and_merge_accumulate(self):
+        worker, parent = MetricsRegistry(), MetricsRegistry()
+        for _ in range(2):
+            worker.inc('reporter_agent_runs_total', agent='a', status='success')
+            worker.observe('reporter_stage_duration_seconds', 0.3, agent='a', stage='total')
+            worker.set('reporter_change_delta_ratio', 0.25, agent='a')
+            parent.merge(worker.drain())
+
+        rendered = parent.render()
+        self.assertIn('reporter_agent_runs_total{agent="a",status="success"} 2', rendered)
+        self.assertIn('reporter_stage_duration_seconds_count{agent="a",stage="total"} 2', rendered)
+        self.assertIn('reporter_stage_duration_seconds_bucket{agent="a",stage="total",le="0.5"} 2', rendered)
+        self.assertIn('reporter_change_delta_ratio{agent="a"} 0.25', rendered)
+        # 计数器取出后清零，仪表保留当前值
+        self.assertEqual(list(worker.drain()), ['reporter_change_delta_ratio'])
+
+class WorkerMetricsCollectorTest(unittest.TestCase):
+    def test_worker_counters_visible_while_worker_runs(self):
+        context = multiprocessing.get_context('spawn')
+        queue, done = context.Queue(), context.Event()
+        collector = start_metrics_collector(queue)
+        process = context.Process(target=_worker, args=(queue, done))
+        process.start()
+        try:
+            sample = 'reporter_agent_runs_total{agent="worker-agent",status="success"} 1'
+            deadline = time.monotonic() + 30
+            while sample not in get_metrics().render() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertIn(sample, get_metrics().render())
+            self.assertTrue(process.is_alive())
+        finally:
+            done.set()
+            process.join()
+            queue.put(None)
+            collector.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from src.reporter.slack_service import SlackService
+
+WINDOW = 2.0
+
+class _RecordingSlackService(SlackService):
+    """不发送网络请求，只记录每次发送的批次"""
+
+    def __init__(self, coalesce_window):
+        config = SimpleNamespace(slack_webhook_url='http://127.0.0.1:9/hook', use_slack_blocks=False)
+        super().__init__(config, coalesce_window)
+        self.batches = []
+
+    def _send_payloads(self, reports, payloads, span):
+        self.batches.append([content for content, _, _ in reports])
+        return {index: True for index in range(len(reports))}
+
+    async def _asend_payloads(self, reports, payloads, engine, span):
+        return self._send_payloads(reports, payloads, span)
+
+class SlackCoalesceTest(unittest.TestCase):
+    def test_lone_sender_is_not_delayed(self):
+        service = _RecordingSlackService(WINDOW)
+        start = time.monotonic()
+        with service.expecting_report():
+            self.assertTrue(service.send_message('a'))
+        self.assertTrue(service.send_message('b'))
+        self.assertLess(time.monotonic() - start, WINDOW / 2)
+        self.assertEqual(service.batches, [['a'], ['b']])
+
+    def test_lone_async_sender_is_not_delayed(self):
+        service = _RecordingSlackService(WINDOW)
+
+        async def send():
+            with service.expecting_report():
+                return await service.asend_message('a', engine=None)
+
+        start = time.monotonic()
+        self.assertTrue(asyncio.run(send()))
+        self.assertLess(time.monotonic() - start, WINDOW / 2)
+
+    def test_concurrent_senders_are_coalesced(self):
+        service = _RecordingSlackService(WINDOW)
+        results = {}
+        ready = threading.Barrier(2)
+
+        def run(name, delay):
+            with service.expecting_report():
+                ready.wait()
+                time.sleep(delay)
+                results[name] = service.send_message(name)
+
+        threads = [threading.Thread(target=run, args=('a', 0)), threading.Thread(target=run, args=('b', 0.2))]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {'a': True, 'b': True})
+        self.assertEqual(service.batches, [['a', 'b']])
+        # 两份报告到齐后立即发送，不等满窗口
+        self.assertLess(time.monotonic() - start, WINDOW / 2)
+
+    def test_abandoned_report_releases_the_batch(self):
+        service = _RecordingSlackService(WINDOW)
+        ready = threading.Barrier(2)
+
+        def fail():
+            with service.expecting_report():
+                ready.wait()
+                time.sleep(0.2)
+
+        thread = threading.Thread(target=fail)
+        thread.start()
+        start = time.monotonic()
+        with service.expecting_report():
+            ready.wait()
+            self.assertTrue(service.send_message('a'))
+        thread.join()
+        self.assertLess(time.monotonic() - start, WINDOW / 2)
+        self.assertEqual(service.batches, [['a']])
+
+if __name__ == '__main__':
+    unittest.main()